@@ -0,0 +1,31 @@
+"""add users.token_version and the (updated_at, id) index
+
+Revision ID: 0001_token_version
+Revises:
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.migrations import upgrade_users_table
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_token_version'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Shared with the startup step in app/main.py; checks the schema before
+    # each change, so it also applies to tables create_all() has just built
+    upgrade_users_table(op.get_bind())
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_updated_at_id', table_name='users')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('updated_at', existing_type=sa.DateTime(timezone=True), nullable=True)
+        batch_op.drop_column('token_version')
@@ -1,7 +1,8 @@
 from fastapi import APIRouter
-from app.api.v1 import auth, users
+from app.api.v1 import auth, users, debug
 
 api_router = APIRouter()
 
 api_router.include_router(auth.router, prefix="/auth", tags=["authentication"])
-api_router.include_router(users.router, prefix="/users", tags=["users"])
\ No newline at end of file
+api_router.include_router(users.router, prefix="/users", tags=["users"])
+api_router.include_router(debug.router, prefix="/debug", tags=["debug"])
\ No newline at end of file
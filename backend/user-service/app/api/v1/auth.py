@@ -1,18 +1,35 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer
 from fastapi.responses import RedirectResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from app.db.database import get_db
-from app.schemas.user import UserCreate, UserLogin, Token, User
+from app.core.config import settings
+from app.db.database import get_db, SessionLocal
+from app.schemas.user import UserCreate, UserLogin, Token, User, user_adapter, user_variant
+from app.schemas.session import SessionInfo
 from app.services.user_service import UserService
-from app.services.google_oauth_service import GoogleOAuthService
-from app.services.facebook_oauth_service import FacebookOAuthService
-from app.core.security import create_access_token, create_refresh_token, verify_token
-from app.utils.deps import get_current_active_user
-from typing import Optional
-
-router = APIRouter()
+from app.services.session_service import SessionService, hash_token, successor_jtis
+from app.services.oauth_http import ProviderUnavailableError
+from app.services.oauth_registry import oauth_providers, OAuthProvider
+from app.core.security import create_access_token, create_refresh_token, verify_token, principal_claims
+from app.core.principals import Principal, token_versions
+from app.core.breached_passwords import BreachedPasswordError
+from app.core.responses import conditional_response
+from app.core.profiling import ProfiledRoute
+from app.core.revocation import revoked_tokens
+from app.core.singleflight import oauth_code_exchanges, oauth_token_verifications
+from app.utils.deps import get_current_active_user, get_device_info, get_current_session_id, get_current_token_payload
+from app.models.user import User as UserModel
+from app.models.session import UserSession
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta
+import secrets
+import structlog
+
+logger = structlog.get_logger()
+
+router = APIRouter(route_class=ProfiledRoute)
 security = HTTPBearer()
 
 
@@ -35,13 +52,20 @@ def register(
         )
     
     # Create new user
-    user = user_service.create_user(user_create)
+    try:
+        user = user_service.create_user(user_create)
+    except BreachedPasswordError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     return user
 
 
 @router.post("/login", response_model=Token)
 def login(
     user_login: UserLogin,
+    device: dict = Depends(get_device_info),
     db: Session = Depends(get_db)
 ):
     """
@@ -59,14 +83,7 @@ def login(
         )
     
     # Create tokens
-    access_token = create_access_token(subject=user.id)
-    refresh_token = create_refresh_token(subject=user.id)
-    
-    return Token(
-        access_token=access_token,
-        refresh_token=refresh_token,
-        token_type="bearer"
-    )
+    return issue_tokens(db, user, device=device)
 
 
 class RefreshTokenRequest(BaseModel):
@@ -94,7 +111,13 @@ def refresh_token(
         raise credentials_exception
     
     user_id: str = payload.get("sub")
-    if user_id is None:
+    session_id: str = payload.get("sid")
+    if user_id is None or session_id is None:
+        raise credentials_exception
+    
+    # One primary key lookup; also catches reuse of a rotated-out token
+    session = SessionService(db).check_refresh_token(session_id, request.refresh_token)
+    if session is None or session.user_id != int(user_id):
         raise credentials_exception
     
     user_service = UserService(db)
@@ -102,25 +125,90 @@ def refresh_token(
     if user is None or not user.is_active:
         raise credentials_exception
     
-    # Create new tokens
-    new_access_token = create_access_token(subject=user.id)
-    new_refresh_token = create_refresh_token(subject=user.id)
+    # Issued before a logout-all or status change
+    if payload.get("ver", 0) < (user.token_version or 0):
+        raise credentials_exception
     
-    return Token(
-        access_token=new_access_token,
-        refresh_token=new_refresh_token,
-        token_type="bearer"
-    )
+    # Rotate: the presented refresh token stops working
+    return issue_tokens(db, user, session=session, previous_refresh_token=request.refresh_token)
 
 
 @router.get("/me", response_model=User)
 def get_current_user_info(
+    request: Request,
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Get current user information
+    Get current user information; supports If-None-Match
+    """
+    return conditional_response(request, user_adapter, current_user, user_variant())
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    current_user: UserModel = Depends(get_current_active_user),
+    payload: dict = Depends(get_current_token_payload),
+    db: Session = Depends(get_db)
+):
+    """
+    End the current session; its refresh token and the presented access token stop working
+    """
+    session_service = SessionService(db)
+    session_id = payload.get("sid")
+    session = session_service.get_session(session_id) if session_id else None
+    if session is not None and session.user_id == current_user.id and session.revoked_at is None:
+        session_service.revoke(session)
+    if payload.get("jti") and payload.get("exp"):
+        session_service.revoke_access_token(
+            payload["jti"], current_user.id, datetime.utcfromtimestamp(payload["exp"])
+        )
+
+
+@router.post("/logout-all", status_code=status.HTTP_204_NO_CONTENT)
+def logout_all(
+    current_user: UserModel = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Revoke every access and refresh token issued to the current user
     """
-    return current_user
+    SessionService(db).revoke_all(current_user.id)
+    UserService(db).revoke_tokens(current_user.id)
+
+
+@router.get("/sessions", response_model=List[SessionInfo])
+def list_sessions(
+    current_user: UserModel = Depends(get_current_active_user),
+    session_id: Optional[str] = Depends(get_current_session_id),
+    db: Session = Depends(get_db)
+):
+    """
+    List the current user's active sessions (one per logged-in device)
+    """
+    sessions = SessionService(db).get_active_sessions(current_user.id)
+    return [
+        SessionInfo.model_validate(session).model_copy(update={"current": session.id == session_id})
+        for session in sessions
+    ]
+
+
+@router.delete("/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
+def revoke_session(
+    session_id: str,
+    current_user: UserModel = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Log out one of the current user's devices
+    """
+    session_service = SessionService(db)
+    session = session_service.get_session(session_id)
+    if session is None or session.user_id != current_user.id or session.revoked_at is not None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found"
+        )
+    session_service.revoke(session)
 
 
 class TokenVerifyRequest(BaseModel):
@@ -154,353 +242,389 @@ def verify_jwt_token(
             detail="Invalid token payload"
         )
     
-    user_service = UserService(db)
-    user = user_service.get_user_by_id(int(user_id))
-    if user is None or not user.is_active:
+    # In stateless mode the token carries the principal; only its version
+    # is checked, against the in-memory map
+    principal = Principal.from_claims(payload) if settings.STATELESS_PRINCIPALS_ENABLED else None
+    if principal is not None:
+        current_version = token_versions.get(principal.id)
+    else:
+        principal = UserService(db).get_principal_coalesced(int(user_id))
+        current_version = principal.token_version if principal is not None else 0
+    
+    if principal is None or not principal.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found or inactive"
         )
     
+    if payload.get("ver", 0) < current_version or revoked_tokens.is_revoked(db, payload.get("jti")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked"
+        )
+    
     return {
         "valid": True,
-        "user_id": user.id,
-        "email": user.email,
-        "role": user.role,
-        "is_active": user.is_active
+        "user_id": principal.id,
+        "email": principal.email,
+        "role": principal.role,
+        "is_active": principal.is_active
     }
 
 
-# Google OAuth endpoints
-class GoogleTokenRequest(BaseModel):
-    token: str
+def get_or_create_oauth_user(db: Session, user_info: dict, provider: str) -> UserModel:
+    """
+    Log in the user owning the provider email, creating the account on first login
 
+    An existing account is only matched when the provider vouches for the
+    email; otherwise anyone who can set an unverified email at the provider
+    could log in as its owner.
+    """
+    user_service = UserService(db)
 
-@router.get("/google")
-def google_login():
+    existing_user = user_service.get_user_by_email(user_info['email'])
+    if existing_user:
+        if not user_info['email_verified']:
+            logger.warning("OAuth login with unverified email of an existing account", provider=provider)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="An account with this email already exists; verify the email with the provider or log in with your password"
+            )
+        return existing_user
+
+    user_create = UserCreate(
+        email=user_info['email'],
+        password="",  # No password for OAuth users
+        full_name=user_info['full_name'],
+        role="USER",
+        is_active=True,
+        is_verified=user_info['email_verified']
+    )
+    user = user_service.create_oauth_user(user_create, provider=provider)
+    logger.info("OAuth user created", provider=provider, user_id=user.id)
+    return user
+
+
+def provider_unavailable(e: ProviderUnavailableError) -> HTTPException:
+    logger.warning("OAuth provider unavailable", provider=e.provider, error=str(e))
+    headers = {"Retry-After": str(max(1, int(e.retry_after)))} if e.retry_after else None
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"{e.provider.capitalize()} login is temporarily unavailable",
+        headers=headers
+    )
+
+
+def issue_tokens(
+    db: Session,
+    user: UserModel,
+    device: Optional[dict] = None,
+    session: Optional[UserSession] = None,
+    previous_refresh_token: Optional[str] = None
+) -> Token:
     """
-    Initiate Google OAuth login
+    Issue a token pair, starting a new session unless rotating an existing one
+
+    When rotating, ``previous_refresh_token`` is the token being exchanged.
+    If another request exchanged it within the reuse grace window, this one
+    gets the same pair; if it was exchanged before that, the session is
+    revoked and 401 is raised.
     """
-    try:
-        google_service = GoogleOAuthService()
-        authorization_url = google_service.get_authorization_url()
-        return {"authorization_url": authorization_url}
-    except ValueError as e:
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    session_service = SessionService(db)
+    if session is None:
+        session = session_service.create_session(user.id, **(device or {}))
+        refresh_jti, access_token_jti = secrets.token_urlsafe(12), secrets.token_urlsafe(12)
+    else:
+        refresh_jti, access_token_jti = successor_jtis(previous_refresh_token)
+
+    # Whole seconds, as stored in the tokens' exp, so the pair can be rebuilt
+    issued_at = datetime.utcnow().replace(microsecond=0)
+    tokens = token_pair(user, session, refresh_jti, access_token_jti, issued_at)
+    if not session_service.rotate(
+        session, tokens.refresh_token, access_token_jti=access_token_jti,
+        previous_token=previous_refresh_token, rotated_at=issued_at
+    ):
+        raise credentials_exception
+
+    if previous_refresh_token is not None and session.rotated_at.replace(tzinfo=None) != issued_at:
+        # Another request rotated the same token moments ago: hand out its pair
+        tokens = token_pair(user, session, refresh_jti, access_token_jti, session.rotated_at.replace(tzinfo=None))
+        if hash_token(tokens.refresh_token) != session.refresh_token_hash:
+            # The user's token version changed in between
+            raise credentials_exception
+
+    return tokens
+
+
+def token_pair(
+    user: UserModel, session: UserSession, refresh_jti: str, access_token_jti: str, issued_at: datetime
+) -> Token:
+    """
+    The tokens of one rotation; the same arguments always give the same pair
+    """
+    return Token(
+        access_token=create_access_token(
+            subject=user.id,
+            claims={
+                **principal_claims(user),
+                "sid": session.id,
+                "jti": access_token_jti,
+                "exp": issued_at + timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
+            }
+        ),
+        refresh_token=create_refresh_token(
+            subject=user.id,
+            claims={
+                "ver": user.token_version or 0,
+                "sid": session.id,
+                "jti": refresh_jti,
+                "exp": issued_at + timedelta(days=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS)
+            }
+        ),
+        token_type="bearer"
+    )
+
+
+def complete_oauth_login(db: Session, user_info: dict, provider: str, device: dict) -> Tuple[UserModel, Token]:
+    user = get_or_create_oauth_user(db, user_info, provider)
+    return user, issue_tokens(db, user, device=device)
+
+
+def oauth_login_response(user: UserModel, tokens: Token) -> dict:
+    return {
+        **tokens.model_dump(),
+        "user": {
+            "id": user.id,
+            "email": user.email,
+            "full_name": user.full_name,
+            "role": user.role,
+            "is_active": user.is_active,
+            "is_verified": user.is_verified
+        }
+    }
+
+
+def get_oauth_provider(name: str) -> OAuthProvider:
+    provider = oauth_providers.get(name)
+    if provider is None:
+        if oauth_providers.is_known(name):
+            logger.error("OAuth provider not configured", provider=name)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"{name.capitalize()} OAuth service not configured properly"
+            )
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Unknown OAuth provider"
         )
+    return provider
 
 
-@router.get("/google/callback")
-def google_callback(
-    code: str,
-    state: Optional[str] = None,
-    db: Session = Depends(get_db)
-):
+async def oauth_login(name: str) -> dict:
+    provider = get_oauth_provider(name)
+    try:
+        return {"authorization_url": await provider.get_authorization_url()}
+    except ProviderUnavailableError as e:
+        raise provider_unavailable(e)
+
+
+def complete_oauth_token_login(user_info: dict, provider: str, device: dict) -> Token:
     """
-    Handle Google OAuth callback
+    complete_oauth_login in a session of its own, for the threadpool
+
+    A session is not safe to use from two threads, so the request's own
+    session from get_db is not handed over.
     """
+    db = SessionLocal()
     try:
-        google_service = GoogleOAuthService()
-        user_info = google_service.exchange_code_for_token(code, state)
+        _, tokens = complete_oauth_login(db, user_info, provider, device)
+        return tokens
+    finally:
+        db.close()
 
-        if not user_info:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Failed to get user info from Google"
-            )
 
-        user_service = UserService(db)
-
-        existing_user = user_service.get_user_by_email(user_info['email'])
-
-        if existing_user:
-            # User exists, log them in
-            user = existing_user
-        else:
-            # Create new user
-            user_create = UserCreate(
-                email=user_info['email'],
-                password="",
-                full_name=user_info['full_name'],
-                role="USER",
-                is_active=True,
-                is_verified=user_info['email_verified']
-            )
-            user = user_service.create_oauth_user(user_create, provider="google")
-
-        access_token = create_access_token(subject=user.id)
-        refresh_token = create_refresh_token(subject=user.id)
-
-        return {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "bearer",
-            "user": {
-                "id": user.id,
-                "email": user.email,
-                "full_name": user.full_name,
-                "role": user.role,
-                "is_active": user.is_active,
-                "is_verified": user.is_verified
-            }
-        }
+def complete_shared_oauth_login(user_info: dict, provider: str, device: dict) -> dict:
+    """
+    complete_oauth_login for a shared code exchange, in a session of its own
+
+    The exchange can outlive the request that started it, whose session is
+    closed when that request ends.
+    """
+    db = SessionLocal()
+    try:
+        return oauth_login_response(*complete_oauth_login(db, user_info, provider, device))
+    finally:
+        db.close()
+
+
+async def redeem_oauth_code(provider: OAuthProvider, code: str, state: Optional[str], device: dict) -> dict:
+    user_info = await provider.exchange_code_for_token(code, state)
+
+    if not user_info:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to get user info from {provider.display_name}"
+        )
+
+    # Database work is sync; keep it off the event loop
+    return await run_in_threadpool(complete_shared_oauth_login, user_info, provider.name, device)
+
+
+async def oauth_callback(name: str, code: str, state: Optional[str], device: dict) -> dict:
+    provider = get_oauth_provider(name)
+    try:
+        # A code can only be redeemed once; duplicate callbacks (double
+        # clicks, client retries) share the first one's login instead
+        return await oauth_code_exchanges.do((name, code), redeem_oauth_code, provider, code, state, device)
 
     except HTTPException:
         raise
+    except ProviderUnavailableError as e:
+        raise provider_unavailable(e)
     except Exception as e:
+        logger.error("Unexpected error in OAuth callback", provider=name, exc_info=e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"OAuth callback failed: {str(e)}"
+            detail=f"{provider.display_name} OAuth callback failed"
         )
-# token
-@router.post("/google/token", response_model=Token)
-def google_token_login(
-    request: GoogleTokenRequest,
-    db: Session = Depends(get_db)
-):
-    """
-    Login with Google ID token (for frontend direct integration)
-    """
+
+
+async def oauth_token_login(name: str, token: str, device: dict) -> Token:
+    provider = get_oauth_provider(name)
     try:
-        print(f"[AUTH-ENDPOINT] Received Google token login request")
-        print(f"[AUTH-ENDPOINT] Token length: {len(request.token) if request.token else 0}")
-        
-        # Initialize Google OAuth service
-        try:
-            google_service = GoogleOAuthService()
-        except ValueError as e:
-            print(f"[AUTH-ENDPOINT] Failed to initialize Google OAuth service: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Google OAuth service not configured properly"
-            )
-        
-        # Verify Google token
-        user_info = google_service.verify_google_token(request.token)
-        
+        user_info = await oauth_token_verifications.do((name, token), provider.verify_token, token)
+
         if not user_info:
-            print(f"[AUTH-ENDPOINT] Google token verification failed")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid Google token or token verification failed"
-            )
-        
-        print(f"[AUTH-ENDPOINT] Google token verified for user: {user_info['email']}")
-        
-        user_service = UserService(db)
-        
-        # Check if user exists
-        existing_user = user_service.get_user_by_email(user_info['email'])
-        
-        if existing_user:
-            # User exists, log them in
-            print(f"[AUTH-ENDPOINT] Existing user found: {existing_user.email}")
-            user = existing_user
-        else:
-            # Create new user
-            print(f"[AUTH-ENDPOINT] Creating new user for: {user_info['email']}")
-            user_create = UserCreate(
-                email=user_info['email'],
-                password="",  # No password for OAuth users
-                full_name=user_info['full_name'],
-                role="USER",
-                is_active=True,
-                is_verified=user_info['email_verified']
+                detail=f"Invalid {provider.display_name} token or token verification failed"
             )
-            user = user_service.create_oauth_user(user_create, provider="google")
-            print(f"[AUTH-ENDPOINT] New user created with ID: {user.id}")
-        
-        # Create tokens
-        print(f"[AUTH-ENDPOINT] Creating JWT tokens for user ID: {user.id}")
-        access_token = create_access_token(subject=user.id)
-        refresh_token = create_refresh_token(subject=user.id)
-        
-        print(f"[AUTH-ENDPOINT] Google authentication successful for: {user.email}")
-        return Token(
-            access_token=access_token,
-            refresh_token=refresh_token,
-            token_type="bearer"
-        )
-        
+
+        # Database work is sync; keep it off the event loop
+        return await run_in_threadpool(complete_oauth_token_login, user_info, name, device)
+
     except HTTPException:
-        # Re-raise HTTP exceptions as-is
         raise
+    except ProviderUnavailableError as e:
+        raise provider_unavailable(e)
     except Exception as e:
-        print(f"[AUTH-ENDPOINT] Unexpected error in Google token login: {e}")
-        print(f"[AUTH-ENDPOINT] Error type: {type(e).__name__}")
-        import traceback
-        print(f"[AUTH-ENDPOINT] Traceback: {traceback.format_exc()}")
+        logger.error("Unexpected error in OAuth token login", provider=name, exc_info=e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Google authentication failed: {str(e)}"
+            detail=f"{provider.display_name} authentication failed"
         )
 
 
+# Google OAuth endpoints
+class GoogleTokenRequest(BaseModel):
+    token: str
+
+
+@router.get("/google")
+async def google_login():
+    """
+    Initiate Google OAuth login
+    """
+    return await oauth_login("google")
+
+
+@router.get("/google/callback")
+async def google_callback(
+    code: str,
+    state: Optional[str] = None,
+    device: dict = Depends(get_device_info)
+):
+    """
+    Handle Google OAuth callback
+    """
+    return await oauth_callback("google", code, state, device)
+
+
+@router.post("/google/token", response_model=Token)
+async def google_token_login(
+    request: GoogleTokenRequest,
+    device: dict = Depends(get_device_info)
+):
+    """
+    Login with Google ID token (for frontend direct integration)
+    """
+    return await oauth_token_login("google", request.token, device)
+
+
 # Facebook OAuth endpoints
 class FacebookTokenRequest(BaseModel):
     token: str
 
 
 @router.get("/facebook")
-def facebook_login():
+async def facebook_login():
     """
     Initiate Facebook OAuth login
     """
-    try:
-        facebook_service = FacebookOAuthService()
-        authorization_url = facebook_service.get_authorization_url()
-        return {"authorization_url": authorization_url}
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=str(e)
-        )
+    return await oauth_login("facebook")
 
 
 @router.get("/facebook/callback")
-def facebook_callback(
+async def facebook_callback(
     code: str,
     state: Optional[str] = None,
-    db: Session = Depends(get_db)
+    device: dict = Depends(get_device_info)
 ):
     """
     Handle Facebook OAuth callback
     """
-    try:
-        facebook_service = FacebookOAuthService()
-        user_info = facebook_service.exchange_code_for_token(code, state)
-
-        if not user_info:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Failed to get user info from Facebook"
-            )
-
-        user_service = UserService(db)
-
-        existing_user = user_service.get_user_by_email(user_info['email'])
-
-        if existing_user:
-            # User exists, log them in
-            user = existing_user
-        else:
-            # Create new user
-            user_create = UserCreate(
-                email=user_info['email'],
-                password="",
-                full_name=user_info['full_name'],
-                role="USER",
-                is_active=True,
-                is_verified=user_info['email_verified']
-            )
-            user = user_service.create_oauth_user(user_create, provider="facebook")
-
-        access_token = create_access_token(subject=user.id)
-        refresh_token = create_refresh_token(subject=user.id)
-
-        return {
-            "access_token": access_token,
-            "refresh_token": refresh_token,
-            "token_type": "bearer",
-            "user": {
-                "id": user.id,
-                "email": user.email,
-                "full_name": user.full_name,
-                "role": user.role,
-                "is_active": user.is_active,
-                "is_verified": user.is_verified
-            }
-        }
-
-    except HTTPException:
-        raise
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Facebook OAuth callback failed: {str(e)}"
-        )
+    return await oauth_callback("facebook", code, state, device)
 
 
 @router.post("/facebook/token", response_model=Token)
-def facebook_token_login(
+async def facebook_token_login(
     request: FacebookTokenRequest,
-    db: Session = Depends(get_db)
+    device: dict = Depends(get_device_info)
 ):
     """
     Login with Facebook access token (for frontend direct integration)
     """
-    try:
-        print(f"[AUTH-ENDPOINT] Received Facebook token login request")
-        print(f"[AUTH-ENDPOINT] Token length: {len(request.token) if request.token else 0}")
-        
-        # Initialize Facebook OAuth service
-        try:
-            facebook_service = FacebookOAuthService()
-        except ValueError as e:
-            print(f"[AUTH-ENDPOINT] Failed to initialize Facebook OAuth service: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Facebook OAuth service not configured properly"
-            )
-        
-        # Verify Facebook token
-        user_info = facebook_service.verify_facebook_token(request.token)
-        
-        if not user_info:
-            print(f"[AUTH-ENDPOINT] Facebook token verification failed")
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid Facebook token or token verification failed"
-            )
-        
-        print(f"[AUTH-ENDPOINT] Facebook token verified for user: {user_info['email']}")
-        
-        user_service = UserService(db)
-        
-        # Check if user exists
-        existing_user = user_service.get_user_by_email(user_info['email'])
-        
-        if existing_user:
-            # User exists, log them in
-            print(f"[AUTH-ENDPOINT] Existing user found: {existing_user.email}")
-            user = existing_user
-        else:
-            # Create new user
-            print(f"[AUTH-ENDPOINT] Creating new user for: {user_info['email']}")
-            user_create = UserCreate(
-                email=user_info['email'],
-                password="",  # No password for OAuth users
-                full_name=user_info['full_name'],
-                role="USER",
-                is_active=True,
-                is_verified=user_info['email_verified']
-            )
-            user = user_service.create_oauth_user(user_create, provider="facebook")
-            print(f"[AUTH-ENDPOINT] New user created with ID: {user.id}")
-        
-        # Create tokens
-        print(f"[AUTH-ENDPOINT] Creating JWT tokens for user ID: {user.id}")
-        access_token = create_access_token(subject=user.id)
-        refresh_token = create_refresh_token(subject=user.id)
-        
-        print(f"[AUTH-ENDPOINT] Facebook authentication successful for: {user.email}")
-        return Token(
-            access_token=access_token,
-            refresh_token=refresh_token,
-            token_type="bearer"
-        )
-        
-    except HTTPException:
-        # Re-raise HTTP exceptions as-is
-        raise
-    except Exception as e:
-        print(f"[AUTH-ENDPOINT] Unexpected error in Facebook token login: {e}")
-        print(f"[AUTH-ENDPOINT] Error type: {type(e).__name__}")
-        import traceback
-        print(f"[AUTH-ENDPOINT] Traceback: {traceback.format_exc()}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Facebook authentication failed: {str(e)}"
-        )
\ No newline at end of file
+    return await oauth_token_login("facebook", request.token, device)
+
+
+# Generic endpoints for providers configured via OIDC_PROVIDERS
+class OAuthTokenRequest(BaseModel):
+    token: str
+
+
+@router.get("/oauth/{provider}")
+async def provider_login(provider: str):
+    """
+    Initiate OAuth login with any configured provider
+    """
+    return await oauth_login(provider)
+
+
+@router.get("/oauth/{provider}/callback")
+async def provider_callback(
+    provider: str,
+    code: str,
+    state: Optional[str] = None,
+    device: dict = Depends(get_device_info)
+):
+    """
+    Handle OAuth callback for any configured provider
+    """
+    return await oauth_callback(provider, code, state, device)
+
+
+@router.post("/oauth/{provider}/token", response_model=Token)
+async def provider_token_login(
+    provider: str,
+    request: OAuthTokenRequest,
+    device: dict = Depends(get_device_info)
+):
+    """
+    Login with a provider token (ID token for OIDC providers)
+    """
+    return await oauth_token_login(provider, request.token, device)
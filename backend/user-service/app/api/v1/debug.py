@@ -0,0 +1,222 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import PlainTextResponse
+from app.core.config import settings
+from app.core.profiling import profiler, ProfiledRoute
+from app.core.memory import memory_tracker
+from app.core.loop_monitor import loop_monitor
+from app.utils.deps import get_current_admin_user
+from app.models.user import User as UserModel
+
+router = APIRouter(route_class=ProfiledRoute)
+
+
+def require_profiling_enabled():
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found"
+        )
+
+
+@router.post("/profile/start", dependencies=[Depends(require_profiling_enabled)])
+def start_profile(
+    duration: Optional[float] = Query(None, gt=0),
+    requests: Optional[int] = Query(None, ge=1),
+    route: Optional[str] = Query(None, description="Only profile paths starting with this prefix"),
+    interval_ms: float = Query(5.0, ge=1.0, le=1000.0),
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """
+    Start sampling the next N matching requests or T seconds (Admin only)
+    """
+    # Always bound the session so a forgotten profile cannot run forever
+    max_duration = settings.PROFILING_MAX_DURATION_SECONDS
+    duration = min(duration, max_duration) if duration else max_duration
+
+    try:
+        session = profiler.start(
+            duration=duration,
+            max_requests=requests,
+            route_prefix=route,
+            interval=interval_ms / 1000.0
+        )
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+
+    return session.to_dict()
+
+
+@router.post("/profile/stop", dependencies=[Depends(require_profiling_enabled)])
+def stop_profile(
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """
+    Stop the running profiling session (Admin only)
+    """
+    session = profiler.stop()
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No profiling session"
+        )
+    return session.to_dict()
+
+
+@router.get("/profile", dependencies=[Depends(require_profiling_enabled)])
+def get_profile_status(
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """
+    Get the state of the current or last profiling session (Admin only)
+    """
+    session = profiler.session
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No profiling session"
+        )
+    return session.to_dict()
+
+
+@router.get("/profile/download", dependencies=[Depends(require_profiling_enabled)])
+def download_profile(
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """
+    Download collected stacks in collapsed (flamegraph) format (Admin only)
+    """
+    session = profiler.session
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No profiling session"
+        )
+
+    filename = f"profile-{int(session.started_at)}.collapsed"
+    return PlainTextResponse(
+        profiler.collapsed(),
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+def require_memory_tracking_enabled():
+    if not settings.MEMORY_TRACKING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found"
+        )
+
+
+@router.post("/memory/start", dependencies=[Depends(require_memory_tracking_enabled)])
+def start_memory_tracking(
+    frames: int = Query(1, ge=1, le=50),
+    sample_rate: int = Query(0, ge=0, description="Snapshot-diff one request in N (0 disables)"),
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """
+    Start tracemalloc-based allocation tracking (Admin only)
+    """
+    try:
+        memory_tracker.start(frames=frames, sample_rate=sample_rate)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    return memory_tracker.status()
+
+
+@router.post("/memory/stop", dependencies=[Depends(require_memory_tracking_enabled)])
+def stop_memory_tracking(
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """
+    Stop allocation tracking and drop stored snapshots (Admin only)
+    """
+    status_data = memory_tracker.status()
+    memory_tracker.stop()
+    return status_data
+
+
+@router.get("/memory", dependencies=[Depends(require_memory_tracking_enabled)])
+def get_memory_status(
+    limit: int = Query(10, ge=1, le=100),
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """
+    Get traced memory, stored snapshots and per-route allocation stats (Admin only)
+    """
+    return memory_tracker.status(limit=limit)
+
+
+@router.post("/memory/snapshots", dependencies=[Depends(require_memory_tracking_enabled)])
+def take_memory_snapshot(
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limit: int = Query(20, ge=1, le=200),
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """
+    Take a snapshot and return its top allocation sites (Admin only)
+    """
+    try:
+        snapshot_id = memory_tracker.take_snapshot()
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    return {
+        "id": snapshot_id,
+        "top": memory_tracker.top(snapshot_id, group_by=group_by, limit=limit)
+    }
+
+
+@router.get("/memory/diff", dependencies=[Depends(require_memory_tracking_enabled)])
+def diff_memory_snapshots(
+    since: int,
+    until: Optional[int] = Query(None, description="Defaults to a new snapshot"),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$"),
+    limit: int = Query(20, ge=1, le=200),
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """
+    Compare two snapshots, largest growth first (Admin only)
+    """
+    if until is None:
+        try:
+            until = memory_tracker.take_snapshot()
+        except RuntimeError as e:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=str(e)
+            )
+
+    stats = memory_tracker.diff(since, until, group_by=group_by, limit=limit)
+    if stats is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Snapshot not found"
+        )
+    return {"since": since, "until": until, "diff": stats}
+
+
+def require_loop_monitor_enabled():
+    if not settings.LOOP_MONITOR_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found"
+        )
+
+
+@router.get("/loop", dependencies=[Depends(require_loop_monitor_enabled)])
+def get_event_loop_stats(
+    current_admin: UserModel = Depends(get_current_admin_user)
+):
+    """
+    Get event loop lag percentiles and recent stalls with stacks (Admin only)
+    """
+    return loop_monitor.stats()
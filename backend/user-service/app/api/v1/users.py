@@ -1,23 +1,88 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from app.db.database import get_db
-from app.schemas.user import User, UserUpdate
+from app.db.database import get_db, SessionLocal
+from app.core.config import settings
+from app.schemas.user import (
+    User, UserUpdate, UserBatchRequest, UserBatchResponse, UserChangesResponse, UserStats, user_adapter, user_list_adapter,
+    USER_FIELDS, partial_user_adapter, partial_user_list_adapter, user_variant
+)
+from app.core.breached_passwords import BreachedPasswordError
+from app.core.responses import adapter_response, conditional_response
 from app.services.user_service import UserService
-from app.utils.deps import get_current_active_user, get_current_admin_user
+from app.services.user_stats_service import UserStatsService
+from app.utils.deps import (
+    get_current_active_user, get_current_admin_user, get_current_admin_principal, get_service_or_admin
+)
+from app.core.principals import Principal
+from app.core.profiling import ProfiledRoute
 from app.models.user import User as UserModel, UserRole
 
-router = APIRouter()
+router = APIRouter(route_class=ProfiledRoute)
+
+
+def get_fieldset(
+    fields: Optional[str] = Query(
+        None, description=f"Comma-separated subset of fields to return: {', '.join(USER_FIELDS)}"
+    )
+) -> Optional[Tuple[str, ...]]:
+    """
+    Parse a sparse fieldset; None means the full representation
+    """
+    if not fields:
+        return None
+
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(USER_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    if not requested:
+        return None
+
+    # Canonical order, so equivalent requests share one cached adapter
+    return tuple(field for field in USER_FIELDS if field in requested)
+
+
+def encode_change_cursor(updated_at: datetime, user_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{updated_at.isoformat()}|{user_id}".encode()).decode()
+
+
+def get_change_cursor(
+    since: Optional[str] = Query(
+        None, description="next_cursor of the previous call; omit to start from the oldest user"
+    )
+) -> Optional[Tuple[datetime, int]]:
+    """
+    Decode an opaque /users/changes cursor into ``(updated_at, id)``
+    """
+    if not since:
+        return None
+    try:
+        updated_at, user_id = base64.urlsafe_b64decode(since.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(updated_at), int(user_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
 
 
 @router.get("/me", response_model=User)
 def get_my_profile(
+    request: Request,
     current_user: UserModel = Depends(get_current_active_user)
 ):
     """
-    Get current user profile
+    Get current user profile; supports If-None-Match
     """
-    return current_user
+    return conditional_response(request, user_adapter, current_user, user_variant())
 
 
 @router.put("/me", response_model=User)
@@ -33,7 +98,7 @@ def update_my_profile(
     
     # Users can only update their own basic info
     allowed_fields = {"full_name", "password"}
-    update_data = user_update.dict(exclude_unset=True)
+    update_data = user_update.model_dump(exclude_unset=True)
     
     # Remove fields that users cannot update themselves
     filtered_update = {k: v for k, v in update_data.items() if k in allowed_fields}
@@ -45,7 +110,13 @@ def update_my_profile(
         )
     
     filtered_user_update = UserUpdate(**filtered_update)
-    updated_user = user_service.update_user(current_user.id, filtered_user_update)
+    try:
+        updated_user = user_service.update_user(current_user.id, filtered_user_update)
+    except BreachedPasswordError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     if not updated_user:
         raise HTTPException(
@@ -60,28 +131,161 @@ def update_my_profile(
 def get_users(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    current_admin: UserModel = Depends(get_current_admin_user),
+    fields: Optional[Tuple[str, ...]] = Depends(get_fieldset),
+    current_admin: Principal = Depends(get_current_admin_principal),
     db: Session = Depends(get_db)
 ):
     """
     Get all users (Admin only)
     """
     user_service = UserService(db)
+    if fields:
+        rows = user_service.get_user_rows(fields, skip=skip, limit=limit)
+        return adapter_response(partial_user_list_adapter(fields), rows)
+
     users = user_service.get_users(skip=skip, limit=limit)
-    return users
+    return adapter_response(user_list_adapter, users)
+
+
+@router.post("/batch", response_model=UserBatchResponse)
+def get_users_batch(
+    batch: UserBatchRequest,
+    fields: Optional[Tuple[str, ...]] = Depends(get_fieldset),
+    current_admin: Optional[Principal] = Depends(get_service_or_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Resolve many user ids or emails in one call (Admin or service key)
+    """
+    key = "id" if batch.ids is not None else "email"
+    values = list(dict.fromkeys(batch.ids if batch.ids is not None else batch.emails))
+    if len(values) > settings.USER_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.USER_BATCH_MAX_SIZE} users per batch"
+        )
+
+    fields = fields or USER_FIELDS
+    user_service = UserService(db)
+    rows = user_service.get_user_rows_by(key, values, fields) if values else []
+
+    # Answer in input order
+    found = {getattr(row, key): row for row in rows}
+    adapter = partial_user_list_adapter(fields)
+    users = adapter.validate_python([found[value] for value in values if value in found], from_attributes=True)
+    return ORJSONResponse({
+        "users": adapter.dump_python(users, mode="json"),
+        "missing": [value for value in values if value not in found]
+    })
+
+
+@router.get("/export", response_class=StreamingResponse)
+def export_users(
+    fields: Optional[Tuple[str, ...]] = Depends(get_fieldset),
+    current_admin: Principal = Depends(get_current_admin_principal)
+):
+    """
+    All users as newline-delimited JSON, streamed (Admin only)
+
+    Rows are read and sent in batches, so memory stays flat however many
+    users there are; the response is compressed as it streams.
+    """
+    fields = fields or USER_FIELDS
+    adapter = partial_user_adapter(fields)
+
+    def lines():
+        # Own session: the stream outlives the request's dependencies
+        db = SessionLocal()
+        try:
+            for rows in UserService(db).iter_user_rows(fields, batch_size=settings.USER_EXPORT_BATCH_SIZE):
+                yield b"".join(
+                    adapter.dump_json(adapter.validate_python(row, from_attributes=True)) + b"\n" for row in rows
+                )
+        finally:
+            db.close()
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="users.ndjson"'}
+    )
+
+
+@router.get("/changes", response_model=UserChangesResponse)
+def get_user_changes(
+    since: Optional[Tuple[datetime, int]] = Depends(get_change_cursor),
+    limit: int = Query(100, ge=1, le=1000),
+    current_admin: Optional[Principal] = Depends(get_service_or_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Users created or modified since a cursor (Admin or service key)
+
+    Deactivated users come back as tombstones. Keep calling with
+    ``next_cursor`` while ``has_more`` is true, then poll with the last one.
+    """
+    settled_before = datetime.now(timezone.utc) - timedelta(seconds=settings.USER_CHANGES_SETTLE_SECONDS)
+    # One extra row tells whether another page follows
+    rows = UserService(db).get_changed_user_rows(since, settled_before, limit=limit + 1)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    if rows:
+        next_cursor = encode_change_cursor(rows[-1].updated_at, rows[-1].id)
+    else:
+        next_cursor = encode_change_cursor(*since) if since else None
+
+    users = user_list_adapter.validate_python([row for row in rows if row.is_active], from_attributes=True)
+    return ORJSONResponse({
+        "users": user_list_adapter.dump_python(users, mode="json"),
+        "tombstones": [
+            {"id": row.id, "updated_at": row.updated_at.isoformat()} for row in rows if not row.is_active
+        ],
+        "next_cursor": next_cursor,
+        "has_more": has_more
+    })
+
+
+@router.get("/stats", response_model=UserStats)
+def get_user_stats(
+    days: int = Query(30, ge=1, le=settings.USER_STATS_SIGNUP_DAYS, description="Days of daily signups, up to today"),
+    current_admin: Optional[Principal] = Depends(get_service_or_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    User counts by role, status and signup day, from maintained counters (Admin or service key)
+    """
+    return UserStatsService(db).get_stats(days)
+
+
+@router.post("/stats/reconcile")
+def reconcile_user_stats(
+    current_admin: Principal = Depends(get_current_admin_principal),
+    db: Session = Depends(get_db)
+):
+    """
+    Recount the user stats from the users table now; returns the corrections (Admin only)
+    """
+    corrections = UserStatsService(db).reconcile(settings.USER_STATS_SIGNUP_DAYS)
+    return {"corrections": corrections}
 
 
 @router.get("/{user_id}", response_model=User)
 def get_user(
     user_id: int,
-    current_admin: UserModel = Depends(get_current_admin_user),
+    request: Request,
+    fields: Optional[Tuple[str, ...]] = Depends(get_fieldset),
+    current_admin: Principal = Depends(get_current_admin_principal),
     db: Session = Depends(get_db)
 ):
     """
-    Get user by ID (Admin only)
+    Get user by ID (Admin only); supports If-None-Match
     """
     user_service = UserService(db)
-    user = user_service.get_user_by_id(user_id)
+    if fields:
+        user = user_service.get_user_row_by_id(user_id, fields)
+    else:
+        user = user_service.get_user_by_id(user_id)
     
     if not user:
         raise HTTPException(
@@ -89,7 +293,9 @@ def get_user(
             detail="User not found"
         )
     
-    return user
+    if fields:
+        return conditional_response(request, partial_user_adapter(fields), user, user_variant(fields))
+    return conditional_response(request, user_adapter, user, user_variant())
 
 
 @router.put("/{user_id}", response_model=User)
@@ -103,7 +309,13 @@ def update_user(
     Update user by ID (Admin only)
     """
     user_service = UserService(db)
-    updated_user = user_service.update_user(user_id, user_update)
+    try:
+        updated_user = user_service.update_user(user_id, user_update)
+    except BreachedPasswordError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     if not updated_user:
         raise HTTPException(
@@ -0,0 +1,176 @@
+import hashlib
+import math
+import mmap
+import struct
+import threading
+from typing import Optional
+import structlog
+from app.core.config import settings
+from app.core.metrics import breached_password_checks_total
+
+logger = structlog.get_logger()
+
+MAGIC = b"BPWF"
+VERSION = 1
+# magic, version, hashes per key, blocks, keys, target error rate; padded so
+# the bit array starts on a cache line
+HEADER = struct.Struct("<4sHHQQd")
+HEADER_SIZE = 64
+BLOCK_BYTES = 64
+BLOCK_BITS = BLOCK_BYTES * 8
+# Digest bytes that pick the block; the rest are cut into probes
+BLOCK_INDEX_BYTES = 5
+PROBE_BITS = 9
+
+
+class BreachedPasswordError(Exception):
+    """Raised when a new password is in the breached password filter"""
+
+
+def sha1_digest(password: str) -> bytes:
+    return hashlib.sha1(password.encode()).digest()
+
+
+def blocked_error_rate(bits_per_key: float, num_hashes: int) -> float:
+    """
+    False positive rate of a blocked Bloom filter
+
+    Keys spread over blocks unevenly (Poisson), and the fuller blocks
+    dominate the error, so it is worse than a classic filter of the same size.
+    """
+    mean = BLOCK_BITS / bits_per_key
+    rate = 0.0
+    probability = math.exp(-mean)
+    for keys in range(int(mean + 10 * math.sqrt(mean) + 20)):
+        if keys:
+            probability *= mean / keys
+        rate += probability * (1 - (1 - 1 / BLOCK_BITS) ** (num_hashes * keys)) ** num_hashes
+    return rate
+
+
+def filter_geometry(capacity: int, error_rate: float):
+    """Blocks and hashes per key for ``capacity`` keys at ``error_rate`` or better"""
+    capacity = max(1, capacity)
+    bits_per_key = -math.log(error_rate) / (math.log(2) ** 2)
+    while True:
+        num_hashes = min(16, max(1, int(round(bits_per_key * math.log(2)))))
+        if blocked_error_rate(bits_per_key, num_hashes) <= error_rate:
+            break
+        bits_per_key *= 1.02
+    num_blocks = max(1, int(math.ceil(capacity * bits_per_key / BLOCK_BITS)))
+    return num_blocks, num_hashes
+
+
+def probes(digest: bytes, num_blocks: int, num_hashes: int):
+    """
+    The block and the bit offsets within it that stand for a SHA-1 digest
+
+    The digest is already uniformly distributed, so its bytes are used
+    directly: the first five pick the block and every following nine bits
+    are one probe. More probes than the digest has bits for continue on a
+    BLAKE2b of it.
+    """
+    block = int.from_bytes(digest[:BLOCK_INDEX_BYTES], "little") % num_blocks
+    stream = digest[BLOCK_INDEX_BYTES:]
+    if num_hashes * PROBE_BITS > len(stream) * 8:
+        stream += hashlib.blake2b(digest, digest_size=16).digest()
+    bits = int.from_bytes(stream, "little")
+    return block, [(bits >> (i * PROBE_BITS)) & (BLOCK_BITS - 1) for i in range(num_hashes)]
+
+
+class BreachedPasswordFilter:
+    """
+    Read-only, memory-mapped blocked Bloom filter of breached password hashes
+
+    Every key maps to one 64-byte block, so a lookup touches a single cache
+    line and at most one page of the file. The file is mapped, not read:
+    pages load on first use and live in the page cache, where all worker
+    processes share them. Built by ``scripts/build_breached_password_filter.py``.
+    False positives (a safe password reported as breached) happen at about
+    the error rate the file was built with; there are no false negatives.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.num_hashes, self.num_blocks, self.count, self.error_rate = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a breached password filter (version {VERSION})")
+        if len(self._map) < HEADER_SIZE + self.num_blocks * BLOCK_BYTES:
+            self._map.close()
+            raise ValueError(f"{path} is truncated")
+        self.path = path
+        if hasattr(mmap, "MADV_RANDOM"):
+            # Lookups jump around; readahead would only pull in unused pages
+            self._map.madvise(mmap.MADV_RANDOM)
+
+    def contains_digest(self, digest: bytes) -> bool:
+        block, offsets = probes(digest, self.num_blocks, self.num_hashes)
+        base = HEADER_SIZE + block * BLOCK_BYTES
+        data = self._map
+        for offset in offsets:
+            if not data[base + (offset >> 3)] & (1 << (offset & 7)):
+                return False
+        return True
+
+    def __contains__(self, password: str) -> bool:
+        return self.contains_digest(sha1_digest(password))
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._map)
+
+    def close(self) -> None:
+        self._map.close()
+
+
+class BreachedPasswordChecker:
+    """
+    Checks new passwords against the filter at ``path``, if one is configured
+
+    The file is opened on first use (or at startup) in each process. A
+    missing or unreadable file is logged and treated as an empty list, so a
+    bad deploy does not block registrations.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._filter: Optional[BreachedPasswordFilter] = None
+        self._failed = False
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def open(self) -> Optional[BreachedPasswordFilter]:
+        if self._filter is not None or self._failed or not self.path:
+            return self._filter
+        with self._lock:
+            if self._filter is None and not self._failed:
+                try:
+                    self._filter = BreachedPasswordFilter(self.path)
+                    logger.info(
+                        "Breached password filter loaded",
+                        path=self.path, keys=self._filter.count, size_bytes=self._filter.size_bytes
+                    )
+                except (OSError, ValueError) as e:
+                    self._failed = True
+                    logger.error("Breached password filter unavailable", path=self.path, error=str(e))
+        return self._filter
+
+    def is_breached(self, password: str) -> bool:
+        bloom = self.open()
+        if bloom is None:
+            return False
+        breached = password in bloom
+        breached_password_checks_total.labels(outcome="breached" if breached else "clean").inc()
+        return breached
+
+    def check(self, password: str) -> None:
+        if self.is_breached(password):
+            raise BreachedPasswordError("This password has appeared in a data breach; choose a different one")
+
+
+breached_passwords = BreachedPasswordChecker(settings.BREACHED_PASSWORD_FILTER_PATH)
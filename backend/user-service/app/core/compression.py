@@ -0,0 +1,214 @@
+import zlib
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, Iterable, Optional
+import brotli
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.metrics import compressed_responses_total
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class Encoder(ABC):
+    """Incremental compressor for one response"""
+
+    @abstractmethod
+    def compress(self, data: bytes) -> bytes:
+        ...
+
+    @abstractmethod
+    def flush(self) -> bytes:
+        """Everything compressed so far, decodable by the client right away"""
+
+    @abstractmethod
+    def finish(self) -> bytes:
+        ...
+
+
+class GzipEncoder(Encoder):
+    def __init__(self, level: int):
+        # wbits 16 + 15: gzip container
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder(Encoder):
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality, mode=brotli.MODE_TEXT)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder(Encoder):
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+# In order of preference when the client accepts several equally
+ENCODERS: Dict[str, Callable[[], Encoder]] = {
+    "zstd": lambda: ZstdEncoder(settings.COMPRESSION_ZSTD_LEVEL),
+    "br": lambda: BrotliEncoder(settings.COMPRESSION_BROTLI_QUALITY),
+    "gzip": lambda: GzipEncoder(settings.COMPRESSION_GZIP_LEVEL),
+}
+
+
+def negotiate(accept_encoding: Optional[str], available: Iterable[str] = ENCODERS) -> Optional[str]:
+    """
+    Pick the encoding for an Accept-Encoding header, None for identity
+
+    Highest q-value wins; ties go to the order of ``available``.
+    """
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for name in available:
+        weight = weights.get(name, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = name, weight
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Compress JSON and text responses with the best encoding the client accepts
+
+    Bodies sent in one piece are compressed only from ``minimum_size``
+    bytes; below that the CPU is not worth the few bytes saved. Streamed
+    bodies (exports) are always compressed, chunk by chunk, and flushed
+    after every chunk so the client can decode as they arrive. Paths under
+    ``excluded_paths`` (auth: small responses carrying secrets) are never
+    compressed.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, excluded_paths: Iterable[str] = ()):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.excluded_paths = tuple(excluded_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.excluded_paths):
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await CompressedResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class CompressedResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.start_message: Optional[Message] = None
+        self.encoder: Optional[Encoder] = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether to compress
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 304)
+                or not content_type.startswith(COMPRESSIBLE_TYPES)
+            )
+            if not self.passthrough:
+                MutableHeaders(raw=message["headers"]).add_vary_header("Accept-Encoding")
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            await self._send_start()
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self._send_start()
+                await self.send(message)
+                return
+
+            self.encoder = ENCODERS[self.encoding]()
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            # A strong ETag names the identity bytes; the compressed body only matches weakly
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag
+            if more_body:
+                del headers["Content-Length"]
+            compressed_responses_total.labels(encoding=self.encoding).inc()
+
+        if more_body:
+            chunk = self.encoder.compress(body) + self.encoder.flush()
+        else:
+            chunk = self.encoder.compress(body) + self.encoder.finish()
+            if self.start_message is not None:
+                # Whole body in one message: the length is known
+                MutableHeaders(raw=self.start_message["headers"])["Content-Length"] = str(len(chunk))
+
+        await self._send_start()
+        if chunk or not more_body:
+            await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+    async def _send_start(self) -> None:
+        if self.start_message is not None:
+            await self.send(self.start_message)
+            self.start_message = None
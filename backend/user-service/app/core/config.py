@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic_settings import BaseSettings
 import os
 
@@ -17,10 +17,33 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     JWT_ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     JWT_REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # A refresh token rotated out this recently still gets its successor
+    # pair (concurrent refreshes, client retries) instead of counting as reuse
+    REFRESH_TOKEN_REUSE_GRACE_SECONDS: int = 10
+    # Embed role/status in access tokens and authorize read-only endpoints
+    # without loading the user; revocation is checked against token versions
+    STATELESS_PRINCIPALS_ENABLED: bool = False
+    TOKEN_VERSION_REFRESH_SECONDS: float = 5.0
+    # In-process Bloom filter of revoked access token ids
+    REVOKED_TOKEN_FILTER_CAPACITY: int = 100000
+    REVOKED_TOKEN_FILTER_ERROR_RATE: float = 0.001
+    REVOKED_TOKEN_SYNC_SECONDS: float = 5.0
+    REVOKED_TOKEN_REBUILD_SECONDS: float = 900.0
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # User change events: written to an outbox table with each change and
+    # relayed to a Redis Stream. Opt-in: needs Redis
+    OUTBOX_RELAY_ENABLED: bool = False
+    OUTBOX_STREAM: str = "user-events"
+    OUTBOX_STREAM_MAXLEN: int = 100000
+    # Consumer groups created (from the start of the stream) by the relay
+    OUTBOX_CONSUMER_GROUPS: str = "admin-service,agent-management-service"
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_RETENTION_HOURS: int = 24
+    
     # CORS
     BACKEND_CORS_ORIGINS: str = "http://localhost:3000,http://localhost:8080,http://localhost:12000,https://work-1-ronzwqiudyvspcyo.prod-runtime.all-hands.dev,https://work-2-ronzwqiudyvspcyo.prod-runtime.all-hands.dev"
     
@@ -29,6 +52,68 @@ class Settings(BaseSettings):
     
     # Security
     BCRYPT_ROUNDS: int = 12
+    # Comma-separated keys other services send as X-Service-Key
+    SERVICE_API_KEYS: str = ""
+    # Filter file from scripts/build_breached_password_filter.py; new
+    # passwords found in it are rejected. Unset disables the check.
+    BREACHED_PASSWORD_FILTER_PATH: Optional[str] = None
+    
+    # Batch lookups
+    USER_BATCH_MAX_SIZE: int = 1000
+
+    # Delta sync (GET /users/changes): changes younger than this are held
+    # back, so a transaction that commits late is not skipped by a cursor
+    USER_CHANGES_SETTLE_SECONDS: float = 5.0
+
+    # Rendered user responses kept per process, keyed by ETag
+    RESPONSE_CACHE_SIZE: int = 10000
+
+    # Response compression (zstd, br or gzip, as the client accepts)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+    USER_EXPORT_BATCH_SIZE: int = 1000
+
+    # User stats (GET /users/stats): counters are recounted from the users
+    # table this often, and daily signups are kept for this many days.
+    # Opt-in: every worker counts the users table at startup
+    USER_STATS_RECONCILE_ENABLED: bool = False
+    USER_STATS_RECONCILE_SECONDS: float = 3600.0
+    USER_STATS_SIGNUP_DAYS: int = 90
+    
+    # Diagnostics (admin-only debug endpoints)
+    PROFILING_ENABLED: bool = False
+    PROFILING_MAX_DURATION_SECONDS: int = 300
+    MEMORY_TRACKING_ENABLED: bool = False
+    LOOP_MONITOR_ENABLED: bool = True
+    LOOP_MONITOR_INTERVAL_SECONDS: float = 0.1
+    LOOP_MONITOR_THRESHOLD_SECONDS: float = 0.25
+    
+    # Metrics
+    METRICS_ENABLED: bool = True
+    
+    # Load shedding: per route class adaptive concurrency limits (AIMD on
+    # latency) with a bounded wait queue; excess requests get a fast 503.
+    # Opt-in: the limits need tuning to the deployment
+    LOAD_SHEDDING_ENABLED: bool = False
+    LOAD_SHEDDING_QUEUE_SIZE: int = 100
+    LOAD_SHEDDING_QUEUE_TIMEOUT_SECONDS: float = 1.0
+    HASHING_CONCURRENCY_LIMIT: int = 4
+    HASHING_CONCURRENCY_MIN: int = 1
+    HASHING_CONCURRENCY_MAX: int = 16
+    HASHING_TARGET_LATENCY_SECONDS: float = 1.0
+    DEFAULT_CONCURRENCY_LIMIT: int = 32
+    DEFAULT_CONCURRENCY_MIN: int = 8
+    DEFAULT_CONCURRENCY_MAX: int = 128
+    DEFAULT_TARGET_LATENCY_SECONDS: float = 0.25
+    # Threads for sync endpoints and dependencies (AnyIO's default is 40)
+    THREADPOOL_SIZE: int = 40
+    
+    # Coalesce concurrent identical token verifications, user lookups and
+    # OAuth code exchanges into one call
+    SINGLE_FLIGHT_ENABLED: bool = True
     
     # OAuth Configuration
     GOOGLE_CLIENT_ID: Optional[str] = None
@@ -36,8 +121,23 @@ class Settings(BaseSettings):
     FACEBOOK_APP_ID: Optional[str] = None
     FACEBOOK_APP_SECRET: Optional[str] = None
     OAUTH_REDIRECT_URI: str = "http://localhost:8080/api/v1/auth/google/callback"
+    OAUTH_HTTP_TIMEOUT_SECONDS: float = 5.0
+    OAUTH_REQUEST_DEADLINE_SECONDS: float = 10.0
+    OAUTH_MAX_RETRIES: int = 2
+    OAUTH_RETRY_BACKOFF_SECONDS: float = 0.2
+    OAUTH_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    OAUTH_CIRCUIT_RESET_SECONDS: float = 30.0
+    OAUTH_HTTP_MAX_CONNECTIONS: int = 100
+    GOOGLE_DISCOVERY_URL: str = "https://accounts.google.com/.well-known/openid-configuration"
+    FACEBOOK_GRAPH_URL: str = "https://graph.facebook.com"
+    FACEBOOK_AUTHORIZATION_URL: str = "https://www.facebook.com/v18.0/dialog/oauth"
+    OIDC_DISCOVERY_TTL_SECONDS: int = 86400
+    OIDC_REFRESH_MARGIN_SECONDS: int = 300
+    # Extra OpenID Connect providers as JSON, e.g.
+    # {"okta": {"client_id": "...", "client_secret": "...", "discovery_url": "..."}}
+    OIDC_PROVIDERS: Dict[str, Dict[str, Any]] = {}
     
-    # Email (for future use)
+    # Email
     SMTP_TLS: bool = True
     SMTP_PORT: Optional[int] = None
     SMTP_HOST: Optional[str] = None
@@ -45,6 +145,18 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: Optional[str] = None
     EMAILS_FROM_EMAIL: Optional[str] = None
     EMAILS_FROM_NAME: Optional[str] = None
+    # Outbound mail queue: messages are spooled in the database and sent by
+    # background workers (only started when SMTP_HOST is set)
+    EMAIL_QUEUE_ENABLED: bool = True
+    EMAIL_WORKERS: int = 2
+    EMAIL_BATCH_SIZE: int = 20
+    EMAIL_POLL_INTERVAL_SECONDS: float = 5.0
+    EMAIL_MAX_ATTEMPTS: int = 8
+    EMAIL_RETRY_BACKOFF_SECONDS: float = 30.0
+    EMAIL_RETRY_BACKOFF_MAX_SECONDS: float = 3600.0
+    EMAIL_LEASE_SECONDS: float = 300.0
+    SMTP_TIMEOUT_SECONDS: float = 10.0
+    SMTP_IDLE_TIMEOUT_SECONDS: float = 60.0
 
     model_config = {
         "env_file": ".env",
@@ -0,0 +1,231 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Optional, Dict
+import structlog
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.metrics import concurrency_limit, concurrency_in_flight, load_shed_requests_total
+
+logger = structlog.get_logger()
+
+
+class Overloaded(Exception):
+    """Raised when a request cannot get a slot in time; carries a Retry-After hint"""
+
+    def __init__(self, route_class: str, reason: str, retry_after: float):
+        super().__init__(f"{route_class} requests are over capacity ({reason})")
+        self.route_class = route_class
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for one class of routes that adapts to observed latency.
+
+    At most ``limit`` requests of the class run at once; up to ``max_queue``
+    more wait in FIFO order, each for at most ``queue_timeout`` seconds.
+    Anything beyond that is rejected immediately instead of piling up in the
+    threadpool. The limit follows AIMD on the smoothed request latency:
+    while it stays under ``target_latency`` and the limit is actually being
+    used, it grows by about one per ``limit`` completed requests; once it
+    goes over, the limit shrinks by ``backoff`` at most once per observed
+    latency. Runs on the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        target_latency: float,
+        max_queue: int = 100,
+        queue_timeout: float = 1.0,
+        backoff: float = 0.9,
+        smoothing: float = 0.1
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.target_latency = target_latency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.in_flight = 0
+        self.latency: Optional[float] = None
+        self._waiters: deque = deque()
+        self._last_decrease = 0.0
+        concurrency_limit.labels(route_class=name).set(self.limit)
+
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self._started()
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            raise self._overloaded("queue_full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise self._overloaded("queue_timeout")
+        except asyncio.CancelledError:
+            # Pass on a slot handed to us as we were cancelled
+            if waiter.done() and not waiter.cancelled():
+                self.release(None)
+            raise
+        finally:
+            if not waiter.done() or waiter.cancelled():
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+
+    def release(self, latency: Optional[float]) -> None:
+        """
+        Free a slot; ``latency`` is the request's duration, None when it did not run
+        """
+        self.in_flight -= 1
+        if latency is not None:
+            self._adapt(latency)
+        concurrency_in_flight.labels(route_class=self.name).set(self.in_flight)
+        self._wake()
+
+    def _started(self) -> None:
+        self.in_flight += 1
+        concurrency_in_flight.labels(route_class=self.name).set(self.in_flight)
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._started()
+                waiter.set_result(None)
+
+    def _adapt(self, latency: float) -> None:
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.smoothing * (latency - self.latency)
+
+        now = time.monotonic()
+        if self.latency > self.target_latency:
+            # One decrease per round trip, not one per slow response
+            if now - self._last_decrease >= self.latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.in_flight + 1 >= int(self.limit):
+            # Only grow while the limit is what holds requests back
+            self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        concurrency_limit.labels(route_class=self.name).set(self.limit)
+
+    def _overloaded(self, reason: str) -> Overloaded:
+        load_shed_requests_total.labels(route_class=self.name, reason=reason).inc()
+        # Roughly how long the current queue takes to drain
+        latency = self.latency or self.target_latency
+        retry_after = max(1.0, math.ceil(len(self._waiters) * latency / max(1.0, self.limit)))
+        return Overloaded(self.name, reason, retry_after)
+
+
+class LoadShedder:
+    """
+    Routes requests to the limiter of their route class.
+
+    Password hashing routes get their own small limit, so a burst of logins
+    cannot starve reads of threadpool slots (and the other way round). Health
+    checks, metrics and docs are never limited.
+    """
+
+    def __init__(self, limiters: Dict[str, AdaptiveLimiter], hashing_paths, exempt_paths):
+        self.limiters = limiters
+        self.hashing_paths = frozenset(hashing_paths)
+        self.exempt_paths = tuple(exempt_paths)
+
+    def limiter_for(self, path: str) -> Optional[AdaptiveLimiter]:
+        if path == "/" or path.startswith(self.exempt_paths):
+            return None
+        if path in self.hashing_paths:
+            return self.limiters["hashing"]
+        return self.limiters["default"]
+
+
+class LoadSheddingMiddleware:
+    """
+    Run each request under its route class's limiter; over capacity it gets a 503
+
+    The slot is held until the whole response has been sent, streamed bodies
+    (exports) included, so they count against the limit for as long as they
+    keep a worker busy. The latency the limit adapts to is the time to the
+    response's first byte: a long download is not a slow server.
+    """
+
+    def __init__(self, app: ASGIApp, shedder: LoadShedder):
+        self.app = app
+        self.shedder = shedder
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limiter = self.shedder.limiter_for(scope["path"]) if scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except Overloaded as e:
+            logger.warning("Request shed", route_class=e.route_class, reason=e.reason, path=scope["path"])
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Service is overloaded, please retry later"},
+                headers={"Retry-After": str(int(e.retry_after))}
+            )
+            await response(scope, receive, send)
+            return
+
+        start_time = time.monotonic()
+        latency = None
+
+        async def send_timed(message: Message) -> None:
+            nonlocal latency
+            if message["type"] == "http.response.start":
+                latency = time.monotonic() - start_time
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            # Errors before a response count as slow so a failing dependency also lowers the limit
+            limiter.release(latency if latency is not None else limiter.target_latency * 2)
+
+
+load_shedder = LoadShedder(
+    limiters={
+        "hashing": AdaptiveLimiter(
+            "hashing",
+            initial_limit=settings.HASHING_CONCURRENCY_LIMIT,
+            min_limit=settings.HASHING_CONCURRENCY_MIN,
+            max_limit=settings.HASHING_CONCURRENCY_MAX,
+            target_latency=settings.HASHING_TARGET_LATENCY_SECONDS,
+            max_queue=settings.LOAD_SHEDDING_QUEUE_SIZE,
+            queue_timeout=settings.LOAD_SHEDDING_QUEUE_TIMEOUT_SECONDS
+        ),
+        "default": AdaptiveLimiter(
+            "default",
+            initial_limit=settings.DEFAULT_CONCURRENCY_LIMIT,
+            min_limit=settings.DEFAULT_CONCURRENCY_MIN,
+            max_limit=settings.DEFAULT_CONCURRENCY_MAX,
+            target_latency=settings.DEFAULT_TARGET_LATENCY_SECONDS,
+            max_queue=settings.LOAD_SHEDDING_QUEUE_SIZE,
+            queue_timeout=settings.LOAD_SHEDDING_QUEUE_TIMEOUT_SECONDS
+        )
+    },
+    hashing_paths=[f"{settings.API_V1_STR}/auth/register", f"{settings.API_V1_STR}/auth/login"],
+    exempt_paths=["/health", "/metrics", "/docs", "/redoc", f"{settings.API_V1_STR}/openapi.json", f"{settings.API_V1_STR}/debug"]
+)
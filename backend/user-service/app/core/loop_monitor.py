@@ -0,0 +1,128 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Optional, Dict, Any, List
+import structlog
+from app.core.config import settings
+from app.core.metrics import event_loop_lag_seconds, event_loop_stalls_total
+
+logger = structlog.get_logger()
+
+
+class EventLoopMonitor:
+    """
+    Measures event loop scheduling delay and catches blocking calls.
+
+    A coroutine on the loop sleeps for ``interval`` and records how late it
+    woke up. A watchdog thread checks that coroutine's heartbeat; when the
+    loop has not come back for longer than ``threshold`` it grabs the loop
+    thread's stack at that moment, which points straight at the sync call
+    (``requests.get``, a DB query, ``print`` to a blocked pipe) holding it.
+    """
+
+    def __init__(self, interval: float = 0.1, threshold: float = 0.25, max_stalls: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self._lags: deque = deque(maxlen=1000)
+        self._stalls: deque = deque(maxlen=max_stalls)
+        self._max_lag = 0.0
+        self._samples = 0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name="event-loop-watchdog", daemon=True)
+        self._watchdog.start()
+        logger.info("Event loop monitor started", interval=self.interval, threshold=self.threshold)
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _measure(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            self._heartbeat = now
+            self._samples += 1
+            self._lags.append(lag)
+            self._max_lag = max(self._max_lag, lag)
+            event_loop_lag_seconds.observe(lag)
+
+    def _watch(self) -> None:
+        reported_heartbeat = None
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            blocked_for = time.monotonic() - heartbeat - self.interval
+            if blocked_for < self.threshold or heartbeat == reported_heartbeat:
+                continue
+
+            # Report each stall once, with the stack as it is while blocked
+            reported_heartbeat = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.format_stack(frame) if frame is not None else []
+            stall = {
+                "detected_at": time.time(),
+                "blocked_for": blocked_for,
+                "stack": [line.rstrip() for line in stack]
+            }
+            self._stalls.append(stall)
+            event_loop_stalls_total.inc()
+            logger.warning(
+                "Event loop blocked",
+                blocked_for=blocked_for,
+                stack="".join(stack)
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        lags: List[float] = sorted(self._lags)
+
+        def percentile(p: float) -> float:
+            if not lags:
+                return 0.0
+            return lags[min(len(lags) - 1, int(p * len(lags)))]
+
+        return {
+            "running": self.running,
+            "interval": self.interval,
+            "threshold": self.threshold,
+            "samples": self._samples,
+            "max_lag": self._max_lag,
+            "recent": {
+                "count": len(lags),
+                "p50": percentile(0.50),
+                "p99": percentile(0.99),
+                "max": lags[-1] if lags else 0.0
+            },
+            "stalls": list(self._stalls)
+        }
+
+
+loop_monitor = EventLoopMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL_SECONDS,
+    threshold=settings.LOOP_MONITOR_THRESHOLD_SECONDS
+)
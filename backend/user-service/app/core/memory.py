@@ -0,0 +1,211 @@
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Optional, Dict, Any, List
+import structlog
+
+logger = structlog.get_logger()
+
+# Allocations made by tracemalloc, by this module's own bookkeeping and by the
+# import machinery are noise when looking for leaks in request handling.
+SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def format_stats(stats, limit: int) -> List[Dict[str, Any]]:
+    rows = []
+    for stat in stats[:limit]:
+        frame = stat.traceback[0]
+        row = {
+            "file": frame.filename,
+            "line": frame.lineno,
+            "size": stat.size,
+            "count": stat.count
+        }
+        if hasattr(stat, "size_diff"):
+            row["size_diff"] = stat.size_diff
+            row["count_diff"] = stat.count_diff
+        rows.append(row)
+    return rows
+
+
+class RouteMemoryStats:
+    def __init__(self):
+        self.requests = 0
+        self.bytes_delta = 0
+        self.blocks_delta = 0
+        self.max_bytes_delta = 0
+        self.sampled = 0
+        self.sites: Dict[tuple, List[int]] = {}
+
+    def to_dict(self, limit: int) -> Dict[str, Any]:
+        top_sites = sorted(self.sites.items(), key=lambda item: item[1][0], reverse=True)
+        return {
+            "requests": self.requests,
+            "avg_bytes_delta": self.bytes_delta / self.requests if self.requests else 0,
+            "avg_blocks_delta": self.blocks_delta / self.requests if self.requests else 0,
+            "max_bytes_delta": self.max_bytes_delta,
+            "sampled_requests": self.sampled,
+            "top_sites": [
+                {"file": file, "line": line, "size_diff": size, "count_diff": count}
+                for (file, line), (size, count) in top_sites[:limit]
+            ]
+        }
+
+
+class MemoryTracker:
+    """
+    Runtime-toggleable tracemalloc instrumentation.
+
+    While tracking, every request records the net change in traced bytes and
+    in allocated blocks, aggregated per route. One request in
+    ``sample_rate`` additionally takes a snapshot before and after the handler
+    and folds the diff into that route's top allocation sites. All numbers
+    are process-wide, so concurrent requests on the same worker blur into
+    each other; the per-route averages are still good at pointing at the
+    code path that keeps growing.
+    """
+
+    def __init__(self, max_snapshots: int = 10):
+        self._lock = threading.Lock()
+        self._max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[int, tracemalloc.Snapshot]" = OrderedDict()
+        self._snapshot_times: Dict[int, float] = {}
+        self._next_snapshot_id = 1
+        self._routes: Dict[str, RouteMemoryStats] = {}
+        self._request_counter = 0
+        self.sample_rate = 0
+        self.started_at: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int = 1, sample_rate: int = 0) -> None:
+        if self.active:
+            raise RuntimeError("Memory tracking is already running")
+        with self._lock:
+            self._routes.clear()
+            self._snapshots.clear()
+            self._snapshot_times.clear()
+            self._request_counter = 0
+            self.sample_rate = sample_rate
+            self.started_at = time.time()
+        tracemalloc.start(frames)
+        logger.info("Memory tracking started", frames=frames, sample_rate=sample_rate)
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        with self._lock:
+            # Snapshots keep every traced block alive in memory
+            self._snapshots.clear()
+            self._snapshot_times.clear()
+        logger.info("Memory tracking stopped")
+
+    def take_snapshot(self) -> int:
+        if not self.active:
+            raise RuntimeError("Memory tracking is not running")
+        snapshot = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        with self._lock:
+            snapshot_id = self._next_snapshot_id
+            self._next_snapshot_id += 1
+            self._snapshots[snapshot_id] = snapshot
+            self._snapshot_times[snapshot_id] = time.time()
+            while len(self._snapshots) > self._max_snapshots:
+                evicted, _ = self._snapshots.popitem(last=False)
+                self._snapshot_times.pop(evicted, None)
+        return snapshot_id
+
+    def get_snapshot(self, snapshot_id: int) -> Optional[tracemalloc.Snapshot]:
+        with self._lock:
+            return self._snapshots.get(snapshot_id)
+
+    def top(self, snapshot_id: int, group_by: str = "lineno", limit: int = 20) -> Optional[List[Dict[str, Any]]]:
+        snapshot = self.get_snapshot(snapshot_id)
+        if snapshot is None:
+            return None
+        return format_stats(snapshot.statistics(group_by), limit)
+
+    def diff(
+        self,
+        old_id: int,
+        new_id: int,
+        group_by: str = "lineno",
+        limit: int = 20
+    ) -> Optional[List[Dict[str, Any]]]:
+        old = self.get_snapshot(old_id)
+        new = self.get_snapshot(new_id)
+        if old is None or new is None:
+            return None
+        return format_stats(new.compare_to(old, group_by), limit)
+
+    def begin_request(self) -> Optional[Dict[str, Any]]:
+        if not self.active:
+            return None
+        with self._lock:
+            self._request_counter += 1
+            sampled = bool(self.sample_rate) and self._request_counter % self.sample_rate == 0
+        state = {
+            "bytes": tracemalloc.get_traced_memory()[0],
+            "blocks": sys.getallocatedblocks(),
+            "snapshot": None
+        }
+        if sampled:
+            state["snapshot"] = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+        return state
+
+    def end_request(self, route: str, state: Dict[str, Any]) -> None:
+        if not self.active:
+            return
+        bytes_delta = tracemalloc.get_traced_memory()[0] - state["bytes"]
+        blocks_delta = sys.getallocatedblocks() - state["blocks"]
+        diff = None
+        if state["snapshot"] is not None:
+            after = tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+            diff = after.compare_to(state["snapshot"], "lineno")
+
+        with self._lock:
+            stats = self._routes.setdefault(route, RouteMemoryStats())
+            stats.requests += 1
+            stats.bytes_delta += bytes_delta
+            stats.blocks_delta += blocks_delta
+            stats.max_bytes_delta = max(stats.max_bytes_delta, bytes_delta)
+            if diff is not None:
+                stats.sampled += 1
+                for stat in diff:
+                    if stat.size_diff <= 0:
+                        continue
+                    frame = stat.traceback[0]
+                    site = stats.sites.setdefault((frame.filename, frame.lineno), [0, 0])
+                    site[0] += stat.size_diff
+                    site[1] += stat.count_diff
+
+    def status(self, limit: int = 10) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory() if self.active else (0, 0)
+        with self._lock:
+            routes = {route: stats.to_dict(limit) for route, stats in self._routes.items()}
+            snapshots = [
+                {"id": snapshot_id, "taken_at": self._snapshot_times[snapshot_id]}
+                for snapshot_id in self._snapshots
+            ]
+        return {
+            "active": self.active,
+            "started_at": self.started_at,
+            "traceback_limit": tracemalloc.get_traceback_limit() if self.active else None,
+            "sample_rate": self.sample_rate,
+            "traced_current": current,
+            "traced_peak": peak,
+            "allocated_blocks": sys.getallocatedblocks(),
+            "snapshots": snapshots,
+            "routes": routes
+        }
+
+
+memory_tracker = MemoryTracker()
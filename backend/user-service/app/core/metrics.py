@@ -0,0 +1,103 @@
+import os
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+event_loop_lag_seconds = Histogram(
+    "event_loop_lag_seconds",
+    "Delay between when the event loop monitor was due to wake up and when it ran",
+    buckets=LOOP_LAG_BUCKETS
+)
+
+event_loop_stalls_total = Counter(
+    "event_loop_stalls_total",
+    "Number of times the event loop was blocked longer than the stall threshold"
+)
+
+oauth_provider_requests_total = Counter(
+    "oauth_provider_requests_total",
+    "Outbound OAuth provider calls by outcome (ok, retry, error, deadline, server_error, circuit_open)",
+    ["provider", "outcome"]
+)
+
+singleflight_calls_total = Counter(
+    "singleflight_calls_total",
+    "Calls through a single-flight group, executed or coalesced onto an in-flight call",
+    ["group", "outcome"]
+)
+
+revoked_token_checks_total = Counter(
+    "revoked_token_checks_total",
+    "Access token revocation checks: negative (filter only), false_positive or revoked (confirmed in the database)",
+    ["outcome"]
+)
+
+load_shed_requests_total = Counter(
+    "load_shed_requests_total",
+    "Requests rejected with 503 by the concurrency limiter, by route class and reason (queue_full, queue_timeout)",
+    ["route_class", "reason"]
+)
+
+# Summed over gunicorn workers in multiprocess mode
+concurrency_limit = Gauge(
+    "concurrency_limit",
+    "Current adaptive concurrency limit per route class",
+    ["route_class"],
+    multiprocess_mode="livesum"
+)
+
+concurrency_in_flight = Gauge(
+    "concurrency_in_flight",
+    "Requests currently holding a concurrency slot per route class",
+    ["route_class"],
+    multiprocess_mode="livesum"
+)
+
+emails_total = Counter(
+    "emails_total",
+    "Outbound email delivery attempts by outcome (sent, retry, failed)",
+    ["outcome"]
+)
+
+outbox_events_published_total = Counter(
+    "outbox_events_published_total",
+    "User change events relayed from the outbox to the Redis Stream"
+)
+
+response_cache_total = Counter(
+    "response_cache_total",
+    "Conditional user reads by outcome: not_modified (304), hit (cached body) or miss (serialized)",
+    ["outcome"]
+)
+
+compressed_responses_total = Counter(
+    "compressed_responses_total",
+    "Responses compressed by the compression middleware, by content encoding",
+    ["encoding"]
+)
+
+user_stats_reconciliations_total = Counter(
+    "user_stats_reconciliations_total",
+    "User stats reconciliation runs by outcome (clean, corrected, skipped)",
+    ["outcome"]
+)
+
+breached_password_checks_total = Counter(
+    "breached_password_checks_total",
+    "New passwords checked against the breached password filter, by outcome (clean, breached)",
+    ["outcome"]
+)
+
+
+def latest_metrics() -> bytes:
+    """
+    Current metrics in the Prometheus text format
+
+    Under gunicorn every worker has its own counters; with
+    ``PROMETHEUS_MULTIPROC_DIR`` set they are summed across workers.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
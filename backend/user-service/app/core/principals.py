@@ -0,0 +1,138 @@
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+import structlog
+from app.core.config import settings
+from app.db.database import SessionLocal
+from app.models.user import User, UserRole
+
+logger = structlog.get_logger()
+
+# Users updated shortly before the previous refresh may commit after it ran,
+# so each incremental refresh looks back this far
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Who is calling, as far as authorization needs to know"""
+
+    id: int
+    email: str
+    role: UserRole
+    is_active: bool
+    token_version: int
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            role=user.role,
+            is_active=user.is_active,
+            token_version=user.token_version or 0
+        )
+
+    @classmethod
+    def from_claims(cls, payload: dict) -> Optional["Principal"]:
+        """Principal embedded in an access token, or None for tokens without claims"""
+        if "role" not in payload or "active" not in payload:
+            return None
+        return cls(
+            id=int(payload["sub"]),
+            email=payload.get("email", ""),
+            role=UserRole(payload["role"]),
+            is_active=bool(payload["active"]),
+            token_version=int(payload.get("ver", 0))
+        )
+
+
+class TokenVersionMap:
+    """
+    Current ``token_version`` of every user whose version recently changed.
+
+    Bumping a user's version (deactivation, role change, logout-all)
+    invalidates the role and status claims in their outstanding tokens. A
+    bump only matters until the access tokens issued before it expire, so
+    the map holds just the users with a non-zero version that were updated
+    within the last ``retention`` (the access token lifetime); everyone else
+    reads as version 0, which every unexpired token satisfies.
+
+    The map is refreshed at most every ``refresh_interval`` seconds by
+    whichever request first notices it is stale; other requests keep using
+    the current copy meanwhile, and after a failed refresh they do not
+    retry before the next interval either. A refresh only reads the users updated since the
+    previous one, through the ``(updated_at, id)`` index, and drops entries
+    older than ``retention``, so its cost follows the rate of changes rather
+    than the number of users ever bumped. Bumps made by this process apply
+    immediately; bumps from other workers within one interval.
+    """
+
+    def __init__(self, refresh_interval: float = 5.0, retention: timedelta = timedelta(minutes=30)):
+        self.refresh_interval = refresh_interval
+        self.retention = retention
+        # user id -> (version, when this process last saw it change)
+        self._versions: Dict[int, Tuple[int, datetime]] = {}
+        self._loaded_at = 0.0
+        self._synced_through: Optional[datetime] = None
+        self._refresh_lock = threading.Lock()
+
+    def get(self, user_id: int) -> int:
+        if time.monotonic() - self._loaded_at >= self.refresh_interval:
+            self._maybe_refresh()
+        entry = self._versions.get(user_id)
+        return entry[0] if entry is not None else 0
+
+    def is_current(self, user_id: int, token_version: int) -> bool:
+        return token_version >= self.get(user_id)
+
+    def bumped(self, user_id: int, version: int) -> None:
+        entry = self._versions.get(user_id)
+        if entry is None or version > entry[0]:
+            # Copy-on-write so readers never see a dict being mutated
+            versions = dict(self._versions)
+            versions[user_id] = (version, datetime.now(timezone.utc))
+            self._versions = versions
+
+    def _maybe_refresh(self) -> None:
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            # Claim this interval up front, so a slow or failing database
+            # costs one request per interval rather than every request
+            self._loaded_at = time.monotonic()
+            started = datetime.now(timezone.utc)
+            horizon = started - self.retention - SYNC_OVERLAP
+            since = horizon
+            if self._synced_through is not None:
+                since = max(horizon, self._synced_through - SYNC_OVERLAP)
+
+            db = SessionLocal()
+            try:
+                rows = db.query(User.id, User.token_version).filter(
+                    User.updated_at >= since,
+                    User.token_version > 0
+                ).all()
+            finally:
+                db.close()
+
+            versions = {user_id: entry for user_id, entry in self._versions.items() if entry[1] >= horizon}
+            for row in rows:
+                entry = versions.get(row.id)
+                if entry is None or row.token_version >= entry[0]:
+                    versions[row.id] = (row.token_version, started)
+            self._versions = versions
+            self._synced_through = started
+        except Exception as e:
+            # Keep the current map; retried after the next interval
+            logger.warning("Token version refresh failed", error=str(e))
+        finally:
+            self._refresh_lock.release()
+
+
+token_versions = TokenVersionMap(
+    refresh_interval=settings.TOKEN_VERSION_REFRESH_SECONDS,
+    retention=timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES)
+)
@@ -0,0 +1,337 @@
+import contextvars
+import copy
+import functools
+import inspect
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Optional, Dict, Any, Callable, Iterable
+import structlog
+from fastapi import params
+from fastapi.routing import APIRoute
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.core.config import settings
+
+logger = structlog.get_logger()
+
+# The session profiling the current request; tasks and threadpool jobs
+# started while handling the request inherit it
+profiled_request: contextvars.ContextVar = contextvars.ContextVar("profiled_request", default=None)
+
+# Leaf frames from these modules mean the thread is parked (idle threadpool
+# workers, the event loop waiting on its selector) rather than doing work.
+IDLE_MODULES = ("threading.py", "selectors.py", "queue.py")
+
+
+class ProfileSession:
+    def __init__(
+        self,
+        duration: Optional[float],
+        max_requests: Optional[int],
+        route_prefix: Optional[str],
+        interval: float
+    ):
+        self.duration = duration
+        self.max_requests = max_requests
+        self.route_prefix = route_prefix
+        self.interval = interval
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.requests_profiled = 0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self.inflight = 0
+
+    @property
+    def active(self) -> bool:
+        return self.finished_at is None
+
+    def matches(self, path: str) -> bool:
+        return not self.route_prefix or path.startswith(self.route_prefix)
+
+    def expired(self) -> bool:
+        if self.duration is not None and time.time() - self.started_at >= self.duration:
+            return True
+        if self.max_requests is not None and self.requests_profiled >= self.max_requests:
+            return True
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "route_prefix": self.route_prefix,
+            "duration": self.duration,
+            "max_requests": self.max_requests,
+            "interval": self.interval,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "requests_profiled": self.requests_profiled,
+            "samples": self.samples,
+            "unique_stacks": len(self.stacks)
+        }
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling every thread of the worker process.
+
+    Only threads running work for a matching request are recorded, but not
+    concurrent requests for other routes or idle time. The work marks the
+    thread running it itself: ProfilingMiddleware marks the event loop
+    thread for each step of the request's handling, and sync endpoints and
+    dependencies of a ProfiledRoute mark their threadpool thread while they
+    run. Stacks are aggregated in collapsed format, one
+    ``frame;frame;frame count`` line per unique stack, which flamegraph.pl,
+    speedscope and inferno read directly.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._session: Optional[ProfileSession] = None
+        self._thread: Optional[threading.Thread] = None
+        # thread id -> session of the request whose work the thread is running
+        self._running: Dict[int, ProfileSession] = {}
+        # function -> its attributed() wrapper, so each is wrapped once
+        self._attributed: Dict[Callable, Callable] = {}
+
+    @property
+    def session(self) -> Optional[ProfileSession]:
+        return self._session
+
+    def start(
+        self,
+        duration: Optional[float] = None,
+        max_requests: Optional[int] = None,
+        route_prefix: Optional[str] = None,
+        interval: float = 0.005
+    ) -> ProfileSession:
+        with self._lock:
+            if self._session is not None and self._session.active:
+                raise RuntimeError("A profiling session is already running")
+            session = ProfileSession(duration, max_requests, route_prefix, interval)
+            self._session = session
+            self._thread = threading.Thread(
+                target=self._run, args=(session,), name="request-profiler", daemon=True
+            )
+            self._thread.start()
+
+        logger.info("Profiling session started", **session.to_dict())
+        return session
+
+    def stop(self) -> Optional[ProfileSession]:
+        with self._lock:
+            session = self._session
+            if session is not None and session.active:
+                session.finished_at = time.time()
+        if session is not None:
+            logger.info("Profiling session stopped", **session.to_dict())
+        return session
+
+    def request_started(self, path: str) -> Optional[ProfileSession]:
+        """
+        The session profiling this request, if any; pass it to request_finished
+        """
+        session = self._session
+        if session is None or not session.active or not session.matches(path):
+            return None
+        with self._lock:
+            session.inflight += 1
+        return session
+
+    def request_finished(self, session: ProfileSession) -> None:
+        # The session that counted the request, even if another one started since
+        with self._lock:
+            session.inflight -= 1
+            session.requests_profiled += 1
+        if session.active and session.expired():
+            self.stop()
+
+    def attributed(self, fn: Callable) -> Callable:
+        """
+        ``fn``, with its sync dependencies and, if sync, itself marking the thread that runs them
+
+        They run in the threadpool, one call each; the wrapper reads the
+        profiled request from the context the threadpool copies into the
+        call. The signature is rewritten to depend on the wrapped
+        dependencies, so FastAPI resolves (and caches) those instead;
+        dependency overrides therefore have to name the wrappers.
+        Generator dependencies are left alone.
+        """
+        if not inspect.isfunction(fn) or inspect.isgeneratorfunction(fn) or inspect.isasyncgenfunction(fn):
+            return fn
+        wrapper = self._attributed.get(fn)
+        if wrapper is not None:
+            return wrapper
+
+        if inspect.iscoroutinefunction(fn):
+            # Runs on the event loop, which ProfilingMiddleware marks
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                return await fn(*args, **kwargs)
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                session = profiled_request.get()
+                if session is None:
+                    return fn(*args, **kwargs)
+                previous = self._enter(session)
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self._leave(previous)
+
+        signature = inspect.signature(fn)
+        wrapper.__signature__ = signature.replace(
+            parameters=[self._attributed_parameter(parameter) for parameter in signature.parameters.values()]
+        )
+        self._attributed[fn] = wrapper
+        return wrapper
+
+    def attributed_dependency(self, depends: params.Depends) -> params.Depends:
+        if depends.dependency is None:
+            return depends
+        depends = copy.copy(depends)
+        depends.dependency = self.attributed(depends.dependency)
+        return depends
+
+    def _attributed_parameter(self, parameter: inspect.Parameter) -> inspect.Parameter:
+        if isinstance(parameter.default, params.Depends):
+            return parameter.replace(default=self.attributed_dependency(parameter.default))
+        return parameter
+
+    def _enter(self, session: ProfileSession) -> Optional[ProfileSession]:
+        """Mark the current thread as working for ``session``; returns the mark to restore"""
+        ident = threading.get_ident()
+        previous = self._running.get(ident)
+        self._running[ident] = session
+        return previous
+
+    def _leave(self, previous: Optional[ProfileSession]) -> None:
+        ident = threading.get_ident()
+        if previous is None:
+            self._running.pop(ident, None)
+        else:
+            self._running[ident] = previous
+
+    def collapsed(self) -> str:
+        session = self._session
+        if session is None:
+            return ""
+        with self._lock:
+            stacks = list(session.stacks.items())
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def _run(self, session: ProfileSession) -> None:
+        own_ident = threading.get_ident()
+        while session.active:
+            time.sleep(session.interval)
+            if session.expired():
+                self.stop()
+                break
+            if session.inflight <= 0:
+                continue
+
+            frames = sys._current_frames()
+            with self._lock:
+                for ident, frame in frames.items():
+                    if ident == own_ident:
+                        continue
+                    if self._running.get(ident) is not session:
+                        continue
+                    stack = self._collapse(frame)
+                    if stack:
+                        session.stacks[stack] += 1
+                session.samples += 1
+
+    @staticmethod
+    def _collapse(frame) -> Optional[str]:
+        if frame.f_code.co_filename.endswith(IDLE_MODULES):
+            return None
+        parts = []
+        while frame is not None:
+            code = frame.f_code
+            parts.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+        parts.reverse()
+        return ";".join(parts)
+
+
+profiler = SamplingProfiler()
+
+
+class AttributedCoroutine:
+    """
+    Await ``coroutine``, marking the thread as working for ``session`` during each of its steps
+
+    The event loop thread interleaves every request; between steps, while
+    the coroutine is suspended, the thread belongs to someone else.
+    """
+
+    def __init__(self, coroutine, session: ProfileSession):
+        self.coroutine = coroutine
+        self.session = session
+
+    def __await__(self):
+        step, value = self.coroutine.send, None
+        while True:
+            previous = profiler._enter(self.session)
+            try:
+                yielded = step(value)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                profiler._leave(previous)
+            try:
+                step, value = self.coroutine.send, (yield yielded)
+            except GeneratorExit:
+                self.coroutine.close()
+                raise
+            except BaseException as e:
+                # Cancellation and other errors thrown into the awaiting task
+                step, value = self.coroutine.throw, e
+
+
+class ProfilingMiddleware:
+    """
+    Count requests matching the profiling session and attribute their work to it
+
+    Added before any other middleware, so that it is the innermost one and
+    the routing, endpoint and serialization of a request run in its task.
+    Paths under ``excluded_paths`` (the debug endpoints) are never profiled.
+    """
+
+    def __init__(self, app: ASGIApp, excluded_paths: Iterable[str] = ()):
+        self.app = app
+        self.excluded_paths = tuple(excluded_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        session = None
+        if scope["type"] == "http" and not scope["path"].startswith(self.excluded_paths):
+            session = profiler.request_started(scope["path"])
+        if session is None:
+            await self.app(scope, receive, send)
+            return
+
+        token = profiled_request.set(session)
+        try:
+            await AttributedCoroutine(self.app(scope, receive, send), session)
+        finally:
+            profiled_request.reset(token)
+            profiler.request_finished(session)
+
+
+class ProfiledRoute(APIRoute):
+    """
+    APIRoute whose sync endpoint and dependencies mark the threadpool threads that run them
+
+    Only while profiling is enabled; see SamplingProfiler.attributed.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        if settings.PROFILING_ENABLED:
+            endpoint = profiler.attributed(endpoint)
+            kwargs["dependencies"] = [
+                profiler.attributed_dependency(depends) for depends in kwargs.get("dependencies") or []
+            ]
+        super().__init__(path, endpoint, **kwargs)
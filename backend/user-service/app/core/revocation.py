@@ -0,0 +1,151 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+import structlog
+from sqlalchemy.orm import Session
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+from app.core.metrics import revoked_token_checks_total
+from app.db.database import SessionLocal
+from app.models.revoked_token import RevokedToken
+
+logger = structlog.get_logger()
+
+# Rows revoked shortly before the previous sync may commit after it ran, so
+# each incremental sync looks back this far; a jti added twice is only
+# counted once against the filter's capacity
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class RevokedTokenFilter:
+    """
+    In-process Bloom filter of the ``jti`` of every revoked, unexpired access token.
+
+    ``revoked_tokens`` is the authoritative denylist; the filter only decides
+    whether a token needs to be looked up there. A negative answer is final,
+    so requests with tokens that were never revoked (nearly all of them) do
+    not touch the database. A positive answer is confirmed by primary key.
+
+    Every ``sync_interval`` seconds the request that notices adds the rows
+    revoked since the last sync; tokens revoked by this process are added
+    immediately. Every ``rebuild_interval`` seconds, or once the filter holds
+    more than its capacity, expired rows are deleted and the filter is rebuilt
+    from the remaining ones, so it only ever covers tokens that could still
+    be presented. Other requests keep using the current filter meanwhile.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 100000,
+        error_rate: float = 0.001,
+        sync_interval: float = 5.0,
+        rebuild_interval: float = 900.0
+    ):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self._filter = BloomFilter(capacity, error_rate)
+        self._synced_at = 0.0
+        self._rebuilt_at = 0.0
+        self._synced_through: Optional[datetime] = None
+        self._refresh_lock = threading.Lock()
+        # Serializes writes to the filter's bits; reads need no lock
+        self._add_lock = threading.Lock()
+        self._added_during_rebuild: Optional[List[str]] = None
+
+    def might_be_revoked(self, jti: str) -> bool:
+        if time.monotonic() - self._synced_at >= self.sync_interval:
+            self._maybe_refresh()
+        return jti in self._filter
+
+    def is_revoked(self, db: Session, jti: Optional[str]) -> bool:
+        """Whether the token with this ``jti`` was revoked; tokens without one never are"""
+        if not jti or not self.might_be_revoked(jti):
+            revoked_token_checks_total.labels(outcome="negative").inc()
+            return False
+        revoked = db.get(RevokedToken, jti) is not None
+        revoked_token_checks_total.labels(outcome="revoked" if revoked else "false_positive").inc()
+        return revoked
+
+    def revoked(self, jti: str) -> None:
+        """Record a revocation this process just committed"""
+        with self._add_lock:
+            self._filter.add(jti)
+            if self._added_during_rebuild is not None:
+                self._added_during_rebuild.append(jti)
+
+    def _maybe_refresh(self) -> None:
+        if not self._refresh_lock.acquire(blocking=False):
+            return
+        try:
+            if (
+                time.monotonic() - self._rebuilt_at >= self.rebuild_interval
+                or self._filter.count > self._filter.capacity
+            ):
+                self._rebuild()
+            else:
+                self._sync()
+            self._synced_at = time.monotonic()
+        except Exception as e:
+            # Keep the current filter; the next request retries
+            logger.warning("Revoked token filter refresh failed", error=str(e))
+        finally:
+            self._refresh_lock.release()
+
+    def _sync(self) -> None:
+        started = datetime.utcnow()
+        db = SessionLocal()
+        try:
+            query = db.query(RevokedToken.jti).filter(RevokedToken.expires_at > started)
+            if self._synced_through is not None:
+                query = query.filter(RevokedToken.revoked_at >= self._synced_through - SYNC_OVERLAP)
+            jtis = [row.jti for row in query]
+        finally:
+            db.close()
+
+        with self._add_lock:
+            for jti in jtis:
+                self._filter.add(jti)
+        self._synced_through = started
+
+    def _rebuild(self) -> None:
+        started = datetime.utcnow()
+        with self._add_lock:
+            self._added_during_rebuild = []
+        try:
+            db = SessionLocal()
+            try:
+                pruned = db.query(RevokedToken).filter(
+                    RevokedToken.expires_at <= started
+                ).delete(synchronize_session=False)
+                db.commit()
+                jtis = [row.jti for row in db.query(RevokedToken.jti)]
+            finally:
+                db.close()
+
+            # Leave room to grow until the next rebuild
+            bloom = BloomFilter.from_items(jtis, max(self.capacity, 2 * len(jtis)), self.error_rate)
+            with self._add_lock:
+                for jti in self._added_during_rebuild:
+                    bloom.add(jti)
+                self._filter = bloom
+        finally:
+            with self._add_lock:
+                self._added_during_rebuild = None
+
+        self._synced_through = started
+        self._rebuilt_at = time.monotonic()
+        logger.info(
+            "Revoked token filter rebuilt",
+            tokens=len(jtis), pruned=pruned, size_bytes=bloom.size_bytes, hashes=bloom.num_hashes
+        )
+
+
+revoked_tokens = RevokedTokenFilter(
+    capacity=settings.REVOKED_TOKEN_FILTER_CAPACITY,
+    error_rate=settings.REVOKED_TOKEN_FILTER_ERROR_RATE,
+    sync_interval=settings.REVOKED_TOKEN_SYNC_SECONDS,
+    rebuild_interval=settings.REVOKED_TOKEN_REBUILD_SECONDS
+)
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+from app.core.config import settings
+from app.core.metrics import singleflight_calls_total
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapse concurrent calls for the same key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight block until it finishes and get the same result (or
+    exception). Nothing is cached: once the call returns, the next caller
+    for that key runs the function again. For sync code running in the
+    threadpool, such as dependencies and sync endpoints.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable[..., T], *args, **kwargs) -> T:
+        if not settings.SINGLE_FLIGHT_ENABLED:
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            singleflight_calls_total.labels(group=self.name, outcome="coalesced").inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        singleflight_calls_total.labels(group=self.name, outcome="executed").inc()
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """
+    ``SingleFlight`` for coroutines running on the event loop.
+
+    The first caller for a key starts the function as a task of its own;
+    every caller, the first included, awaits it through ``asyncio.shield``.
+    A caller being cancelled (e.g. its client disconnected) therefore only
+    stops that caller from waiting; the others still get the result. The
+    task runs to completion even if every caller has gone.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    async def do(self, key: Hashable, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        if not settings.SINGLE_FLIGHT_ENABLED:
+            return await fn(*args, **kwargs)
+
+        task = self._calls.get(key)
+        if task is not None:
+            singleflight_calls_total.labels(group=self.name, outcome="coalesced").inc()
+        else:
+            singleflight_calls_total.labels(group=self.name, outcome="executed").inc()
+            task = self._calls[key] = asyncio.ensure_future(fn(*args, **kwargs))
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled():
+            # Mark the exception retrieved in case every caller was cancelled
+            task.exception()
+
+
+principal_lookups = SingleFlight("principal_lookup")
+oauth_code_exchanges = AsyncSingleFlight("oauth_code_exchange")
+oauth_token_verifications = AsyncSingleFlight("oauth_token_verification")
@@ -0,0 +1,41 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+
+def upgrade_users_table(connection: Connection) -> None:
+    """
+    Bring a users table created before token versions up to date
+
+    create_all() creates missing tables but never alters existing ones.
+    Every step checks the current schema first, so this is safe to run on
+    every start and on a database create_all() has just built.
+    """
+    inspector = inspect(connection)
+    if "users" not in inspector.get_table_names():
+        return
+
+    columns = {column["name"] for column in inspector.get_columns("users")}
+    if "token_version" not in columns:
+        # Existing rows get version 0, so tokens already issued stay valid
+        connection.execute(text(
+            "ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"
+        ))
+
+    # updated_at used to be set on update only; rows never updated have none
+    connection.execute(text(
+        "UPDATE users SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL"
+    ))
+    if connection.dialect.name == "postgresql":
+        # SQLite cannot change a column's nullability in place; the app
+        # stamps updated_at on every insert and update either way
+        connection.execute(text("ALTER TABLE users ALTER COLUMN updated_at SET NOT NULL"))
+        connection.execute(text("ALTER TABLE users ALTER COLUMN updated_at SET DEFAULT now()"))
+
+    indexes = {index["name"] for index in inspector.get_indexes("users")}
+    if "ix_users_updated_at_id" not in indexes:
+        connection.execute(text("CREATE INDEX ix_users_updated_at_id ON users (updated_at, id)"))
+
+
+def upgrade_schema(engine: Engine) -> None:
+    with engine.begin() as connection:
+        upgrade_users_table(connection)
@@ -1,15 +1,33 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
+from anyio import to_thread
+from prometheus_client import CONTENT_TYPE_LATEST
+import asyncio
 import time
 import structlog
 from app.core.config import settings
 from app.api.v1.api import api_router
 from app.db.database import engine
+from app.db.migrations import upgrade_schema
+from app.core.profiling import ProfilingMiddleware
+from app.core.memory import memory_tracker
+from app.core.loop_monitor import loop_monitor
+from app.core.metrics import latest_metrics
+from app.core.compression import CompressionMiddleware
+from app.core.breached_passwords import breached_passwords
+from app.core.load_shedding import load_shedder, LoadSheddingMiddleware
+from app.services.oauth_registry import oauth_providers
+from app.services.oauth_http import close_http_client
+from app.services.email_service import email_workers
+from app.services.outbox_relay import outbox_relay
+from app.services.user_stats_service import user_stats_reconciler
 from app.models import user
 
-# Create database tables
+# Create database tables, then add the columns and indexes that
+# create_all() does not add to tables that already exist
 user.Base.metadata.create_all(bind=engine)
+upgrade_schema(engine)
 
 # Configure structured logging
 structlog.configure(
@@ -36,9 +54,14 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     version="1.0.0",
     description="User authentication and management service (Authify)",
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse
 )
 
+# Innermost middleware: everything it wraps runs in the request's own task
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, excluded_paths=[f"{settings.API_V1_STR}/debug"])
+
 # Set up CORS
 if settings.BACKEND_CORS_ORIGINS:
     origins = [origin.strip() for origin in settings.BACKEND_CORS_ORIGINS.split(",") if origin.strip()]
@@ -50,6 +73,13 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_headers=["*"],
     )
 
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+        excluded_paths=[f"{settings.API_V1_STR}/auth"]
+    )
+
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
@@ -69,6 +99,92 @@ async def log_requests(request: Request, call_next):
     return response
 
 
+if settings.MEMORY_TRACKING_ENABLED:
+    @app.middleware("http")
+    async def track_request_memory(request: Request, call_next):
+        if request.url.path.startswith(f"{settings.API_V1_STR}/debug"):
+            return await call_next(request)
+
+        state = memory_tracker.begin_request()
+        if state is None:
+            return await call_next(request)
+
+        response = await call_next(request)
+
+        # The router stores the matched route in the shared scope, so group
+        # by its path template instead of the concrete URL
+        route = request.scope.get("route")
+        memory_tracker.end_request(getattr(route, "path", request.url.path), state)
+        return response
+
+
+if settings.LOAD_SHEDDING_ENABLED:
+    app.add_middleware(LoadSheddingMiddleware, shedder=load_shedder)
+
+
+@app.on_event("startup")
+async def configure_threadpool():
+    to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+
+
+@app.on_event("startup")
+async def warm_up_oauth_providers():
+    await oauth_providers.startup()
+
+
+@app.on_event("startup")
+async def start_email_workers():
+    if settings.EMAIL_QUEUE_ENABLED and settings.SMTP_HOST:
+        email_workers.start()
+
+
+@app.on_event("startup")
+async def start_outbox_relay():
+    if settings.OUTBOX_RELAY_ENABLED:
+        outbox_relay.start()
+
+
+@app.on_event("startup")
+async def open_breached_password_filter():
+    # Fail loudly in the logs at boot rather than on the first registration
+    if breached_passwords.enabled:
+        breached_passwords.open()
+
+
+@app.on_event("startup")
+async def start_user_stats_reconciler():
+    if settings.USER_STATS_RECONCILE_ENABLED:
+        user_stats_reconciler.start()
+
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    await loop_monitor.stop()
+
+
+@app.on_event("shutdown")
+async def close_oauth_clients():
+    oauth_providers.close()
+    await close_http_client()
+
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    # Each stop joins its threads; run them in parallel off the event loop so
+    # shutdown waits for the slowest one rather than blocking on all in turn
+    await asyncio.gather(
+        to_thread.run_sync(email_workers.stop),
+        to_thread.run_sync(outbox_relay.stop),
+        to_thread.run_sync(user_stats_reconciler.stop)
+    )
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -85,6 +201,13 @@ async def root():
     }
 
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        """Prometheus metrics endpoint"""
+        return Response(latest_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
 # Include API routes
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -1,3 +1,8 @@
 from .user import User
+from .session import UserSession
+from .revoked_token import RevokedToken
+from .email import OutboundEmail
+from .outbox import OutboxEvent
+from .user_stat import UserStat
 
-__all__ = ["User"]
\ No newline at end of file
+__all__ = ["User", "UserSession", "RevokedToken", "OutboundEmail", "OutboxEvent", "UserStat"]
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class OutboundEmail(Base):
+    """A message in the outbound mail spool, kept until it is sent or gives up"""
+
+    __tablename__ = "outbound_emails"
+    __table_args__ = (
+        # The workers' claim query: due messages in order
+        Index("ix_outbound_emails_due", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String(998), nullable=False)
+    text_body = Column(Text, nullable=False)
+    html_body = Column(Text, nullable=True)
+    # pending -> sending -> sent | failed; back to pending for a retry
+    status = Column(String(16), nullable=False, default="pending", server_default="pending")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    # A worker's claim on a "sending" message; expired claims are retaken
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(String(1000), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class OutboxEvent(Base):
+    """A user change event, written in the transaction that made the change"""
+
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # The relay's query: unpublished events in order
+        Index("ix_outbox_events_unpublished", "published_at", "id"),
+    )
+
+    # Sent along as event_id; consumers dedupe on it
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String(64), nullable=False)
+    user_id = Column(Integer, nullable=False, index=True)
+    # JSON: the user after the change and the names of the changed fields
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    published_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class RevokedToken(Base):
+    """An access token revoked before it expired; the row is pruned once it has"""
+
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(32), primary_key=True)
+    user_id = Column(Integer, nullable=True, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), index=True)
+    reason = Column(String(32), nullable=True)
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class UserSession(Base):
+    """One logged-in device: the refresh token chain started by a login"""
+
+    __tablename__ = "user_sessions"
+
+    id = Column(String(32), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    # SHA-256 of the only refresh token of this session that is still valid
+    refresh_token_hash = Column(String(64), nullable=True)
+    # The refresh token rotated out last and when: within the reuse grace
+    # window it still gets the current pair
+    previous_refresh_token_hash = Column(String(64), nullable=True)
+    rotated_at = Column(DateTime(timezone=True), nullable=True)
+    # Latest access token issued to this session, revoked along with it
+    access_token_jti = Column(String(32), nullable=True)
+    user_agent = Column(String(512), nullable=True)
+    ip_address = Column(String(64), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    revoked_reason = Column(String(32), nullable=True)
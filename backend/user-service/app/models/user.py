@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, Index
 from sqlalchemy.sql import func
 from app.db.database import Base
 import enum
@@ -12,6 +13,10 @@ class UserRole(str, enum.Enum):
 
 class User(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        # Keyset pagination of GET /users/changes
+        Index("ix_users_updated_at_id", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -21,5 +26,15 @@ class User(Base):
     is_verified = Column(Boolean, default=False)
     role = Column(Enum(UserRole), default=UserRole.USER)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    last_login = Column(DateTime(timezone=True), nullable=True)
\ No newline at end of file
+    # Set on insert and on every update; GET /users/changes pages through
+    # (updated_at, id). Stamped by the app rather than the database for
+    # sub-second precision on every backend.
+    updated_at = Column(
+        DateTime(timezone=True), nullable=False,
+        default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc),
+        server_default=func.now()
+    )
+    last_login = Column(DateTime(timezone=True), nullable=True)
+    # Bumped to invalidate the claims in every token issued before. Not
+    # indexed: TokenVersionMap finds recent bumps through updated_at
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, BigInteger, String, DateTime
+from sqlalchemy.sql import func
+from app.db.database import Base
+
+
+class UserStat(Base):
+    """One user counter, kept current by UserService and corrected by reconciliation"""
+
+    __tablename__ = "user_stats"
+
+    # "users", "active", "verified", "role:<ROLE>", "signups:<YYYY-MM-DD>"
+    # or "reconciled_at" (epoch seconds of the last reconciliation)
+    key = Column(String(64), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -7,6 +7,7 @@ from .user import (
     Token,
     TokenData
 )
+from .session import SessionInfo
 
 __all__ = [
     "UserCreate",
@@ -15,5 +16,6 @@ __all__ = [
     "User",
     "UserLogin",
     "Token",
-    "TokenData"
+    "TokenData",
+    "SessionInfo"
 ]
\ No newline at end of file
@@ -0,0 +1,15 @@
+from typing import Optional
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+
+
+class SessionInfo(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    user_agent: Optional[str] = None
+    ip_address: Optional[str] = None
+    created_at: datetime
+    last_used_at: Optional[datetime] = None
+    expires_at: datetime
+    current: bool = False
\ No newline at end of file
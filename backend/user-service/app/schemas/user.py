@@ -1,6 +1,7 @@
-from typing import Optional
-from pydantic import BaseModel, EmailStr
-from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Type, Union
+from pydantic import BaseModel, ConfigDict, EmailStr, TypeAdapter, create_model, model_validator
+from datetime import date, datetime
 from app.models.user import UserRole
 
 
@@ -24,6 +25,8 @@ class UserUpdate(BaseModel):
 
 
 class UserInDB(UserBase):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     hashed_password: str
     is_verified: bool = False
@@ -31,19 +34,28 @@ class UserInDB(UserBase):
     updated_at: Optional[datetime] = None
     last_login: Optional[datetime] = None
 
-    class Config:
-        orm_mode = True
-
 
 class User(UserBase):
+    """
+    A user as documented in the API schema
+
+    Endpoints render users through the module-level TypeAdapters below
+    rather than through ``response_model``. Those validate against
+    _UserRecord, which has the same fields and JSON output but takes the
+    stored email as is: it was validated on the way in, and re-checking
+    every row on the way out dominated serialization cost.
+    """
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     is_verified: bool = False
     created_at: datetime
     updated_at: Optional[datetime] = None
     last_login: Optional[datetime] = None
 
-    class Config:
-        orm_mode = True
+
+class _UserRecord(User):
+    email: str
 
 
 class UserLogin(BaseModel):
@@ -59,4 +71,86 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     user_id: Optional[int] = None
-    email: Optional[str] = None
\ No newline at end of file
+    email: Optional[str] = None
+
+
+# Built once; validating and dumping through an adapter stays inside pydantic-core
+user_adapter = TypeAdapter(_UserRecord)
+user_list_adapter = TypeAdapter(List[_UserRecord])
+
+
+class UserBatchRequest(BaseModel):
+    ids: Optional[List[int]] = None
+    emails: Optional[List[str]] = None
+
+    @model_validator(mode="after")
+    def check_one_key(self) -> "UserBatchRequest":
+        if (self.ids is None) == (self.emails is None):
+            raise ValueError("Provide either ids or emails")
+        return self
+
+
+class UserBatchResponse(BaseModel):
+    users: List[User]
+    missing: List[Union[int, str]]
+
+
+class UserTombstone(BaseModel):
+    """A deactivated user; consumers drop it from their copy"""
+    id: int
+    updated_at: datetime
+
+
+class UserChangesResponse(BaseModel):
+    users: List[User]
+    tombstones: List[UserTombstone]
+    # Pass back as ?since= for the next page or the next sync; unchanged
+    # (or None before the first change) when nothing new has settled
+    next_cursor: Optional[str] = None
+    has_more: bool
+
+
+class DailySignups(BaseModel):
+    date: date
+    count: int
+
+
+class UserStats(BaseModel):
+    total: int
+    active: int
+    inactive: int
+    verified: int
+    unverified: int
+    by_role: Dict[UserRole, int]
+    daily_signups: List[DailySignups]
+    # When the counters were last recounted from the users table
+    reconciled_at: Optional[datetime] = None
+
+
+# Fields a client may request with ?fields=, in response order
+USER_FIELDS = tuple(User.model_fields)
+
+
+def user_variant(fields: Tuple[str, ...] = USER_FIELDS) -> str:
+    """Names a user representation in ETags, so sparse views get their own"""
+    return "User:" + ",".join(fields)
+
+
+@lru_cache(maxsize=128)
+def partial_user_model(fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """User response model restricted to the given fields"""
+    return create_model(
+        "UserFields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (_UserRecord.model_fields[name].annotation, _UserRecord.model_fields[name]) for name in fields}
+    )
+
+
+@lru_cache(maxsize=128)
+def partial_user_adapter(fields: Tuple[str, ...]) -> TypeAdapter:
+    return TypeAdapter(partial_user_model(fields))
+
+
+@lru_cache(maxsize=128)
+def partial_user_list_adapter(fields: Tuple[str, ...]) -> TypeAdapter:
+    return TypeAdapter(List[partial_user_model(fields)])
\ No newline at end of file
@@ -0,0 +1,311 @@
+import random
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formataddr, make_msgid
+from typing import Optional, List
+import structlog
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import emails_total
+from app.db.database import SessionLocal
+from app.models.email import OutboundEmail
+
+logger = structlog.get_logger()
+
+
+class EmailService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def enqueue(
+        self, to_email: str, subject: str, text_body: str, html_body: Optional[str] = None, commit: bool = True
+    ) -> OutboundEmail:
+        """
+        Spool a message for the background workers; never talks to the SMTP server
+
+        Pass ``commit=False`` to send the message only if the caller's own
+        transaction commits.
+        """
+        email = OutboundEmail(
+            to_email=to_email,
+            subject=subject,
+            text_body=text_body,
+            html_body=html_body,
+            status="pending",
+            attempts=0,
+            next_attempt_at=datetime.utcnow()
+        )
+        self.db.add(email)
+        if commit:
+            self.db.commit()
+            email_workers.notify()
+        return email
+
+
+def build_message(email: OutboundEmail) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = formataddr((settings.EMAILS_FROM_NAME or "", settings.EMAILS_FROM_EMAIL or ""))
+    message["To"] = email.to_email
+    message["Subject"] = email.subject
+    message["Message-ID"] = make_msgid(domain=(settings.EMAILS_FROM_EMAIL or "localhost").rsplit("@", 1)[-1])
+    message.set_content(email.text_body)
+    if email.html_body:
+        message.add_alternative(email.html_body, subtype="html")
+    return message
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """5xx replies (unknown mailbox, rejected sender) will not succeed on retry"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return False
+
+
+class SMTPConnection:
+    """
+    One SMTP connection, opened on first use and reused across messages.
+
+    Closed after ``idle_timeout`` seconds without traffic (servers drop idle
+    clients anyway) and reopened once if the server disconnected since.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: Optional[int],
+        user: Optional[str],
+        password: Optional[str],
+        use_tls: bool,
+        timeout: float = 10.0,
+        idle_timeout: float = 60.0
+    ):
+        self.host = host
+        self.port = port or (587 if use_tls else 25)
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    def send(self, message: EmailMessage) -> None:
+        try:
+            self._connection().send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            self._connection().send_message(message)
+        self._last_used = time.monotonic()
+
+    def close_if_idle(self) -> None:
+        if self._smtp is not None and time.monotonic() - self._last_used >= self.idle_timeout:
+            self.close()
+
+    def close(self) -> None:
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._smtp = None
+
+    def _connection(self) -> smtplib.SMTP:
+        self.close_if_idle()
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.use_tls:
+                    smtp.starttls()
+                if self.user:
+                    smtp.login(self.user, self.password or "")
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self._last_used = time.monotonic()
+        return self._smtp
+
+
+class EmailWorkerPool:
+    """
+    Background threads that deliver the outbound mail spool.
+
+    Each worker claims a batch of due messages by flipping them to
+    ``sending`` with a lease, then delivers the batch over its own long-lived
+    SMTP connection. Claims are conditional updates, so any number of
+    workers and processes can share the spool without sending a message
+    twice; a message whose worker died is taken over once its lease expires.
+    Failed deliveries are retried with jittered exponential backoff up to
+    ``max_attempts``; permanent (5xx) failures are not retried. Workers wake
+    up when this process enqueues a message and otherwise poll every
+    ``poll_interval`` seconds for retries and other processes' messages.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        batch_size: int = 20,
+        poll_interval: float = 5.0,
+        max_attempts: int = 8,
+        backoff: float = 30.0,
+        max_backoff: float = 3600.0,
+        lease: float = 300.0
+    ):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.lease = lease
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopped.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"email-worker-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        logger.info("Email workers started", workers=self.workers, host=settings.SMTP_HOST)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Finish the current message and stop; messages claimed but not sent go back to the spool"""
+        self._stopped.set()
+        self._wakeup.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        connection = SMTPConnection(
+            host=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            user=settings.SMTP_USER,
+            password=settings.SMTP_PASSWORD,
+            use_tls=settings.SMTP_TLS,
+            timeout=settings.SMTP_TIMEOUT_SECONDS,
+            idle_timeout=settings.SMTP_IDLE_TIMEOUT_SECONDS
+        )
+        try:
+            while not self._stopped.is_set():
+                # Cleared before looking at the spool, so a notify() that
+                # comes in while the batch is claimed ends the next wait
+                self._wakeup.clear()
+                if self._stopped.is_set():
+                    break
+                try:
+                    delivered = self.deliver_batch(connection)
+                except Exception as e:
+                    logger.warning("Email batch failed", error=str(e))
+                    delivered = 0
+                if delivered == 0:
+                    self._wakeup.wait(self.poll_interval)
+                    connection.close_if_idle()
+        finally:
+            connection.close()
+
+    def deliver_batch(self, connection: SMTPConnection) -> int:
+        """Claim and deliver up to ``batch_size`` due messages; returns how many were claimed"""
+        db = SessionLocal()
+        try:
+            batch = self._claim(db)
+            for index, email in enumerate(batch):
+                if self._stopped.is_set():
+                    # Hand the rest back instead of waiting for the lease to expire
+                    for unsent in batch[index:]:
+                        unsent.status = "pending"
+                        unsent.locked_until = None
+                    db.commit()
+                    break
+                self._deliver(db, connection, email)
+            return len(batch)
+        finally:
+            db.close()
+
+    def _claim(self, db: Session) -> List[OutboundEmail]:
+        now = datetime.utcnow()
+        claimable = or_(
+            and_(OutboundEmail.status == "pending", OutboundEmail.next_attempt_at <= now),
+            and_(OutboundEmail.status == "sending", OutboundEmail.locked_until < now)
+        )
+        candidates = [
+            row.id for row in db.query(OutboundEmail.id).filter(claimable)
+            .order_by(OutboundEmail.next_attempt_at).limit(self.batch_size)
+        ]
+
+        claimed = []
+        for email_id in candidates:
+            # Another worker may have claimed it since the select
+            updated = db.query(OutboundEmail).filter(OutboundEmail.id == email_id, claimable).update(
+                {"status": "sending", "locked_until": now + timedelta(seconds=self.lease)},
+                synchronize_session=False
+            )
+            if updated:
+                claimed.append(email_id)
+        db.commit()
+
+        if not claimed:
+            return []
+        return db.query(OutboundEmail).filter(OutboundEmail.id.in_(claimed)).order_by(OutboundEmail.id).all()
+
+    def _deliver(self, db: Session, connection: SMTPConnection, email: OutboundEmail) -> None:
+        email.attempts += 1
+        try:
+            connection.send(build_message(email))
+        except Exception as e:
+            if not isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                # Network trouble; a rejected message leaves the connection usable
+                connection.close()
+            email.last_error = str(e)[:1000]
+            if is_permanent_failure(e) or email.attempts >= self.max_attempts:
+                email.status = "failed"
+                emails_total.labels(outcome="failed").inc()
+                logger.warning("Email delivery failed", email_id=email.id, attempts=email.attempts, error=str(e))
+            else:
+                email.status = "pending"
+                email.next_attempt_at = datetime.utcnow() + timedelta(seconds=self._retry_delay(email.attempts))
+                emails_total.labels(outcome="retry").inc()
+                logger.info("Email delivery will be retried", email_id=email.id, attempts=email.attempts, error=str(e))
+        else:
+            email.status = "sent"
+            email.sent_at = datetime.utcnow()
+            email.last_error = None
+            emails_total.labels(outcome="sent").inc()
+        email.locked_until = None
+        # Commit per message so a crash mid-batch does not resend what was sent
+        db.commit()
+
+    def _retry_delay(self, attempts: int) -> float:
+        delay = min(self.max_backoff, self.backoff * (2 ** (attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+
+email_workers = EmailWorkerPool(
+    workers=settings.EMAIL_WORKERS,
+    batch_size=settings.EMAIL_BATCH_SIZE,
+    poll_interval=settings.EMAIL_POLL_INTERVAL_SECONDS,
+    max_attempts=settings.EMAIL_MAX_ATTEMPTS,
+    backoff=settings.EMAIL_RETRY_BACKOFF_SECONDS,
+    max_backoff=settings.EMAIL_RETRY_BACKOFF_MAX_SECONDS,
+    lease=settings.EMAIL_LEASE_SECONDS
+)
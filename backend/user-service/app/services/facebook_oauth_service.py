@@ -1,140 +1,138 @@
-import requests
+import asyncio
 from typing import Optional, Dict, Any
-from app.core.config import settings
+from urllib.parse import urlencode
+import structlog
+from app.services.oauth_http import ProviderClient
+
+logger = structlog.get_logger()
 
 
 class FacebookOAuthService:
-    def __init__(self):
-        self.app_id = settings.FACEBOOK_APP_ID
-        self.app_secret = settings.FACEBOOK_APP_SECRET
-        self.redirect_uri = settings.OAUTH_REDIRECT_URI
-        
-        if not self.app_id or not self.app_secret:
-            raise ValueError("Facebook OAuth credentials not configured")
-    
-    def get_authorization_url(self, state: Optional[str] = None) -> str:
-        """
-        Generate Facebook OAuth authorization URL
-        """
-        base_url = "https://www.facebook.com/v18.0/dialog/oauth"
-        params = {
+    """
+    Long-lived Facebook Login client, created once by the provider registry
+    """
+
+    name = "facebook"
+    display_name = "Facebook"
+
+    def __init__(
+        self,
+        app_id: str,
+        app_secret: str,
+        redirect_uri: str,
+        graph_url: str,
+        authorization_url: str,
+        client: ProviderClient
+    ):
+        self.app_id = app_id
+        self.app_secret = app_secret
+        self.redirect_uri = redirect_uri
+        self.graph_url = graph_url.rstrip("/")
+        self.client = client
+
+        # An app access token is just "app_id|app_secret" and never changes,
+        # so there is no need to fetch one from /oauth/access_token
+        self.app_token = f"{self.app_id}|{self.app_secret}"
+
+        # Everything but the state is fixed, so encode it once
+        self._authorization_url_prefix = authorization_url + "?" + urlencode({
             "client_id": self.app_id,
             "redirect_uri": self.redirect_uri,
             "scope": "email,public_profile",
-            "response_type": "code",
-            "state": state or ""
-        }
-        
-        query_string = "&".join([f"{k}={v}" for k, v in params.items()])
-        return f"{base_url}?{query_string}"
-    
-    def verify_facebook_token(self, access_token: str) -> Optional[Dict[str, Any]]:
+            "response_type": "code"
+        })
+
+    async def get_authorization_url(self, state: Optional[str] = None) -> str:
+        """
+        Generate Facebook OAuth authorization URL
+        """
+        if state:
+            return f"{self._authorization_url_prefix}&{urlencode({'state': state})}"
+        return self._authorization_url_prefix
+
+    async def warm_up(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    async def verify_token(self, access_token: str) -> Optional[Dict[str, Any]]:
         """
         Verify Facebook access token and return user info
+
+        Raises ProviderUnavailableError when the Graph API is unreachable;
+        returns None for tokens that are simply invalid.
         """
-        try:
-            print(f"[FACEBOOK-OAUTH] Verifying Facebook access token...")
-            print(f"[FACEBOOK-OAUTH] Token length: {len(access_token)}")
-            
-            # First, verify the token is valid and get app token
-            app_token_url = f"https://graph.facebook.com/oauth/access_token"
-            app_token_params = {
-                "client_id": self.app_id,
-                "client_secret": self.app_secret,
-                "grant_type": "client_credentials"
-            }
-            
-            app_token_response = requests.get(app_token_url, params=app_token_params)
-            if not app_token_response.ok:
-                print(f"[FACEBOOK-OAUTH] Failed to get app token: {app_token_response.text}")
-                return None
-            
-            app_token = app_token_response.json().get("access_token")
-            
-            # Verify the user token
-            debug_url = f"https://graph.facebook.com/debug_token"
-            debug_params = {
-                "input_token": access_token,
-                "access_token": app_token
-            }
-            
-            debug_response = requests.get(debug_url, params=debug_params)
-            if not debug_response.ok:
-                print(f"[FACEBOOK-OAUTH] Token debug failed: {debug_response.text}")
-                return None
-            
-            debug_data = debug_response.json().get("data", {})
-            
-            # Check if token is valid
-            if not debug_data.get("is_valid", False):
-                print(f"[FACEBOOK-OAUTH] Token is not valid")
-                return None
-            
-            # Check if token is for our app
-            if debug_data.get("app_id") != self.app_id:
-                print(f"[FACEBOOK-OAUTH] Token is for different app")
-                return None
-            
-            # Get user info
-            user_info_url = f"https://graph.facebook.com/me"
-            user_info_params = {
-                "access_token": access_token,
-                "fields": "id,name,email,picture"
-            }
-            
-            user_response = requests.get(user_info_url, params=user_info_params)
-            if not user_response.ok:
-                print(f"[FACEBOOK-OAUTH] Failed to get user info: {user_response.text}")
-                return None
-            
-            user_data = user_response.json()
-            
-            user_info = {
-                'facebook_id': user_data.get('id'),
-                'email': user_data.get('email', ''),
-                'full_name': user_data.get('name', ''),
-                'picture': user_data.get('picture', {}).get('data', {}).get('url', ''),
-                'email_verified': True  # Facebook provides verified emails
-            }
-            
-            print(f"[FACEBOOK-OAUTH] Extracted user info: {user_info}")
-            return user_info
-            
-        except Exception as e:
-            print(f"[FACEBOOK-OAUTH] Error verifying Facebook token: {e}")
+        # Verify the user token and fetch the profile concurrently, so
+        # login latency is bounded by the slower of the two Graph calls
+        debug_response, user_response = await asyncio.gather(
+            self.client.get(
+                f"{self.graph_url}/debug_token",
+                params={"input_token": access_token, "access_token": self.app_token}
+            ),
+            self.client.get(
+                f"{self.graph_url}/me",
+                params={"access_token": access_token, "fields": "id,name,email,picture"}
+            )
+        )
+
+        if debug_response.status_code != 200:
+            logger.info("Facebook token debug failed", status_code=debug_response.status_code)
+            return None
+
+        debug_data = debug_response.json().get("data", {})
+
+        # Check if token is valid
+        if not debug_data.get("is_valid", False):
+            logger.info("Facebook token is not valid")
+            return None
+
+        # Check if token is for our app
+        if debug_data.get("app_id") != self.app_id:
+            logger.info("Facebook token is for different app")
+            return None
+
+        # Only trust the profile once the token checked out
+        if user_response.status_code != 200:
+            logger.info("Failed to get Facebook user info", status_code=user_response.status_code)
             return None
-    
-    def exchange_code_for_token(self, code: str, state: Optional[str] = None) -> Optional[Dict[str, Any]]:
+
+        user_data = user_response.json()
+
+        user_info = {
+            'facebook_id': user_data.get('id'),
+            'email': user_data.get('email', ''),
+            'full_name': user_data.get('name', ''),
+            'picture': user_data.get('picture', {}).get('data', {}).get('url', ''),
+            'email_verified': True  # Facebook provides verified emails
+        }
+
+        logger.info("Facebook token verified", email=user_info['email'])
+        return user_info
+
+    async def exchange_code_for_token(self, code: str, state: Optional[str] = None) -> Optional[Dict[str, Any]]:
         """
         Exchange authorization code for access token and user info
         """
-        try:
-            print(f"[FACEBOOK-OAUTH] Exchanging code for access token...")
-            
-            # Exchange code for access token
-            token_url = "https://graph.facebook.com/v18.0/oauth/access_token"
-            token_params = {
+        # Redeeming a code is not idempotent even though it is a GET
+        token_response = await self.client.get(
+            f"{self.graph_url}/v18.0/oauth/access_token",
+            idempotent=False,
+            params={
                 "client_id": self.app_id,
                 "client_secret": self.app_secret,
                 "redirect_uri": self.redirect_uri,
                 "code": code
             }
-            
-            token_response = requests.get(token_url, params=token_params)
-            if not token_response.ok:
-                print(f"[FACEBOOK-OAUTH] Token exchange failed: {token_response.text}")
-                return None
-            
-            token_data = token_response.json()
-            access_token = token_data.get("access_token")
-            
-            if not access_token:
-                print(f"[FACEBOOK-OAUTH] No access token in response")
-                return None
-            
-            # Get user info using the access token
-            return self.verify_facebook_token(access_token)
-            
-        except Exception as e:
-            print(f"[FACEBOOK-OAUTH] Code exchange failed: {e}")
-            return None
\ No newline at end of file
+        )
+        if token_response.status_code != 200:
+            logger.info("Facebook code exchange failed", status_code=token_response.status_code)
+            return None
+
+        access_token = token_response.json().get("access_token")
+        if not access_token:
+            logger.info("No access token in Facebook response")
+            return None
+
+        # Get user info using the access token
+        return await self.verify_token(access_token)
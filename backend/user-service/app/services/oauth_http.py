@@ -0,0 +1,193 @@
+import asyncio
+import random
+import time
+from typing import Optional
+import httpx
+import structlog
+from app.core.config import settings
+from app.core.metrics import oauth_provider_requests_total
+
+logger = structlog.get_logger()
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class ProviderUnavailableError(Exception):
+    """The OAuth provider is down, too slow, or its circuit breaker is open"""
+
+    def __init__(self, provider: str, message: str, retry_after: Optional[float] = None):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Classic closed/open/half-open breaker.
+
+    After ``failure_threshold`` consecutive failures the circuit opens and
+    calls fail fast for ``reset_timeout`` seconds. Then a single trial call is
+    let through; its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.failures < self.failure_threshold:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def retry_after(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Give back a trial slot whose call ended without an outcome (e.g. it was cancelled)"""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._trial_in_flight = False
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared connection pool for all outbound provider calls"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.OAUTH_HTTP_TIMEOUT_SECONDS),
+            limits=httpx.Limits(
+                max_connections=settings.OAUTH_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.OAUTH_HTTP_MAX_CONNECTIONS
+            )
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+class ProviderClient:
+    """
+    Outbound HTTP for one OAuth provider.
+
+    Every call has an overall deadline, retries transient failures a bounded
+    number of times with full-jitter exponential backoff, and goes through the
+    provider's circuit breaker. Non-idempotent requests (anything but GET by
+    default) are only retried when the connection could not be established,
+    since e.g. an authorization code must not be redeemed twice.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        deadline: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        backoff: Optional[float] = None,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.provider = provider
+        self.deadline = deadline if deadline is not None else settings.OAUTH_REQUEST_DEADLINE_SECONDS
+        self.max_retries = max_retries if max_retries is not None else settings.OAUTH_MAX_RETRIES
+        self.backoff = backoff if backoff is not None else settings.OAUTH_RETRY_BACKOFF_SECONDS
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=settings.OAUTH_CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=settings.OAUTH_CIRCUIT_RESET_SECONDS
+        )
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def request(self, method: str, url: str, idempotent: Optional[bool] = None, **kwargs) -> httpx.Response:
+        if idempotent is None:
+            idempotent = method == "GET"
+        if not self.breaker.allow():
+            oauth_provider_requests_total.labels(provider=self.provider, outcome="circuit_open").inc()
+            raise ProviderUnavailableError(
+                self.provider, "circuit breaker open", retry_after=self.breaker.retry_after()
+            )
+
+        try:
+            response = await asyncio.wait_for(self._request_with_retries(method, url, idempotent, **kwargs), self.deadline)
+        except asyncio.TimeoutError:
+            self._failed("deadline")
+            raise ProviderUnavailableError(self.provider, f"no response within {self.deadline}s")
+        except httpx.HTTPError as e:
+            self._failed("error")
+            raise ProviderUnavailableError(self.provider, f"{type(e).__name__}: {e}")
+        except BaseException:
+            # Cancelled (client disconnect, single-flight leader) or a bug on
+            # our side: says nothing about the provider, but a half-open
+            # circuit must not keep waiting for this trial forever
+            self.breaker.release()
+            raise
+
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            self._failed("server_error")
+            raise ProviderUnavailableError(self.provider, f"HTTP {response.status_code}")
+
+        self.breaker.record_success()
+        oauth_provider_requests_total.labels(provider=self.provider, outcome="ok").inc()
+        return response
+
+    async def _request_with_retries(self, method: str, url: str, idempotent: bool, **kwargs) -> httpx.Response:
+        client = get_http_client()
+        attempt = 0
+        while True:
+            try:
+                response = await client.request(method, url, **kwargs)
+                if response.status_code not in RETRYABLE_STATUS_CODES or not idempotent or attempt >= self.max_retries:
+                    return response
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+                if attempt >= self.max_retries:
+                    raise
+            except httpx.TransportError:
+                if not idempotent or attempt >= self.max_retries:
+                    raise
+
+            attempt += 1
+            oauth_provider_requests_total.labels(provider=self.provider, outcome="retry").inc()
+            await asyncio.sleep(random.uniform(0, self.backoff * (2 ** (attempt - 1))))
+
+    def _failed(self, outcome: str) -> None:
+        self.breaker.record_failure()
+        oauth_provider_requests_total.labels(provider=self.provider, outcome=outcome).inc()
+        if self.breaker.state == CircuitBreaker.OPEN:
+            logger.warning("OAuth provider circuit open", provider=self.provider, failures=self.breaker.failures)
+
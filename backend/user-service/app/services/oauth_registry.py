@@ -0,0 +1,105 @@
+import asyncio
+from typing import Optional, Dict, Any, Union
+import structlog
+from app.core.config import settings
+from app.services.facebook_oauth_service import FacebookOAuthService
+from app.services.oauth_http import ProviderClient
+from app.services.oidc import OIDCProvider
+
+logger = structlog.get_logger()
+
+OAuthProvider = Union[OIDCProvider, FacebookOAuthService]
+
+# Providers with dedicated endpoints; they are known even when not configured
+BUILTIN_PROVIDERS = ("google", "facebook")
+
+
+class OAuthProviderRegistry:
+    """
+    Process-wide OAuth providers, built once from settings.
+
+    Each provider keeps its own HTTP client (and so its own circuit breaker),
+    its cached discovery document and signing keys, and its precomputed
+    authorization URL.
+    """
+
+    def __init__(self):
+        self._providers: Dict[str, OAuthProvider] = {}
+
+    def register(self, provider: OAuthProvider) -> None:
+        self._providers[provider.name] = provider
+
+    def get(self, name: str) -> Optional[OAuthProvider]:
+        return self._providers.get(name)
+
+    def is_known(self, name: str) -> bool:
+        return name in self._providers or name in BUILTIN_PROVIDERS
+
+    @property
+    def names(self):
+        return list(self._providers)
+
+    async def startup(self) -> None:
+        """Prefetch discovery documents and keys so the first login is fast"""
+        providers = list(self._providers.values())
+        results = await asyncio.gather(*(p.warm_up() for p in providers), return_exceptions=True)
+        for provider, result in zip(providers, results):
+            if isinstance(result, Exception):
+                # Not fatal: the first request for this provider fetches inline
+                logger.warning("OAuth provider warm-up failed", provider=provider.name, error=str(result))
+
+    def close(self) -> None:
+        for provider in self._providers.values():
+            provider.close()
+
+
+def build_oidc_provider(name: str, config: Dict[str, Any]) -> OIDCProvider:
+    return OIDCProvider(
+        name=name,
+        display_name=config.get("display_name", name.capitalize()),
+        client_id=config["client_id"],
+        client_secret=config["client_secret"],
+        discovery_url=config["discovery_url"],
+        redirect_uri=config.get("redirect_uri", settings.OAUTH_REDIRECT_URI),
+        client=ProviderClient(name),
+        scopes=config.get("scopes"),
+        issuers=config.get("issuers"),
+        authorization_params=config.get("authorization_params"),
+        discovery_ttl=settings.OIDC_DISCOVERY_TTL_SECONDS,
+        refresh_margin=settings.OIDC_REFRESH_MARGIN_SECONDS
+    )
+
+
+def build_registry() -> OAuthProviderRegistry:
+    registry = OAuthProviderRegistry()
+
+    if settings.GOOGLE_CLIENT_ID and settings.GOOGLE_CLIENT_SECRET:
+        registry.register(build_oidc_provider("google", {
+            "client_id": settings.GOOGLE_CLIENT_ID,
+            "client_secret": settings.GOOGLE_CLIENT_SECRET,
+            "discovery_url": settings.GOOGLE_DISCOVERY_URL,
+            # Google's discovery document names the https form, but ID
+            # tokens may carry either
+            "issuers": ["accounts.google.com", "https://accounts.google.com"],
+            "authorization_params": {"access_type": "offline", "include_granted_scopes": "true"}
+        }))
+
+    if settings.FACEBOOK_APP_ID and settings.FACEBOOK_APP_SECRET:
+        registry.register(FacebookOAuthService(
+            app_id=settings.FACEBOOK_APP_ID,
+            app_secret=settings.FACEBOOK_APP_SECRET,
+            redirect_uri=settings.OAUTH_REDIRECT_URI,
+            graph_url=settings.FACEBOOK_GRAPH_URL,
+            authorization_url=settings.FACEBOOK_AUTHORIZATION_URL,
+            client=ProviderClient("facebook")
+        ))
+
+    for name, config in settings.OIDC_PROVIDERS.items():
+        if name in BUILTIN_PROVIDERS:
+            raise ValueError(f"OIDC provider name '{name}' is reserved")
+        registry.register(build_oidc_provider(name, config))
+
+    return registry
+
+
+oauth_providers = build_registry()
@@ -0,0 +1,252 @@
+import asyncio
+import re
+import time
+from typing import Optional, Dict, Any, List
+from urllib.parse import urlencode
+import structlog
+from jose import jwt, JWTError
+from app.services.oauth_http import ProviderClient, ProviderUnavailableError
+
+logger = structlog.get_logger()
+
+MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+class CachedDocument:
+    """
+    A JSON document fetched over HTTP and cached per its ``Cache-Control``.
+
+    The document is kept for ``max-age`` (minus ``Age``), falling back to
+    ``default_max_age``. A refresh is scheduled on the event loop
+    ``refresh_margin`` seconds before expiry, so readers between refreshes
+    never wait on the network. Used for OIDC discovery documents and JWKS.
+    """
+
+    def __init__(
+        self,
+        client: ProviderClient,
+        default_max_age: float = 3600.0,
+        refresh_margin: float = 300.0
+    ):
+        self.client = client
+        self.default_max_age = default_max_age
+        self.refresh_margin = refresh_margin
+        self.url: Optional[str] = None
+        self.fetched_at = 0.0
+        self._value: Optional[Dict[str, Any]] = None
+        self._expires_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._refresh_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def get(self, url: str) -> Dict[str, Any]:
+        value = self._value
+        if value is not None and url == self.url and time.time() < self._expires_at:
+            return value
+        async with self.lock:
+            # Another request may have refreshed while we waited for the lock
+            if self._value is None or url != self.url or time.time() >= self._expires_at:
+                await self._fetch_locked(url)
+            return self._value
+
+    async def refresh(self, min_interval: float = 0.0) -> Dict[str, Any]:
+        async with self.lock:
+            if time.time() - self.fetched_at >= min_interval:
+                await self._fetch_locked(self.url)
+            return self._value
+
+    def close(self) -> None:
+        if self._refresh_handle is not None:
+            self._refresh_handle.cancel()
+            self._refresh_handle = None
+
+    async def _fetch_locked(self, url: str) -> None:
+        response = await self.client.get(url)
+        if response.is_error:
+            raise ProviderUnavailableError(self.client.provider, f"HTTP {response.status_code} from {url}")
+        try:
+            value = response.json()
+        except ValueError:
+            raise ProviderUnavailableError(self.client.provider, f"invalid JSON from {url}")
+
+        max_age = self.default_max_age
+        match = MAX_AGE_RE.search(response.headers.get("Cache-Control", ""))
+        if match:
+            max_age = int(match.group(1))
+            age = response.headers.get("Age")
+            if age and age.isdigit():
+                max_age = max(0, max_age - int(age))
+
+        now = time.time()
+        self.url = url
+        self.fetched_at = now
+        self._value = value
+        self._expires_at = now + max_age
+        self._schedule_refresh(max(1.0, max_age - self.refresh_margin))
+        logger.info("Provider document refreshed", provider=self.client.provider, url=url, max_age=max_age)
+
+    def _schedule_refresh(self, delay: float) -> None:
+        self.close()
+        loop = asyncio.get_running_loop()
+        self._refresh_handle = loop.call_later(delay, lambda: loop.create_task(self._background_refresh()))
+
+    async def _background_refresh(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Keep serving the current document and retry shortly; readers
+            # fetch inline once it actually expires
+            logger.warning("Background provider document refresh failed", url=self.url, error=str(e))
+            self._schedule_refresh(min(60.0, max(1.0, self._expires_at - time.time())))
+
+
+class OIDCProvider:
+    """
+    Long-lived OpenID Connect provider client.
+
+    Endpoints, signing keys and allowed algorithms come from the provider's
+    discovery document, so adding a provider only takes configuration. ID
+    tokens are verified locally against the cached JWKS; a token signed with
+    an unknown key id forces one early (rate limited) JWKS refresh to pick up
+    key rotations.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        display_name: str,
+        client_id: str,
+        client_secret: str,
+        discovery_url: str,
+        redirect_uri: str,
+        client: ProviderClient,
+        scopes: Optional[List[str]] = None,
+        issuers: Optional[List[str]] = None,
+        authorization_params: Optional[Dict[str, str]] = None,
+        discovery_ttl: float = 86400.0,
+        refresh_margin: float = 300.0,
+        min_forced_refresh_interval: float = 60.0
+    ):
+        self.name = name
+        self.display_name = display_name
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.discovery_url = discovery_url
+        self.redirect_uri = redirect_uri
+        self.client = client
+        self.scopes = scopes or ["openid", "email", "profile"]
+        self.issuers = issuers
+        self.authorization_params = authorization_params or {}
+        self.min_forced_refresh_interval = min_forced_refresh_interval
+        self._discovery = CachedDocument(client, default_max_age=discovery_ttl, refresh_margin=refresh_margin)
+        self._jwks = CachedDocument(client, refresh_margin=refresh_margin)
+        self._authorization_url_prefix: Optional[str] = None
+        self._prefix_source: Optional[str] = None
+
+    async def discovery(self) -> Dict[str, Any]:
+        return await self._discovery.get(self.discovery_url)
+
+    async def warm_up(self) -> None:
+        discovery = await self.discovery()
+        await self._jwks.get(discovery["jwks_uri"])
+
+    async def get_authorization_url(self, state: Optional[str] = None) -> str:
+        discovery = await self.discovery()
+        endpoint = discovery["authorization_endpoint"]
+
+        # Everything but the state is fixed per provider, so encode it once
+        if self._prefix_source != endpoint:
+            params = {
+                "response_type": "code",
+                "client_id": self.client_id,
+                "redirect_uri": self.redirect_uri,
+                "scope": " ".join(self.scopes),
+                **self.authorization_params
+            }
+            self._authorization_url_prefix = f"{endpoint}?{urlencode(params)}"
+            self._prefix_source = endpoint
+
+        if state:
+            return f"{self._authorization_url_prefix}&{urlencode({'state': state})}"
+        return self._authorization_url_prefix
+
+    async def verify_token(self, token: str, access_token: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Verify an ID token and return normalized user info
+
+        Raises ProviderUnavailableError when discovery or keys cannot be
+        fetched; returns None for tokens that are simply invalid.
+        """
+        discovery = await self.discovery()
+        try:
+            key_id = jwt.get_unverified_header(token).get("kid")
+        except JWTError as e:
+            logger.info("Malformed ID token", provider=self.name, error=str(e))
+            return None
+
+        jwks = await self._jwks.get(discovery["jwks_uri"])
+        if key_id and key_id not in {key.get("kid") for key in jwks.get("keys", [])}:
+            logger.info("Unknown signing key, refreshing JWKS", provider=self.name, key_id=key_id)
+            jwks = await self._jwks.refresh(min_interval=self.min_forced_refresh_interval)
+
+        try:
+            claims = jwt.decode(
+                token,
+                jwks,
+                algorithms=discovery.get("id_token_signing_alg_values_supported", ["RS256"]),
+                audience=self.client_id,
+                issuer=self.issuers or discovery["issuer"],
+                access_token=access_token,
+                options={"verify_at_hash": access_token is not None}
+            )
+        except JWTError as e:
+            logger.info("ID token verification failed", provider=self.name, error=str(e))
+            return None
+
+        if not claims.get("email"):
+            logger.info("ID token has no email claim", provider=self.name)
+            return None
+
+        return {
+            'subject': claims['sub'],
+            'email': claims['email'],
+            'full_name': claims.get('name', ''),
+            'picture': claims.get('picture', ''),
+            # Some providers send the claim as a string
+            'email_verified': claims.get('email_verified') in (True, 'true')
+        }
+
+    async def exchange_code_for_token(self, code: str, state: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Exchange authorization code for tokens and return the ID token's user info
+        """
+        discovery = await self.discovery()
+        response = await self.client.post(
+            discovery["token_endpoint"],
+            data={
+                "code": code,
+                "client_id": self.client_id,
+                "client_secret": self.client_secret,
+                "redirect_uri": self.redirect_uri,
+                "grant_type": "authorization_code"
+            }
+        )
+        if response.status_code != 200:
+            logger.info("Code exchange failed", provider=self.name, status_code=response.status_code)
+            return None
+
+        tokens = response.json()
+        if not tokens.get("id_token"):
+            logger.info("No ID token in token response", provider=self.name)
+            return None
+
+        return await self.verify_token(tokens["id_token"], access_token=tokens.get("access_token"))
+
+    def close(self) -> None:
+        self._discovery.close()
+        self._jwks.close()
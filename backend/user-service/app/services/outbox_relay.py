@@ -0,0 +1,209 @@
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+import redis
+import structlog
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import outbox_events_published_total
+from app.db.database import SessionLocal
+from app.models.outbox import OutboxEvent
+
+logger = structlog.get_logger()
+
+LOCK_KEY_SUFFIX = ":relay-lock"
+# Compare-and-set on the lock owner, so a relay whose lease ran out between
+# the check and the write cannot extend or delete the next holder's lock
+RENEW_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class OutboxRelay:
+    """
+    Publishes outbox events to a Redis Stream, in order, in batches.
+
+    One relay thread per process; a lock in Redis (renewed every batch)
+    makes one of them the publisher at a time. Delivery is at least once: an
+    event published just before a crash or a lost lock is published again,
+    so consumers skip ``event_id`` values they have already applied. Changes
+    to one user commit one after the other (they lock the same row), so a
+    user's events appear in the stream in the order they happened.
+    Downstream services read the stream with XREADGROUP in their consumer
+    group and XACK what they have applied.
+
+    Published events are kept in the table for ``retention`` and then
+    deleted; the stream itself is capped at about ``maxlen`` entries.
+    """
+
+    def __init__(
+        self,
+        stream: str,
+        maxlen: int = 100000,
+        consumer_groups: Optional[List[str]] = None,
+        batch_size: int = 500,
+        poll_interval: float = 1.0,
+        retention: timedelta = timedelta(hours=24)
+    ):
+        self.stream = stream
+        self.maxlen = maxlen
+        self.consumer_groups = consumer_groups or []
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.lock_ttl = max(10.0, poll_interval * 10)
+        self._owner = ""
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._redis: Optional[redis.Redis] = None
+        self._groups_created = False
+        self._pruned_at = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stopped.clear()
+        # Set here, not at import: preloaded gunicorn workers share the import
+        self._owner = f"{socket.gethostname()}-{os.getpid()}"
+        self._redis = redis.Redis.from_url(settings.REDIS_URL)
+        self._thread = threading.Thread(target=self._run, name="outbox-relay", daemon=True)
+        self._thread.start()
+        logger.info("Outbox relay started", stream=self.stream)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        if self._redis is not None:
+            try:
+                self._release_lock()
+            except redis.RedisError:
+                pass
+            self._redis.close()
+            self._redis = None
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    def _run(self) -> None:
+        failing = False
+        while True:
+            # Cleared before looking at the outbox, so a notify() that comes
+            # in while the batch is published ends the next wait
+            self._wakeup.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                published = self.relay_batch() if self._acquire_lock() else 0
+                if failing:
+                    logger.info("Outbox relay recovered", stream=self.stream)
+                    failing = False
+            except Exception as e:
+                # Log once per outage, not once per poll
+                if not failing:
+                    logger.warning("Outbox relay failed", stream=self.stream, error=str(e))
+                    failing = True
+                published = 0
+            # A full batch means there is probably more waiting
+            if published < self.batch_size:
+                self._wakeup.wait(self.poll_interval)
+
+    def relay_batch(self) -> int:
+        """Publish up to ``batch_size`` unpublished events; returns how many"""
+        self._ensure_groups()
+        db = SessionLocal()
+        try:
+            events = db.query(OutboxEvent).filter(
+                OutboxEvent.published_at.is_(None)
+            ).order_by(OutboxEvent.id).limit(self.batch_size).all()
+            if events:
+                self._publish(events)
+                now = datetime.utcnow()
+                for event in events:
+                    event.published_at = now
+                db.commit()
+                outbox_events_published_total.inc(len(events))
+            self._maybe_prune(db)
+            return len(events)
+        finally:
+            db.close()
+
+    def _publish(self, events: List[OutboxEvent]) -> None:
+        pipe = self._redis.pipeline(transaction=False)
+        for event in events:
+            pipe.xadd(
+                self.stream,
+                {
+                    "event_id": event.id,
+                    "type": event.event_type,
+                    "user_id": event.user_id,
+                    "payload": event.payload,
+                    "created_at": event.created_at.isoformat() if event.created_at else ""
+                },
+                maxlen=self.maxlen,
+                approximate=True
+            )
+        pipe.execute()
+
+    def _ensure_groups(self) -> None:
+        if self._groups_created:
+            return
+        for group in self.consumer_groups:
+            try:
+                # From the start, so a consumer that starts later misses nothing
+                self._redis.xgroup_create(self.stream, group, id="0", mkstream=True)
+            except redis.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+        self._groups_created = True
+
+    def _maybe_prune(self, db: Session) -> None:
+        if time.monotonic() - self._pruned_at < 60:
+            return
+        deleted = db.query(OutboxEvent).filter(
+            OutboxEvent.published_at < datetime.utcnow() - self.retention
+        ).delete(synchronize_session=False)
+        db.commit()
+        self._pruned_at = time.monotonic()
+        if deleted:
+            logger.info("Published outbox events pruned", count=deleted)
+
+    def _acquire_lock(self) -> bool:
+        key = self.stream + LOCK_KEY_SUFFIX
+        ttl_ms = int(self.lock_ttl * 1000)
+        if self._redis.set(key, self._owner, nx=True, px=ttl_ms):
+            return True
+        # Renew if we already hold it
+        return bool(self._redis.eval(RENEW_LOCK_SCRIPT, 1, key, self._owner, ttl_ms))
+
+    def _release_lock(self) -> None:
+        self._redis.eval(RELEASE_LOCK_SCRIPT, 1, self.stream + LOCK_KEY_SUFFIX, self._owner)
+
+
+outbox_relay = OutboxRelay(
+    stream=settings.OUTBOX_STREAM,
+    maxlen=settings.OUTBOX_STREAM_MAXLEN,
+    consumer_groups=[group.strip() for group in settings.OUTBOX_CONSUMER_GROUPS.split(",") if group.strip()],
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    poll_interval=settings.OUTBOX_POLL_INTERVAL_SECONDS,
+    retention=timedelta(hours=settings.OUTBOX_RETENTION_HOURS)
+)
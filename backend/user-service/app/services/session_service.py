@@ -0,0 +1,229 @@
+import base64
+import hashlib
+import hmac
+import secrets
+from datetime import datetime, timedelta
+from typing import Optional, List, Tuple
+import structlog
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.revocation import revoked_tokens
+from app.models.session import UserSession
+from app.models.revoked_token import RevokedToken
+from app.services.user_service import UserService
+
+logger = structlog.get_logger()
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def successor_jtis(previous_token: str) -> Tuple[str, str]:
+    """
+    The refresh and access token ids issued in exchange for ``previous_token``
+
+    Derived rather than random, so the pair handed out by a rotation can be
+    issued again to a request that lost the race for the same token.
+    """
+    digest = hmac.new(settings.JWT_SECRET_KEY.encode(), previous_token.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:12]).decode(), base64.urlsafe_b64encode(digest[12:24]).decode()
+
+
+class SessionService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create_session(
+        self, user_id: int, user_agent: Optional[str] = None, ip_address: Optional[str] = None
+    ) -> UserSession:
+        """
+        Start a session; the caller then attaches its first refresh token with rotate()
+        """
+        now = datetime.utcnow()
+        # Drop this user's dead sessions while we are here (indexed by user_id)
+        self.db.query(UserSession).filter(
+            UserSession.user_id == user_id,
+            (UserSession.expires_at < now) | (UserSession.revoked_at.isnot(None))
+        ).delete(synchronize_session=False)
+
+        db_session = UserSession(
+            id=secrets.token_urlsafe(16),
+            user_id=user_id,
+            user_agent=(user_agent or "")[:512] or None,
+            ip_address=ip_address,
+            created_at=now,
+            last_used_at=now,
+            expires_at=now + timedelta(days=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS)
+        )
+        self.db.add(db_session)
+        return db_session
+
+    def get_session(self, session_id: str) -> Optional[UserSession]:
+        return self.db.get(UserSession, session_id)
+
+    def get_active_sessions(self, user_id: int) -> List[UserSession]:
+        return self.db.query(UserSession).filter(
+            UserSession.user_id == user_id,
+            UserSession.revoked_at.is_(None),
+            UserSession.expires_at > datetime.utcnow()
+        ).order_by(UserSession.last_used_at.desc()).all()
+
+    def rotate(
+        self,
+        db_session: UserSession,
+        refresh_token: str,
+        access_token_jti: Optional[str] = None,
+        previous_token: Optional[str] = None,
+        rotated_at: Optional[datetime] = None
+    ) -> bool:
+        """
+        Make ``refresh_token`` the session's only valid refresh token
+
+        With ``previous_token`` the swap is one conditional UPDATE that only
+        matches while ``previous_token`` is still current. Of two concurrent
+        refreshes with the same token exactly one wins. The other also gets
+        True if it comes within the reuse grace window: ``db_session`` then
+        holds the winner's ``rotated_at`` and the caller must hand out the
+        winner's pair instead of its own. Otherwise it is reuse and False is
+        returned.
+        """
+        now = rotated_at or datetime.utcnow()
+        values = {
+            "refresh_token_hash": hash_token(refresh_token),
+            "access_token_jti": access_token_jti,
+            "last_used_at": now,
+            "expires_at": now + timedelta(days=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS)
+        }
+        if previous_token is None:
+            # A session created by this request; nobody else can see it yet
+            for name, value in values.items():
+                setattr(db_session, name, value)
+            self.db.commit()
+            return True
+
+        rotated = self.db.query(UserSession).filter(
+            UserSession.id == db_session.id,
+            UserSession.refresh_token_hash == hash_token(previous_token),
+            UserSession.revoked_at.is_(None)
+        ).update(
+            {**values, "previous_refresh_token_hash": hash_token(previous_token), "rotated_at": now},
+            synchronize_session=False
+        )
+        if not rotated:
+            self.db.rollback()
+            self.db.refresh(db_session)
+            if self._recently_rotated_out(db_session, previous_token):
+                return True
+            self._reuse_detected(db_session)
+            return False
+        self.db.commit()
+        return True
+
+    def check_refresh_token(self, session_id: str, refresh_token: str) -> Optional[UserSession]:
+        """
+        Return the session if ``refresh_token`` is its current token
+
+        A token that belongs to the session but was already rotated out means
+        it was copied and used twice; see _reuse_detected. The caller must
+        still pass the token to rotate(), which catches concurrent reuse.
+        """
+        db_session = self.get_session(session_id)
+        if db_session is None or db_session.revoked_at is not None:
+            return None
+
+        if not hmac.compare_digest(db_session.refresh_token_hash or "", hash_token(refresh_token)):
+            if self._recently_rotated_out(db_session, refresh_token):
+                return db_session
+            self._reuse_detected(db_session)
+            return None
+
+        return db_session
+
+    def _recently_rotated_out(self, db_session: UserSession, refresh_token: str) -> bool:
+        """
+        Whether ``refresh_token`` is the session's previous token, rotated out within the grace window
+
+        Two tabs refreshing at once, or a client retrying a refresh whose
+        response it never got, present the same token twice. Within the
+        window that is not theft; the second request gets the pair the first
+        one was issued.
+        """
+        if db_session.revoked_at is not None or db_session.rotated_at is None:
+            return False
+        if not hmac.compare_digest(db_session.previous_refresh_token_hash or "", hash_token(refresh_token)):
+            return False
+        grace = timedelta(seconds=settings.REFRESH_TOKEN_REUSE_GRACE_SECONDS)
+        return db_session.rotated_at.replace(tzinfo=None) > datetime.utcnow() - grace
+
+    def _reuse_detected(self, db_session: UserSession) -> None:
+        """
+        Revoke the session and every token issued to its user
+
+        Neither the legitimate client nor the thief can continue the session.
+        Access tokens issued by it before the latest one are not tracked, so
+        the user's token version is bumped as well, which logs them out
+        everywhere.
+        """
+        logger.warning("Refresh token reuse detected", session_id=db_session.id, user_id=db_session.user_id)
+        if db_session.revoked_at is None:
+            self.revoke(db_session, reason="reuse")
+        UserService(self.db).revoke_tokens(db_session.user_id)
+
+    def revoke(self, db_session: UserSession, reason: str = "logout") -> None:
+        """
+        End the session: its refresh token and its latest access token stop working
+        """
+        now = datetime.utcnow()
+        access_token_jti = db_session.access_token_jti
+        if access_token_jti:
+            # The access token was issued when the session was last used;
+            # the extra minute covers the time it took to issue it
+            self._add_revoked_token(
+                access_token_jti,
+                db_session.user_id,
+                db_session.last_used_at + timedelta(minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES + 1),
+                reason
+            )
+        db_session.revoked_at = now
+        db_session.revoked_reason = reason
+        db_session.refresh_token_hash = None
+        db_session.previous_refresh_token_hash = None
+        db_session.access_token_jti = None
+        self.db.commit()
+        if access_token_jti:
+            revoked_tokens.revoked(access_token_jti)
+
+    def revoke_access_token(self, jti: str, user_id: int, expires_at: datetime, reason: str = "logout") -> None:
+        """
+        Deny one access token until it expires
+        """
+        self._add_revoked_token(jti, user_id, expires_at, reason)
+        self.db.commit()
+        revoked_tokens.revoked(jti)
+
+    def _add_revoked_token(self, jti: str, user_id: int, expires_at: datetime, reason: str) -> None:
+        # merge: revoking the same token twice is not an error
+        self.db.merge(RevokedToken(
+            jti=jti,
+            user_id=user_id,
+            expires_at=expires_at.replace(tzinfo=None),
+            revoked_at=datetime.utcnow(),
+            reason=reason
+        ))
+
+    def revoke_all(self, user_id: int, reason: str = "logout_all") -> int:
+        count = self.db.query(UserSession).filter(
+            UserSession.user_id == user_id,
+            UserSession.revoked_at.is_(None)
+        ).update(
+            {
+                "revoked_at": datetime.utcnow(),
+                "revoked_reason": reason,
+                "refresh_token_hash": None,
+                "previous_refresh_token_hash": None
+            },
+            synchronize_session=False
+        )
+        self.db.commit()
+        return count
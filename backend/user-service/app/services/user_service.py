@@ -1,26 +1,123 @@
-from typing import Optional, List
+from typing import Optional, Iterator, List, Sequence, Tuple
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, tuple_, update
 from datetime import datetime
+import orjson
 from app.models.user import User, UserRole
-from app.schemas.user import UserCreate, UserUpdate
+from app.models.outbox import OutboxEvent
+from app.schemas.user import UserCreate, UserUpdate, User as UserSchema, USER_FIELDS
+from app.core.config import settings
 from app.core.security import get_password_hash, verify_password
+from app.core.breached_passwords import breached_passwords
+from app.core.singleflight import principal_lookups
+from app.core.principals import Principal, token_versions
+from app.services.outbox_relay import outbox_relay
+from app.services.user_stats_service import UserStatsService, user_stat_keys
+
+# Changing these invalidates the claims embedded in outstanding access tokens
+PRINCIPAL_FIELDS = {"email", "role", "is_active"}
 
 
 class UserService:
     def __init__(self, db: Session):
         self.db = db
+        self.stats = UserStatsService(db)
 
     def get_user_by_id(self, user_id: int) -> Optional[User]:
         return self.db.query(User).filter(User.id == user_id).first()
 
+    def get_principal_coalesced(self, user_id: int) -> Optional[Principal]:
+        """
+        The user's Principal; concurrent lookups of the same id share one query
+
+        A Principal is immutable and bound to no session, so the result of
+        one caller's query can be handed to every other caller as is.
+        """
+        return principal_lookups.do(user_id, self._load_principal, user_id)
+
+    def _load_principal(self, user_id: int) -> Optional[Principal]:
+        row = self.db.query(
+            User.id, User.email, User.role, User.is_active, User.token_version
+        ).filter(User.id == user_id).first()
+        return Principal.from_user(row) if row else None
+
     def get_user_by_email(self, email: str) -> Optional[User]:
         return self.db.query(User).filter(User.email == email).first()
 
     def get_users(self, skip: int = 0, limit: int = 100) -> List[User]:
         return self.db.query(User).offset(skip).limit(limit).all()
 
+    def get_user_rows(self, fields: Sequence[str], skip: int = 0, limit: int = 100) -> List[Row]:
+        """
+        Like get_users, but selects only the given columns
+
+        Returns plain rows instead of ORM objects, so nothing else (notably
+        hashed_password) is read and nothing goes through the identity map.
+        """
+        columns = [getattr(User, field) for field in fields]
+        return self.db.query(*columns).offset(skip).limit(limit).all()
+
+    def iter_user_rows(self, fields: Sequence[str], batch_size: int = 1000) -> Iterator[List[Row]]:
+        """
+        Every user's given columns, in batches in id order
+
+        Pages by id rather than offset, so each batch is an index range scan
+        however deep into the table it is.
+        """
+        columns = [getattr(User, field) for field in fields]
+        if "id" not in fields:
+            columns.append(User.id)
+        last_id = 0
+        while True:
+            rows = self.db.query(*columns).filter(User.id > last_id).order_by(User.id).limit(batch_size).all()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1].id
+
+    def get_user_row_by_id(self, user_id: int, fields: Sequence[str]) -> Optional[Row]:
+        """
+        The given columns of one user, plus id and updated_at for its ETag
+        """
+        columns = [getattr(User, field) for field in fields]
+        columns += [getattr(User, field) for field in ("id", "updated_at") if field not in fields]
+        return self.db.query(*columns).filter(User.id == user_id).first()
+
+    def get_user_rows_by(self, key: str, values: Sequence, fields: Sequence[str]) -> List[Row]:
+        """
+        Rows whose ``key`` column (id or email) is in ``values``, in one IN query
+
+        The key column is always selected so callers can match rows to their
+        inputs. Order is unspecified.
+        """
+        key_column = getattr(User, key)
+        columns = [getattr(User, field) for field in fields]
+        if key not in fields:
+            columns.append(key_column)
+        return self.db.query(*columns).filter(key_column.in_(values)).all()
+
+    def get_changed_user_rows(
+        self, since: Optional[Tuple[datetime, int]], settled_before: datetime, limit: int = 100
+    ) -> List[Row]:
+        """
+        Users created or modified after the ``(updated_at, id)`` cursor ``since``
+
+        Ordered by ``(updated_at, id)`` and served from the matching index, so
+        the cost follows the number of changes, not the size of the table.
+        Rows modified at or after ``settled_before`` are left for a later call.
+        """
+        columns = [getattr(User, field) for field in USER_FIELDS]
+        query = self.db.query(*columns).filter(User.updated_at < settled_before)
+        if since is not None:
+            query = query.filter(tuple_(User.updated_at, User.id) > tuple_(*since))
+        return query.order_by(User.updated_at, User.id).limit(limit).all()
+
     def create_user(self, user_create: UserCreate) -> User:
+        """
+        Raises BreachedPasswordError if the password is in the breached password filter
+        """
+        breached_passwords.check(user_create.password)
         hashed_password = get_password_hash(user_create.password)
         db_user = User(
             email=user_create.email,
@@ -30,8 +127,11 @@ class UserService:
             role=user_create.role
         )
         self.db.add(db_user)
+        self._record_event(db_user, "user.created")
+        self.stats.user_created(db_user)
         self.db.commit()
         self.db.refresh(db_user)
+        outbox_relay.notify()
         return db_user
 
     def create_oauth_user(self, user_create: UserCreate, provider: str) -> User:
@@ -47,25 +147,45 @@ class UserService:
             is_verified=getattr(user_create, 'is_verified', True)  # OAuth users are usually verified
         )
         self.db.add(db_user)
+        self._record_event(db_user, "user.created")
+        self.stats.user_created(db_user)
         self.db.commit()
         self.db.refresh(db_user)
+        outbox_relay.notify()
         return db_user
 
     def update_user(self, user_id: int, user_update: UserUpdate) -> Optional[User]:
+        """
+        Raises BreachedPasswordError if a new password is in the breached password filter
+        """
         db_user = self.get_user_by_id(user_id)
         if not db_user:
             return None
         
-        update_data = user_update.dict(exclude_unset=True)
+        update_data = user_update.model_dump(exclude_unset=True)
         
         if "password" in update_data:
+            breached_passwords.check(update_data["password"])
             update_data["hashed_password"] = get_password_hash(update_data.pop("password"))
         
+        counted_as = user_stat_keys(db_user)
+        changed = [field for field, value in update_data.items() if getattr(db_user, field) != value]
         for field, value in update_data.items():
             setattr(db_user, field, value)
+        if any(field in PRINCIPAL_FIELDS for field in changed):
+            self._bump_token_version(db_user)
+        if changed:
+            self._record_event(
+                db_user, "user.updated",
+                changed=["password" if field == "hashed_password" else field for field in changed]
+            )
+            self.stats.user_changed(counted_as, db_user)
         
         self.db.commit()
         self.db.refresh(db_user)
+        self._publish_token_version(db_user)
+        if changed:
+            outbox_relay.notify()
         return db_user
 
     def authenticate_user(self, email: str, password: str) -> Optional[User]:
@@ -77,8 +197,14 @@ class UserService:
         if not user.is_active:
             return None
         
-        # Update last login
-        user.last_login = datetime.utcnow()
+        # Update last login. Not a change to the user: keep updated_at, so
+        # logins do not show up in /users/changes, ETags or token versions
+        self.db.execute(
+            update(User)
+            .where(User.id == user.id)
+            .values(last_login=datetime.utcnow(), updated_at=User.updated_at)
+            .execution_options(synchronize_session=False)
+        )
         self.db.commit()
         return user
 
@@ -87,9 +213,15 @@ class UserService:
         if not db_user:
             return None
         
+        counted_as = user_stat_keys(db_user)
         db_user.is_active = False
+        self._bump_token_version(db_user)
+        self._record_event(db_user, "user.deactivated")
+        self.stats.user_changed(counted_as, db_user)
         self.db.commit()
         self.db.refresh(db_user)
+        self._publish_token_version(db_user)
+        outbox_relay.notify()
         return db_user
 
     def activate_user(self, user_id: int) -> Optional[User]:
@@ -97,9 +229,15 @@ class UserService:
         if not db_user:
             return None
         
+        counted_as = user_stat_keys(db_user)
         db_user.is_active = True
+        self._bump_token_version(db_user)
+        self._record_event(db_user, "user.activated")
+        self.stats.user_changed(counted_as, db_user)
         self.db.commit()
         self.db.refresh(db_user)
+        self._publish_token_version(db_user)
+        outbox_relay.notify()
         return db_user
 
     def change_user_role(self, user_id: int, new_role: UserRole) -> Optional[User]:
@@ -107,9 +245,15 @@ class UserService:
         if not db_user:
             return None
         
+        counted_as = user_stat_keys(db_user)
         db_user.role = new_role
+        self._bump_token_version(db_user)
+        self._record_event(db_user, "user.role_changed", changed=["role"])
+        self.stats.user_changed(counted_as, db_user)
         self.db.commit()
         self.db.refresh(db_user)
+        self._publish_token_version(db_user)
+        outbox_relay.notify()
         return db_user
 
     def verify_user(self, user_id: int) -> Optional[User]:
@@ -117,7 +261,51 @@ class UserService:
         if not db_user:
             return None
         
+        counted_as = user_stat_keys(db_user)
         db_user.is_verified = True
+        self._record_event(db_user, "user.verified")
+        self.stats.user_changed(counted_as, db_user)
         self.db.commit()
         self.db.refresh(db_user)
-        return db_user
\ No newline at end of file
+        outbox_relay.notify()
+        return db_user
+
+    def revoke_tokens(self, user_id: int) -> Optional[User]:
+        """
+        Invalidate every token issued to the user so far (logout everywhere)
+        """
+        db_user = self.get_user_by_id(user_id)
+        if not db_user:
+            return None
+
+        self._bump_token_version(db_user)
+        self.db.commit()
+        self.db.refresh(db_user)
+        self._publish_token_version(db_user)
+        return db_user
+
+    def _bump_token_version(self, db_user: User) -> None:
+        # Incremented in SQL so concurrent bumps from other workers are not lost
+        db_user.token_version = User.token_version + 1
+
+    def _publish_token_version(self, db_user: User) -> None:
+        token_versions.bumped(db_user.id, db_user.token_version)
+
+    def _record_event(self, db_user: User, event_type: str, changed: Sequence[str] = ()) -> None:
+        """
+        Add a change event to the outbox; it commits (or rolls back) with the change itself
+
+        Nothing but the relay reads the outbox, so without it no events are kept.
+        """
+        if not settings.OUTBOX_RELAY_ENABLED:
+            return
+        # Flush so the snapshot has the id and the database-generated columns
+        self.db.flush()
+        self.db.add(OutboxEvent(
+            event_type=event_type,
+            user_id=db_user.id,
+            payload=orjson.dumps({
+                "user": UserSchema.model_validate(db_user).model_dump(mode="json"),
+                "changed": list(changed)
+            }).decode()
+        ))
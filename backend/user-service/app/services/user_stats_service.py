@@ -0,0 +1,242 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, FrozenSet, Optional, Tuple
+import structlog
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.metrics import user_stats_reconciliations_total
+from app.db.database import SessionLocal
+from app.models.user import User, UserRole
+from app.models.user_stat import UserStat
+
+logger = structlog.get_logger()
+
+RECONCILED_AT = "reconciled_at"
+RECONCILE_CLAIMED_AT = "reconcile_claimed_at"
+
+
+def user_stat_keys(db_user: User) -> FrozenSet[str]:
+    """The counters a user in its current state contributes one to"""
+    keys = {"users", f"role:{UserRole(db_user.role or UserRole.USER).value}"}
+    if db_user.is_active is not False:
+        keys.add("active")
+    if db_user.is_verified:
+        keys.add("verified")
+    return frozenset(keys)
+
+
+def signup_key(day: date) -> str:
+    return f"signups:{day.isoformat()}"
+
+
+class UserStatsService:
+    """
+    User counts for the admin dashboard, read from precomputed counters
+
+    UserService adjusts the counters in the same transaction as each change,
+    so reads are a primary key lookup per counter however many users there
+    are. ``reconcile`` recounts from the users table and corrects any drift
+    (changes made outside UserService, or a signup counted on the wrong
+    side of midnight).
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def user_changed(self, before: FrozenSet[str], db_user: User) -> None:
+        """Move the user's counts from the ``before`` keys to its current ones"""
+        after = user_stat_keys(db_user)
+        deltas = {key: 1 for key in after - before}
+        deltas.update({key: -1 for key in before - after})
+        if deltas:
+            self._upsert(deltas, increment=True)
+
+    def user_created(self, db_user: User) -> None:
+        deltas = {key: 1 for key in user_stat_keys(db_user)}
+        deltas[signup_key(datetime.utcnow().date())] = 1
+        self._upsert(deltas, increment=True)
+
+    def get_stats(self, days: int = 30) -> dict:
+        today = datetime.utcnow().date()
+        signup_days = [today - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+        role_keys = [f"role:{role.value}" for role in UserRole]
+        keys = ["users", "active", "verified", RECONCILED_AT, *role_keys, *(signup_key(day) for day in signup_days)]
+        values = dict(self.db.query(UserStat.key, UserStat.value).filter(UserStat.key.in_(keys)).all())
+
+        total = values.get("users", 0)
+        reconciled_at = values.get(RECONCILED_AT)
+        return {
+            "total": total,
+            "active": values.get("active", 0),
+            "inactive": total - values.get("active", 0),
+            "verified": values.get("verified", 0),
+            "unverified": total - values.get("verified", 0),
+            "by_role": {role.value: values.get(f"role:{role.value}", 0) for role in UserRole},
+            "daily_signups": [{"date": day, "count": values.get(signup_key(day), 0)} for day in signup_days],
+            "reconciled_at": datetime.utcfromtimestamp(reconciled_at) if reconciled_at else None
+        }
+
+    def reconcile(self, signup_days: int = 90, min_interval: Optional[float] = None) -> Optional[Dict[str, int]]:
+        """
+        Recount every counter from the users table and correct the drifted ones
+
+        Returns the corrections (new value minus old) keyed by counter, or
+        None when another process reconciled less than ``min_interval``
+        seconds ago or while this one was counting. Runs the full-table
+        aggregates, so call it off the request path.
+
+        The counters and the aggregates are read in one snapshot without
+        locks, so user writes carry on during the scan. Each change updates
+        its user and the counters in one transaction, so the difference
+        between the two within the snapshot is exactly the drift. It is then
+        added to the live counters, which keeps the changes made since.
+        """
+        now = time.time()
+        # Make sure the row exists, so it can be locked below
+        self._upsert({RECONCILED_AT: 0}, increment=True)
+        self.db.commit()
+        if min_interval is not None and not self._claim(now, min_interval):
+            return None
+
+        stored, actual = self._count(signup_days)
+        corrections = {
+            key: value - stored.get(key, 0)
+            for key, value in actual.items()
+            if value != stored.get(key, 0)
+        }
+
+        # Only reconcilers touch this row, so the lock does not hold up user
+        # writes; a changed value means another process already corrected the
+        # counters after our snapshot was taken, and adding ours would count
+        # the drift twice
+        reconciled_at = self.db.query(UserStat.value).filter(UserStat.key == RECONCILED_AT).with_for_update().scalar()
+        if reconciled_at != stored.get(RECONCILED_AT):
+            self.db.rollback()
+            return None
+        if corrections:
+            self._upsert(corrections, increment=True)
+        # Strictly increasing, so two runs within one second still differ
+        self._upsert({RECONCILED_AT: max(int(now), (reconciled_at or 0) + 1)}, increment=False)
+        self.db.commit()
+
+        user_stats_reconciliations_total.labels(outcome="corrected" if corrections else "clean").inc()
+        if corrections:
+            logger.warning("User stats drift corrected", corrections=corrections)
+        return corrections
+
+    def _claim(self, now: float, min_interval: float) -> bool:
+        """
+        Record that this process reconciles now, unless another one did within ``min_interval``
+
+        Keeps every worker from running the full scan when they start together.
+        """
+        dialect = postgresql if self.db.get_bind().dialect.name == "postgresql" else sqlite
+        statement = dialect.insert(UserStat).values(key=RECONCILE_CLAIMED_AT, value=int(now))
+        claimed = self.db.execute(statement.on_conflict_do_update(
+            index_elements=[UserStat.key],
+            set_={"value": statement.excluded.value, "updated_at": func.now()},
+            where=UserStat.value <= int(now - min_interval)
+        )).rowcount == 1
+        self.db.commit()
+        return claimed
+
+    def _count(self, signup_days: int) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """The stored counters and their values recounted from users, read in one snapshot"""
+        bind = self.db.get_bind()
+        if bind.dialect.name == "postgresql":
+            # One snapshot for every statement of the transaction
+            bind = bind.execution_options(isolation_level="REPEATABLE READ")
+        snapshot = Session(bind=bind)
+        try:
+            stored = dict(snapshot.query(UserStat.key, UserStat.value).all())
+
+            actual: Dict[str, int] = {"users": 0, "active": 0, "verified": 0}
+            actual.update({f"role:{role.value}": 0 for role in UserRole})
+            groups = snapshot.query(
+                User.role, User.is_active, User.is_verified, func.count(User.id)
+            ).group_by(User.role, User.is_active, User.is_verified).all()
+            for role, is_active, is_verified, count in groups:
+                actual["users"] += count
+                actual[f"role:{UserRole(role or UserRole.USER).value}"] += count
+                if is_active is not False:
+                    actual["active"] += count
+                if is_verified:
+                    actual["verified"] += count
+
+            first_day = datetime.utcnow().date() - timedelta(days=signup_days - 1)
+            actual.update({signup_key(first_day + timedelta(days=offset)): 0 for offset in range(signup_days)})
+            signup_day = func.date(User.created_at)
+            signups = snapshot.query(signup_day, func.count(User.id)).filter(
+                User.created_at >= datetime.combine(first_day, datetime.min.time())
+            ).group_by(signup_day).all()
+            for day, count in signups:
+                key = signup_key(day if isinstance(day, date) else date.fromisoformat(str(day)[:10]))
+                if key in actual:
+                    actual[key] = count
+        finally:
+            snapshot.close()
+        return stored, actual
+
+    def _upsert(self, values: Dict[str, int], increment: bool) -> None:
+        dialect = postgresql if self.db.get_bind().dialect.name == "postgresql" else sqlite
+        # Sorted so concurrent transactions lock the counter rows in one order
+        statement = dialect.insert(UserStat).values(
+            [{"key": key, "value": values[key]} for key in sorted(values)]
+        )
+        new_value = UserStat.value + statement.excluded.value if increment else statement.excluded.value
+        self.db.execute(statement.on_conflict_do_update(
+            index_elements=[UserStat.key],
+            set_={"value": new_value, "updated_at": func.now()}
+        ))
+
+
+class UserStatsReconciler:
+    """
+    Runs UserStatsService.reconcile every ``interval`` seconds in the background
+
+    Every process runs one; the timestamp stored with the counters lets only
+    the first of them per interval do the work. The first run happens at
+    startup, so counters are filled in on a database that predates them.
+    """
+
+    def __init__(self, interval: float = 3600.0, signup_days: int = 90):
+        self.interval = interval
+        self.signup_days = signup_days
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="user-stats-reconciler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            db = SessionLocal()
+            try:
+                corrections = UserStatsService(db).reconcile(self.signup_days, min_interval=self.interval / 2)
+                if corrections is None:
+                    user_stats_reconciliations_total.labels(outcome="skipped").inc()
+            except Exception as e:
+                db.rollback()
+                logger.warning("User stats reconciliation failed", error=str(e))
+            finally:
+                db.close()
+            self._stopped.wait(self.interval)
+
+
+user_stats_reconciler = UserStatsReconciler(
+    interval=settings.USER_STATS_RECONCILE_SECONDS,
+    signup_days=settings.USER_STATS_SIGNUP_DAYS
+)
@@ -1,46 +1,122 @@
+import hmac
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.db.database import get_db
 from app.core.security import verify_token
+from app.core.principals import Principal, token_versions
+from app.core.revocation import revoked_tokens
 from app.services.user_service import UserService
 from app.models.user import User, UserRole
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    token = credentials.credentials
+
+
+def get_access_token_payload(token: str, db: Session) -> dict:
+    """
+    Claims of a valid, unrevoked access token; raises 401 otherwise
+    """
     payload = verify_token(token)
     
     if payload is None:
-        raise credentials_exception
+        raise credentials_exception()
     
     if payload.get("type") != "access":
-        raise credentials_exception
+        raise credentials_exception()
     
     user_id: str = payload.get("sub")
     if user_id is None:
-        raise credentials_exception
+        raise credentials_exception()
+    
+    # Only tokens the filter flags are looked up in the denylist
+    if revoked_tokens.is_revoked(db, payload.get("jti")):
+        raise credentials_exception()
+    
+    return payload
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    payload = get_access_token_payload(credentials.credentials, db)
     
     user_service = UserService(db)
-    user = user_service.get_user_by_id(int(user_id))
+    user = user_service.get_user_by_id(int(payload["sub"]))
     if user is None:
-        raise credentials_exception
+        raise credentials_exception()
+    
+    # Issued before a logout-all or status change
+    if payload.get("ver", 0) < (user.token_version or 0):
+        raise credentials_exception()
     
     return user
 
 
+def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> Principal:
+    """
+    Caller identity for endpoints that only authorize and do not need the user row
+
+    In stateless mode this is built from the token's claims without touching
+    the database (the session from get_db is never used); otherwise, or for
+    tokens issued without claims, it is loaded from the user row, with
+    concurrent requests for the same user sharing one query.
+    """
+    if settings.STATELESS_PRINCIPALS_ENABLED:
+        payload = verify_token(credentials.credentials)
+        principal = Principal.from_claims(payload) if payload and payload.get("type") == "access" else None
+        if principal is not None:
+            if (
+                not token_versions.is_current(principal.id, principal.token_version)
+                or revoked_tokens.is_revoked(db, payload.get("jti"))
+            ):
+                raise credentials_exception()
+            return principal
+
+    payload = get_access_token_payload(credentials.credentials, db)
+    principal = UserService(db).get_principal_coalesced(int(payload["sub"]))
+    # Issued before a logout-all or status change
+    if principal is None or payload.get("ver", 0) < principal.token_version:
+        raise credentials_exception()
+    return principal
+
+
+def get_current_active_principal(
+    principal: Principal = Depends(get_current_principal)
+) -> Principal:
+    if not principal.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, 
+            detail="Inactive user"
+        )
+    return principal
+
+
+def get_current_admin_principal(
+    principal: Principal = Depends(get_current_active_principal)
+) -> Principal:
+    if principal.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return principal
+
+
 def get_current_active_user(
     current_user: User = Depends(get_current_user)
 ) -> User:
@@ -60,4 +136,60 @@ def get_current_admin_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
-    return current_user
\ No newline at end of file
+    return current_user
+
+
+def is_service_key(key: Optional[str]) -> bool:
+    if not key:
+        return False
+    keys = [k.strip() for k in settings.SERVICE_API_KEYS.split(",") if k.strip()]
+    return any(hmac.compare_digest(key.encode(), k.encode()) for k in keys)
+
+
+def get_service_or_admin(
+    x_service_key: Optional[str] = Header(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: Session = Depends(get_db)
+) -> Optional[Principal]:
+    """
+    Allow other services (by X-Service-Key) or an admin user; returns the admin, if any
+    """
+    if is_service_key(x_service_key):
+        return None
+
+    if credentials is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    principal = get_current_principal(credentials, db)
+    return get_current_admin_principal(get_current_active_principal(principal))
+
+
+def get_device_info(request: Request) -> dict:
+    """
+    Describe the calling device for the session list
+    """
+    return {
+        "user_agent": request.headers.get("user-agent"),
+        "ip_address": request.client.host if request.client else None
+    }
+
+
+def get_current_token_payload(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> dict:
+    """
+    Claims of the presented access token (validated by the user dependencies)
+    """
+    return verify_token(credentials.credentials) or {}
+
+
+def get_current_session_id(
+    payload: dict = Depends(get_current_token_payload)
+) -> Optional[str]:
+    """
+    Session the presented access token belongs to, if it was issued with one
+    """
+    return payload.get("sid")
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Lookup latency and resident memory of the breached password filter
+
+Builds a filter from ``--entries`` random SHA-1 hashes with the real
+builder, memory-maps it the way the service does, and reports:
+
+- build time and file size
+- per-lookup latency (median and p99) for breached and unknown
+  passwords, including the SHA-1 of the password
+- the measured false positive rate
+- resident memory before and after the lookups, split into anonymous
+  memory (private to the process) and file-backed pages (page cache,
+  shared by every worker mapping the same file)
+
+Examples:
+    python benchmarks/breached_passwords.py
+    python benchmarks/breached_passwords.py --entries 10000000 --lookups 200000 --error-rate 0.001
+    python benchmarks/breached_passwords.py --filter /data/breached.bpf --lookups 100000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key")
+
+import build_breached_password_filter  # noqa: E402
+from app.core.breached_passwords import BreachedPasswordFilter  # noqa: E402
+
+BATCH = 1000
+
+
+def memory_kb() -> Dict[str, int]:
+    """Resident memory from /proc (Linux); empty elsewhere"""
+    fields = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in ("VmRSS", "RssAnon", "RssFile"):
+                    fields[name] = int(value.split()[0])
+    except OSError:
+        pass
+    return fields
+
+
+def breached_password(i: int) -> str:
+    return f"breached-{i}"
+
+
+def build_filter(entries: int, error_rate: float, directory: str) -> Dict[str, Any]:
+    hashes = os.path.join(directory, "hashes.txt")
+    with open(hashes, "w") as f:
+        for i in range(entries):
+            f.write(hashlib.sha1(breached_password(i).encode()).hexdigest().upper() + f":{i % 100 + 1}\n")
+
+    output = os.path.join(directory, "breached.bpf")
+    started = time.perf_counter()
+    build_breached_password_filter.main([hashes, "-o", output, "--capacity", str(entries), "--error-rate", str(error_rate)])
+    return {"path": output, "build_s": round(time.perf_counter() - started, 2)}
+
+
+def time_lookups(bloom: BreachedPasswordFilter, passwords: List[str]) -> Dict[str, Any]:
+    """Per-lookup latency, measured over batches so timer overhead does not dominate"""
+    per_lookup = []
+    hits = 0
+    for start in range(0, len(passwords), BATCH):
+        batch = passwords[start:start + BATCH]
+        started = time.perf_counter()
+        for password in batch:
+            if password in bloom:
+                hits += 1
+        per_lookup.append((time.perf_counter() - started) / len(batch))
+    per_lookup.sort()
+    return {
+        "lookups": len(passwords),
+        "hits": hits,
+        "median_us": round(statistics.median(per_lookup) * 1e6, 3),
+        "p99_us": round(per_lookup[min(len(per_lookup) - 1, int(len(per_lookup) * 0.99))] * 1e6, 3)
+    }
+
+
+def run(args, filter_path: Optional[str] = None) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory(prefix="authify-breached-") as directory:
+        generated = filter_path is None
+        if generated:
+            print(f"🔧 Building a filter of {args.entries} hashes...", file=sys.stderr)
+            built = build_filter(args.entries, args.error_rate, directory)
+            filter_path = built["path"]
+            results["build_s"] = built["build_s"]
+
+        # Only a generated filter has known members to look up; built before
+        # the first reading so the lists do not count as filter memory
+        known = [breached_password(i) for i in range(min(args.entries, args.lookups))] if generated else []
+        unknown = [f"not-breached-{i}" for i in range(args.lookups)]
+
+        before_open = memory_kb()
+        bloom = BreachedPasswordFilter(filter_path)
+        after_open = memory_kb()
+        results.update({
+            "entries": bloom.count,
+            "hashes_per_entry": bloom.num_hashes,
+            "file_bytes": bloom.size_bytes,
+            "bits_per_entry": round(bloom.size_bytes * 8 / max(1, bloom.count), 2)
+        })
+
+        print(f"🔍 {len(known)} breached and {len(unknown)} unknown lookups...", file=sys.stderr)
+        results["breached"] = time_lookups(bloom, known) if known else None
+        results["unknown"] = time_lookups(bloom, unknown)
+        results["false_positive_rate"] = round(results["unknown"]["hits"] / len(unknown), 6)
+        after_lookups = memory_kb()
+        results["memory_kb"] = {"before_open": before_open, "after_open": after_open, "after_lookups": after_lookups}
+        bloom.close()
+    return results
+
+
+def report(results: Dict[str, Any]) -> str:
+    lines = [
+        f"entries            {results['entries']}",
+        f"file size          {results['file_bytes'] / 1e6:.1f} MB ({results['bits_per_entry']} bits/entry, "
+        f"{results['hashes_per_entry']} hashes)",
+    ]
+    if "build_s" in results:
+        lines.append(f"build time         {results['build_s']} s")
+    for kind in ("breached", "unknown"):
+        if results.get(kind):
+            lines.append(
+                f"{kind + ' lookup':<19}median {results[kind]['median_us']} us, p99 {results[kind]['p99_us']} us"
+            )
+    lines.append(f"false positives    {results['false_positive_rate']:.4%}")
+    for stage, memory in results["memory_kb"].items():
+        if memory:
+            lines.append(
+                f"{'rss ' + stage.replace('_', ' '):<19}{memory.get('VmRSS', 0) / 1024:.1f} MB "
+                f"(anon {memory.get('RssAnon', 0) / 1024:.1f} MB, file-backed {memory.get('RssFile', 0) / 1024:.1f} MB)"
+            )
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Breached password filter benchmark")
+    parser.add_argument("--entries", type=int, default=1_000_000, help="Hashes in the generated filter")
+    parser.add_argument("--error-rate", type=float, default=0.001)
+    parser.add_argument("--lookups", type=int, default=100_000, help="Lookups per kind")
+    parser.add_argument("--filter", help="Measure an existing filter file instead of building one")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = run(args, filter_path=args.filter)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps({"timestamp": time.time(), **results}, indent=2))
+
+    print(report(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
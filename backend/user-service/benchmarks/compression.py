@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+CPU cost against bytes saved of the response encodings for user lists
+
+Renders ``GET /users/`` bodies of typical sizes with the real response
+schema, then compresses each with every encoding and level through the
+same encoders the middleware uses. Reports the compressed size, the share
+of bytes saved, and the CPU time per response (median of ``--repeat``
+runs, single thread), so the configured levels can be checked against the
+bandwidth they buy.
+
+Examples:
+    python benchmarks/compression.py
+    python benchmarks/compression.py --sizes 100 1000 5000 --repeat 50
+    python benchmarks/compression.py --output results/compression.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+# Settings are read at import time; nothing here touches the database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key")
+
+from app.core.compression import BrotliEncoder, GzipEncoder, ZstdEncoder  # noqa: E402
+from app.schemas.user import user_list_adapter  # noqa: E402
+
+DEFAULT_SIZES = [10, 100, 1000]
+LEVELS = {
+    "gzip": (GzipEncoder, [1, 6, 9]),
+    "br": (BrotliEncoder, [1, 4, 6, 11]),
+    "zstd": (ZstdEncoder, [1, 3, 9, 19]),
+}
+
+
+def user_list_body(count: int) -> bytes:
+    """A /users/ response with ``count`` realistic-looking users"""
+    created = datetime(2024, 1, 1)
+    users = [
+        {
+            "id": i,
+            "email": f"user{i}.{(i * 7919) % 100000}@example{i % 13}.com",
+            "full_name": f"User {i} Lastname{(i * 31) % 997}",
+            "is_active": i % 17 != 0,
+            "role": ("USER", "AGENT", "ADMIN")[i % 3 if i % 50 == 0 else 0],
+            "is_verified": i % 4 != 0,
+            "created_at": created + timedelta(minutes=i * 37),
+            "updated_at": created + timedelta(minutes=i * 37, seconds=i % 60, microseconds=i * 1013 % 1000000),
+            "last_login": created + timedelta(days=i % 90, seconds=i * 11) if i % 5 else None
+        }
+        for i in range(1, count + 1)
+    ]
+    return user_list_adapter.dump_json(user_list_adapter.validate_python(users))
+
+
+def measure(encoder_class, level: int, body: bytes, repeat: int) -> Dict[str, Any]:
+    timings = []
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encoder = encoder_class(level)
+        size = len(encoder.compress(body) + encoder.finish())
+        timings.append(time.perf_counter() - started)
+    seconds = statistics.median(timings)
+    return {
+        "level": level,
+        "bytes": size,
+        "saved_pct": round((1 - size / len(body)) * 100, 1),
+        "cpu_ms": round(seconds * 1000, 3),
+        "mb_per_s": round(len(body) / seconds / 1e6, 1) if seconds > 0 else 0.0
+    }
+
+
+def run(sizes: List[int], repeat: int) -> Dict[str, Any]:
+    results = {}
+    for count in sizes:
+        body = user_list_body(count)
+        print(f"🔍 {count} users ({len(body)} bytes)...", file=sys.stderr)
+        results[str(count)] = {
+            "identity_bytes": len(body),
+            "encodings": {
+                name: [measure(encoder_class, level, body, repeat) for level in levels]
+                for name, (encoder_class, levels) in LEVELS.items()
+            }
+        }
+    return results
+
+
+def results_table(results: Dict[str, Any]) -> str:
+    lines = [f"{'users':>6} {'identity':>10} {'encoding':>9} {'level':>5} {'bytes':>10} {'saved':>7} {'cpu ms':>9} {'MB/s':>8}"]
+    for count, result in results.items():
+        for name, runs in result["encodings"].items():
+            for run in runs:
+                lines.append(
+                    f"{count:>6} {result['identity_bytes']:>10} {name:>9} {run['level']:>5} {run['bytes']:>10} "
+                    f"{run['saved_pct']:>6}% {run['cpu_ms']:>9.3f} {run['mb_per_s']:>8.1f}"
+                )
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="User Service response compression benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Users per response")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per encoding and level (median is reported)")
+    parser.add_argument("--output", help="Write results JSON to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = run(args.sizes, args.repeat)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps({"timestamp": time.time(), "sizes": results}, indent=2))
+
+    print(results_table(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for security primitives, UserService queries and serialization
+
+Times the hot functions in ``app/core/security.py``, every ``UserService``
+method against tables of different sizes, and rendering lists of ``User``
+rows to JSON the way the admin list endpoint does. Each benchmark is warmed up,
+calibrated so a round takes at least ``--min-round-time``, then repeated for
+``--rounds`` rounds; per-call min/median/mean/stddev/IQR are reported. Runs are
+appended to a JSON-lines history file and compared against the previous run.
+
+Examples:
+    python benchmarks/micro_benchmarks.py
+    python benchmarks/micro_benchmarks.py --group security --bcrypt-rounds 10 12
+    python benchmarks/micro_benchmarks.py --group user_service --sizes 1000 100000
+    python benchmarks/micro_benchmarks.py --filter get_user_by --no-save
+    python benchmarks/micro_benchmarks.py --group serialization --serialize-sizes 1000 10000
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, Any, List, Optional
+
+# Add the service root to the Python path so ``app`` is importable
+SERVICE_ROOT = Path(__file__).resolve().parent.parent
+sys.path.append(str(SERVICE_ROOT))
+
+# Settings are read at import time; the benchmarks bind their own engines
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key")
+
+import orjson  # noqa: E402
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core import security  # noqa: E402
+from app.core.bloom import BloomFilter  # noqa: E402
+from app.db.database import Base  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+from app.schemas.user import UserCreate, UserUpdate, user_list_adapter, partial_user_list_adapter  # noqa: E402
+from app.services.user_service import UserService  # noqa: E402
+
+DEFAULT_HISTORY = Path(__file__).resolve().parent / "results" / "micro_history.jsonl"
+PASSWORD = "benchpassword123"
+
+
+class BenchmarkRunner:
+    def __init__(self, rounds: int, min_round_time: float, warmup: int, name_filter: Optional[str] = None):
+        self.rounds = rounds
+        self.min_round_time = min_round_time
+        self.warmup = warmup
+        self.name_filter = name_filter
+        self.results: List[Dict[str, Any]] = []
+
+    def run(self, name: str, func: Callable[[], Any], group: str, **params) -> Optional[Dict[str, Any]]:
+        if self.name_filter and self.name_filter not in name:
+            return None
+
+        for _ in range(self.warmup):
+            func()
+
+        # Calibrate iterations so timer resolution does not dominate fast calls
+        start = time.perf_counter()
+        func()
+        single = max(time.perf_counter() - start, 1e-9)
+        iterations = max(1, int(self.min_round_time / single))
+
+        samples = []
+        for _ in range(self.rounds):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            samples.append((time.perf_counter() - start) / iterations)
+
+        samples.sort()
+        quartiles = statistics.quantiles(samples, n=4) if len(samples) > 1 else [samples[0]] * 3
+        result = {
+            "name": name,
+            "group": group,
+            "params": params,
+            "rounds": self.rounds,
+            "iterations": iterations,
+            "min": samples[0],
+            "max": samples[-1],
+            "mean": statistics.fmean(samples),
+            "median": statistics.median(samples),
+            "stddev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+            "iqr": quartiles[2] - quartiles[0],
+            "ops": 1.0 / statistics.median(samples)
+        }
+        self.results.append(result)
+        print(format_row(result), file=sys.stderr)
+        return result
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    params = ",".join(f"{key}={value}" for key, value in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]" if params else result["name"]
+
+
+def format_time(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:8.3f} s "
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:8.3f} ms"
+    return f"{seconds * 1e6:8.3f} us"
+
+
+def format_row(result: Dict[str, Any]) -> str:
+    return (
+        f"{result_key(result):<48} median {format_time(result['median'])}  "
+        f"mean {format_time(result['mean'])}  stddev {format_time(result['stddev'])}  "
+        f"iqr {format_time(result['iqr'])}  {result['ops']:>12.1f} ops/s"
+    )
+
+
+def bench_security(runner: BenchmarkRunner, bcrypt_rounds: List[int]):
+    for rounds in bcrypt_rounds:
+        context = security.pwd_context.copy(bcrypt__rounds=rounds)
+        hashed = context.hash(PASSWORD)
+        runner.run("get_password_hash", lambda: context.hash(PASSWORD), "security", bcrypt_rounds=rounds)
+        runner.run(
+            "verify_password", lambda: context.verify(PASSWORD, hashed), "security", bcrypt_rounds=rounds
+        )
+
+    access_token = security.create_access_token(subject=42)
+    refresh_token = security.create_refresh_token(subject=42)
+    runner.run("create_access_token", lambda: security.create_access_token(subject=42), "security")
+    runner.run("create_refresh_token", lambda: security.create_refresh_token(subject=42), "security")
+    runner.run("verify_token", lambda: security.verify_token(access_token), "security", type="access")
+    runner.run("verify_token", lambda: security.verify_token(refresh_token), "security", type="refresh")
+    runner.run("verify_token", lambda: security.verify_token("not-a-token"), "security", type="invalid")
+
+    # The per-request revocation check for a token that was never revoked
+    revoked = BloomFilter.from_items((f"revoked-{i}" for i in range(100000)), capacity=100000)
+    runner.run("revoked_token_filter", lambda: "not-revoked" in revoked, "security", revoked=100000)
+
+
+def seed_users(session_factory, size: int, hashed_password: str):
+    db = session_factory()
+    try:
+        batch = []
+        for i in range(size):
+            batch.append({
+                "email": f"seed-{i}@example.com",
+                "hashed_password": hashed_password,
+                "full_name": f"Seed User {i}",
+                "is_active": True,
+                "is_verified": i % 2 == 0,
+                "role": UserRole.USER
+            })
+            if len(batch) == 10000:
+                db.execute(insert(User), batch)
+                batch = []
+        if batch:
+            db.execute(insert(User), batch)
+        db.commit()
+    finally:
+        db.close()
+
+
+def bench_user_service(runner: BenchmarkRunner, sizes: List[int], database_url: Optional[str]):
+    hashed_password = security.get_password_hash(PASSWORD)
+
+    for size in sizes:
+        url = database_url or f"sqlite:///{tempfile.mkdtemp()}/micro.db"
+        connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+        engine = create_engine(url, connect_args=connect_args)
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        print(f"🔍 Seeding {size} users...", file=sys.stderr)
+        seed_users(session_factory, size, hashed_password)
+
+        db = session_factory()
+        service = UserService(db)
+        middle_id = size // 2 or 1
+        middle_email = f"seed-{middle_id - 1}@example.com"
+        counter = iter(range(10 ** 9))
+
+        def fresh_email() -> str:
+            return f"bench-{next(counter)}@example.com"
+
+        # Reads expire the identity map first so each call issues its query
+        def read(call):
+            def run():
+                db.expire_all()
+                return call()
+            return run
+
+        runner.run("get_user_by_id", read(lambda: service.get_user_by_id(middle_id)), "user_service", rows=size)
+        runner.run(
+            "get_user_by_email", read(lambda: service.get_user_by_email(middle_email)), "user_service", rows=size
+        )
+        runner.run("get_users", read(lambda: service.get_users(skip=0, limit=100)), "user_service", rows=size, limit=100)
+        runner.run(
+            "get_users", read(lambda: service.get_users(skip=0, limit=1000)), "user_service", rows=size, limit=1000
+        )
+        runner.run(
+            "get_users",
+            read(lambda: service.get_users(skip=max(0, size - 100), limit=100)),
+            "user_service", rows=size, limit=100, offset="tail"
+        )
+        runner.run(
+            "create_user",
+            lambda: service.create_user(UserCreate(email=fresh_email(), password=PASSWORD)),
+            "user_service", rows=size
+        )
+        runner.run(
+            "create_oauth_user",
+            lambda: service.create_oauth_user(UserCreate(email=fresh_email(), password=""), provider="google"),
+            "user_service", rows=size
+        )
+        runner.run(
+            "update_user",
+            lambda: service.update_user(middle_id, UserUpdate(full_name=f"Renamed {next(counter)}")),
+            "user_service", rows=size
+        )
+        runner.run(
+            "authenticate_user", lambda: service.authenticate_user(middle_email, PASSWORD), "user_service", rows=size
+        )
+        runner.run("deactivate_user", lambda: service.deactivate_user(middle_id), "user_service", rows=size)
+        runner.run("activate_user", lambda: service.activate_user(middle_id), "user_service", rows=size)
+        runner.run(
+            "change_user_role",
+            lambda: service.change_user_role(middle_id, UserRole.AGENT), "user_service", rows=size
+        )
+        runner.run("verify_user", lambda: service.verify_user(middle_id), "user_service", rows=size)
+
+        db.close()
+        engine.dispose()
+
+
+def bench_serialization(runner: BenchmarkRunner, sizes: List[int]):
+    engine = create_engine(f"sqlite:///{tempfile.mkdtemp()}/serialize.db")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    seed_users(session_factory, max(sizes), security.get_password_hash(PASSWORD))
+
+    db = session_factory()
+    for size in sizes:
+        users = UserService(db).get_users(skip=0, limit=size)
+
+        # What a response_model endpoint does: validate into models, dump them
+        # to JSON-compatible dicts, then encode (stdlib json for JSONResponse)
+        def response_model_json():
+            content = user_list_adapter.dump_python(
+                user_list_adapter.validate_python(users, from_attributes=True), mode="json"
+            )
+            return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+        def response_model_orjson():
+            content = user_list_adapter.dump_python(
+                user_list_adapter.validate_python(users, from_attributes=True), mode="json"
+            )
+            return orjson.dumps(content)
+
+        # What adapter_response does: one validate and one dump_json in pydantic-core
+        def type_adapter_json():
+            return user_list_adapter.dump_json(user_list_adapter.validate_python(users, from_attributes=True))
+
+        runner.run("serialize_users", response_model_json, "serialization", rows=size, path="response_model+json")
+        runner.run("serialize_users", response_model_orjson, "serialization", rows=size, path="response_model+orjson")
+        runner.run("serialize_users", type_adapter_json, "serialization", rows=size, path="type_adapter")
+
+        # End to end list endpoint work: query plus rendering, full rows vs ?fields=id,email,role
+        service = UserService(db)
+        fields = ("email", "role", "id")
+        fields_adapter = partial_user_list_adapter(fields)
+
+        def list_full():
+            db.expire_all()
+            return user_list_adapter.dump_json(
+                user_list_adapter.validate_python(service.get_users(limit=size), from_attributes=True)
+            )
+
+        def list_fields():
+            return fields_adapter.dump_json(
+                fields_adapter.validate_python(service.get_user_rows(fields, limit=size), from_attributes=True)
+            )
+
+        full_bytes, fields_bytes = len(list_full()), len(list_fields())
+        runner.run("list_users", list_full, "serialization", rows=size, fields="all", bytes=full_bytes)
+        runner.run("list_users", list_fields, "serialization", rows=size, fields="id,email,role", bytes=fields_bytes)
+
+    db.close()
+    engine.dispose()
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=SERVICE_ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_previous(history: Path) -> Optional[Dict[str, Any]]:
+    if not history.exists():
+        return None
+    lines = [line for line in history.read_text().splitlines() if line.strip()]
+    return json.loads(lines[-1]) if lines else None
+
+
+def print_comparison(current: Dict[str, Any], previous: Dict[str, Any]):
+    before = {result_key(result): result for result in previous["benchmarks"]}
+    print(f"\nCompared with {previous.get('revision') or 'previous run'} ({previous['timestamp']}):", file=sys.stderr)
+    for result in current["benchmarks"]:
+        old = before.get(result_key(result))
+        if not old:
+            continue
+        change = (result["median"] - old["median"]) / old["median"] * 100
+        print(
+            f"  {result_key(result):<48} {format_time(old['median'])} -> {format_time(result['median'])}  "
+            f"({change:+.1f}%)",
+            file=sys.stderr
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="User Service micro-benchmarks")
+    parser.add_argument("--group", choices=["all", "security", "user_service", "serialization"], default="all")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 100000], help="User table sizes")
+    parser.add_argument(
+        "--serialize-sizes", nargs="+", type=int, default=[1000, 10000], help="Rows per serialized list"
+    )
+    parser.add_argument("--bcrypt-rounds", nargs="+", type=int, default=[12], help="bcrypt cost factors to compare")
+    parser.add_argument("--database-url", help="Database for UserService benchmarks (default: temporary SQLite)")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--min-round-time", type=float, default=0.1, help="Minimum seconds per round")
+    parser.add_argument("--warmup", type=int, default=3, help="Untimed calls before measuring")
+    parser.add_argument("--history", default=str(DEFAULT_HISTORY), help="JSON-lines history file")
+    parser.add_argument("--no-save", action="store_true", help="Do not append this run to the history")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    runner = BenchmarkRunner(args.rounds, args.min_round_time, args.warmup, args.filter)
+
+    if args.group in ("all", "security"):
+        bench_security(runner, args.bcrypt_rounds)
+    if args.group in ("all", "user_service"):
+        bench_user_service(runner, args.sizes, args.database_url)
+    if args.group in ("all", "serialization"):
+        bench_serialization(runner, args.serialize_sizes)
+
+    run = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "benchmarks": runner.results
+    }
+
+    history = Path(args.history)
+    previous = load_previous(history)
+    if previous:
+        print_comparison(run, previous)
+
+    if not args.no_save:
+        history.parent.mkdir(parents=True, exist_ok=True)
+        with history.open("a") as f:
+            f.write(json.dumps(run) + "\n")
+
+    print(json.dumps(run, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Gunicorn configuration for production serving
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+Runs one uvicorn worker per CPU core. Password hashing and token signing are
+CPU bound and hold the GIL, so a single process only ever uses one core.
+The app is imported once in the master and forked into the workers, which
+are recycled after a jittered number of requests. Every value can be
+overridden with the environment variables below.
+"""
+
+import os
+import shutil
+import tempfile
+
+
+def cpu_count() -> int:
+    # Respect CPU affinity / container cpusets where the platform exposes them
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+bind = os.environ.get("BIND", "0.0.0.0:8001")
+workers = int(os.environ.get("WEB_CONCURRENCY", cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Import the app (settings, models, OAuth registry) once before forking
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+# Recycle workers to bound slow memory growth; the jitter keeps them from
+# restarting at the same time
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 1000))
+
+# Time a worker gets to finish in-flight requests on restart or shutdown
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# An empty GUNICORN_ACCESS_LOG disables the access log
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+# prometheus_client switches to multiprocess mode when this is set before it
+# is imported, which is why it is set here and not in the app. Each worker
+# writes its samples to files in this directory; /metrics aggregates them.
+# The config is loaded before the app is preloaded, so the directory is
+# prepared here; samples left over from a previous run are dropped.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "authify-metrics"))
+shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+
+
+def post_fork(server, worker):
+    # Connections opened by the master while preloading (create_all) must not
+    # be shared with the workers; each worker opens its own
+    from app.db.database import engine
+    engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Compile a breached password hash list into a filter file for the service
+
+Reads SHA-1 hashes, one per line, as uppercase or lowercase hex,
+optionally followed by ``:count`` as in the Have I Been Pwned "Pwned
+Passwords" downloads; ``--plaintext`` reads passwords instead. Writes a
+blocked Bloom filter that the service memory-maps when
+``BREACHED_PASSWORD_FILTER_PATH`` points to it.
+
+The file is written next to the output path and renamed into place, so
+running workers keep using the old file until they restart.
+
+Examples:
+    python scripts/build_breached_password_filter.py pwned-passwords-sha1-ordered-by-hash-v8.txt -o breached.bpf
+    python scripts/build_breached_password_filter.py hashes.txt -o breached.bpf --min-count 10 --error-rate 0.01
+    python scripts/build_breached_password_filter.py --plaintext rockyou.txt -o breached.bpf
+"""
+
+import argparse
+import mmap
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Iterator, List
+
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+# Settings are read at import time; the builder needs none of them
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("JWT_SECRET_KEY", "filter-builder")
+
+from app.core.breached_passwords import (  # noqa: E402
+    BLOCK_BYTES, HEADER, HEADER_SIZE, MAGIC, VERSION, filter_geometry, probes, sha1_digest
+)
+
+PROGRESS_EVERY = 10_000_000
+
+
+def read_digests(paths: List[str], plaintext: bool, min_count: int) -> Iterator[bytes]:
+    for path in paths:
+        source = sys.stdin.buffer if path == "-" else open(path, "rb")
+        try:
+            for line in source:
+                line = line.rstrip(b"\r\n")
+                if not line:
+                    continue
+                if plaintext:
+                    yield sha1_digest(line.decode("utf-8", "replace"))
+                    continue
+                hex_digest, _, count = line.partition(b":")
+                if min_count > 1 and count and int(count) < min_count:
+                    continue
+                if len(hex_digest) != 40:
+                    continue
+                try:
+                    yield bytes.fromhex(hex_digest.decode())
+                except ValueError:
+                    continue
+        finally:
+            if source is not sys.stdin.buffer:
+                source.close()
+
+
+def build(args) -> int:
+    capacity = args.capacity
+    if capacity is None:
+        if "-" in args.inputs:
+            print("--capacity is required when reading from stdin", file=sys.stderr)
+            return 2
+        print("🔍 Counting entries...", file=sys.stderr)
+        capacity = sum(1 for _ in read_digests(args.inputs, args.plaintext, args.min_count))
+
+    num_blocks, num_hashes = filter_geometry(capacity, args.error_rate)
+    size = HEADER_SIZE + num_blocks * BLOCK_BYTES
+    print(
+        f"🔧 {capacity} entries -> {num_blocks} blocks, {num_hashes} hashes per entry, {size / 1e6:.1f} MB",
+        file=sys.stderr
+    )
+
+    output = Path(args.output)
+    partial = output.with_name(output.name + ".partial")
+    started = time.perf_counter()
+    count = 0
+    with open(partial, "w+b") as f:
+        f.truncate(size)
+        data = mmap.mmap(f.fileno(), size)
+        try:
+            for digest in read_digests(args.inputs, args.plaintext, args.min_count):
+                block, offsets = probes(digest, num_blocks, num_hashes)
+                base = HEADER_SIZE + block * BLOCK_BYTES
+                for offset in offsets:
+                    data[base + (offset >> 3)] |= 1 << (offset & 7)
+                count += 1
+                if count % PROGRESS_EVERY == 0:
+                    print(f"   {count} entries added", file=sys.stderr)
+            data[:HEADER.size] = HEADER.pack(MAGIC, VERSION, num_hashes, num_blocks, count, args.error_rate)
+            data.flush()
+        finally:
+            data.close()
+    os.replace(partial, output)
+
+    if count > capacity:
+        print(f"⚠️  {count} entries exceed the capacity of {capacity}; the error rate is higher", file=sys.stderr)
+    print(f"✅ Wrote {output} ({count} entries) in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Build the breached password filter file")
+    parser.add_argument("inputs", nargs="+", help="Hash list files, or - for stdin")
+    parser.add_argument("-o", "--output", required=True, help="Filter file to write")
+    parser.add_argument("--error-rate", type=float, default=0.001, help="Target false positive rate")
+    parser.add_argument("--capacity", type=int, help="Number of entries (default: counted in a first pass)")
+    parser.add_argument("--min-count", type=int, default=1, help="Skip hashes seen fewer times than this")
+    parser.add_argument("--plaintext", action="store_true", help="Inputs are passwords, not SHA-1 hashes")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    return build(parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
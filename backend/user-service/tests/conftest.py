@@ -0,0 +1,92 @@
+import os
+import tempfile
+
+# Settings are read at import time, so configure them before importing the app
+_database = tempfile.NamedTemporaryFile(prefix="authify-test-", suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_database.name}"
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key")
+os.environ["OUTBOX_RELAY_ENABLED"] = "false"
+os.environ["USER_STATS_RECONCILE_ENABLED"] = "false"
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services import oauth_http  # noqa: E402
+from app.core.principals import token_versions  # noqa: E402
+from app.db.database import Base, SessionLocal, engine  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+@pytest.fixture(autouse=True)
+def database(monkeypatch):
+    """A fresh schema per test; in-process token versions start empty as well"""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(token_versions, "_versions", {})
+    yield
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def provider_http(monkeypatch):
+    """Serve outbound OAuth provider calls from ``handler(request)`` instead of the network"""
+    def install(handler) -> httpx.AsyncClient:
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(oauth_http, "get_http_client", lambda: client)
+        return client
+    return install
+
+
+@pytest.fixture
+def client():
+    # Not used as a context manager: startup hooks (background workers,
+    # OAuth discovery) do not run
+    return TestClient(app)
+
+
+@pytest.fixture
+def register(client):
+    def register(email: str = "user@example.com", password: str = PASSWORD) -> dict:
+        response = client.post("/api/v1/auth/register", json={"email": email, "password": password})
+        assert response.status_code == 201, response.text
+        return response.json()
+    return register
+
+
+@pytest.fixture
+def login(client):
+    def login(email: str = "user@example.com", password: str = PASSWORD) -> dict:
+        response = client.post("/api/v1/auth/login", json={"email": email, "password": password})
+        assert response.status_code == 200, response.text
+        return response.json()
+    return login
+
+
+@pytest.fixture
+def tokens(register, login) -> dict:
+    register()
+    return login()
+
+
+@pytest.fixture
+def admin(db, register, login) -> dict:
+    """Authorization headers of a freshly registered admin"""
+    register("admin@example.com")
+    db.query(User).filter(User.email == "admin@example.com").update({"role": UserRole.ADMIN})
+    db.commit()
+    return bearer(login("admin@example.com")["access_token"])
+
+
+def bearer(token: str) -> dict:
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,90 @@
+import hashlib
+import sys
+from pathlib import Path
+import pytest
+from app.core.breached_passwords import BreachedPasswordChecker, BreachedPasswordError, BreachedPasswordFilter
+from app.services import user_service
+from conftest import PASSWORD, bearer
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import build_breached_password_filter  # noqa: E402
+
+BREACHED = ["password123", "qwertyuiop1"]
+
+
+def build(tmp_path: Path, lines, *args) -> str:
+    source = tmp_path / "hashes.txt"
+    source.write_text("".join(f"{line}\n" for line in lines))
+    output = tmp_path / "breached.bpf"
+    assert build_breached_password_filter.main([str(source), "-o", str(output), *args]) == 0
+    return str(output)
+
+
+@pytest.fixture
+def breached(tmp_path, monkeypatch) -> BreachedPasswordChecker:
+    checker = BreachedPasswordChecker(build(tmp_path, BREACHED, "--plaintext"))
+    monkeypatch.setattr(user_service, "breached_passwords", checker)
+    return checker
+
+
+def test_filter_finds_every_listed_password(tmp_path):
+    bloom = BreachedPasswordFilter(build(tmp_path, BREACHED, "--plaintext"))
+
+    assert all(password in bloom for password in BREACHED)
+    assert PASSWORD not in bloom
+    assert bloom.count == len(BREACHED)
+
+
+def test_filter_reads_hash_lists_and_skips_rare_hashes(tmp_path):
+    lines = [f"{hashlib.sha1(b'common').hexdigest().upper()}:50", f"{hashlib.sha1(b'rare').hexdigest().upper()}:2"]
+    bloom = BreachedPasswordFilter(build(tmp_path, lines, "--min-count", "10"))
+
+    assert "common" in bloom
+    assert "rare" not in bloom
+
+
+def test_false_positive_rate_is_near_the_target(tmp_path):
+    passwords = [f"breached-{i}" for i in range(20000)]
+    bloom = BreachedPasswordFilter(build(tmp_path, passwords, "--plaintext", "--error-rate", "0.01"))
+
+    assert all(password in bloom for password in passwords[:1000])
+    false_positives = sum(f"unknown-{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
+
+
+def test_register_rejects_a_breached_password(client, breached):
+    response = client.post("/api/v1/auth/register", json={"email": "user@example.com", "password": BREACHED[0]})
+
+    assert response.status_code == 400
+    assert "breach" in response.json()["detail"]
+    response = client.post("/api/v1/auth/register", json={"email": "user@example.com", "password": PASSWORD})
+    assert response.status_code == 201
+
+
+def test_password_change_rejects_a_breached_password(client, tokens, breached, login):
+    headers = bearer(tokens["access_token"])
+
+    response = client.put("/api/v1/users/me", headers=headers, json={"password": BREACHED[1]})
+
+    assert response.status_code == 400
+    login()  # The old password still works
+    assert client.put("/api/v1/users/me", headers=headers, json={"full_name": "Unchanged password"}).status_code == 200
+
+
+def test_checker_raises_for_breached_passwords(breached):
+    with pytest.raises(BreachedPasswordError):
+        breached.check(BREACHED[0])
+    breached.check(PASSWORD)
+
+
+@pytest.mark.parametrize("contents", [None, b"not a filter"])
+def test_missing_or_invalid_filter_fails_open(tmp_path, contents):
+    path = tmp_path / "breached.bpf"
+    if contents is not None:
+        path.write_bytes(contents.ljust(64, b"\0"))
+    checker = BreachedPasswordChecker(str(path))
+
+    assert checker.enabled
+    assert not checker.is_breached(BREACHED[0])
+    assert checker.open() is None
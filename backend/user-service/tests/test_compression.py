@@ -0,0 +1,81 @@
+import zlib
+import brotli
+import orjson
+import pytest
+import zstandard
+from app.core.compression import BrotliEncoder, Encoder, GzipEncoder, ZstdEncoder, negotiate
+from app.models.user import User
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip, br, zstd", "zstd"),
+    ("gzip;q=1.0, br;q=0.5", "gzip"),
+    ("*", "zstd"),
+    ("*, zstd;q=0", "br"),
+    ("br;q=bogus, gzip", "gzip"),
+])
+def test_negotiate_picks_the_preferred_accepted_encoding(header, expected):
+    assert negotiate(header) == expected
+
+
+DECODERS = {
+    GzipEncoder: lambda: zlib.decompressobj(31).decompress,
+    BrotliEncoder: lambda: brotli.Decompressor().process,
+    ZstdEncoder: lambda: zstandard.ZstdDecompressor().decompressobj().decompress,
+}
+
+
+@pytest.mark.parametrize("encoder_class, level", [(GzipEncoder, 6), (BrotliEncoder, 4), (ZstdEncoder, 3)])
+def test_each_flush_is_decodable_right_away(encoder_class, level):
+    encoder = encoder_class(level)
+    decode = DECODERS[encoder_class]()
+    chunks = [b'{"id": %d, "email": "user%d@example.com"}\n' % (i, i) for i in range(50)]
+
+    received = b""
+    for index, chunk in enumerate(chunks):
+        received += decode(encoder.compress(chunk) + encoder.flush())
+        assert received == b"".join(chunks[:index + 1])
+    received += decode(encoder.finish())
+
+    assert received == b"".join(chunks)
+
+
+def test_encoder_is_abstract():
+    with pytest.raises(TypeError):
+        Encoder()
+
+
+@pytest.fixture
+def many_users(db):
+    db.add_all(User(email=f"user{i}@example.com", hashed_password="x", full_name=f"User {i}") for i in range(100))
+    db.commit()
+
+
+def test_large_responses_are_compressed(client, admin, many_users):
+    response = client.get("/api/v1/users/", headers={**admin, "Accept-Encoding": "br"})
+
+    assert response.headers["Content-Encoding"] == "br"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert len(response.json()) == 100
+
+
+def test_small_and_auth_responses_are_not_compressed(client, admin, tokens):
+    small = client.get("/api/v1/users/me", headers={**admin, "Accept-Encoding": "gzip"})
+    auth = client.get("/api/v1/auth/me", headers={**admin, "Accept-Encoding": "gzip"})
+
+    assert "Content-Encoding" not in small.headers
+    assert "Content-Encoding" not in auth.headers
+
+
+def test_export_streams_compressed_ndjson(client, admin, many_users):
+    response = client.get("/api/v1/users/export", headers={**admin, "Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    rows = [orjson.loads(line) for line in response.text.splitlines()]
+    # The admin plus the inserted users, in id order
+    assert len(rows) == 101
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+    assert "hashed_password" not in rows[0]
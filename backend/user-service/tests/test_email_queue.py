@@ -0,0 +1,137 @@
+import smtplib
+import time
+from datetime import datetime, timedelta
+import pytest
+from app.models.email import OutboundEmail
+from app.services import email_service
+from app.services.email_service import EmailService, EmailWorkerPool, SMTPConnection
+
+
+class StubSMTP:
+    """Stands in for smtplib.SMTP: records connections and messages, fails on request"""
+
+    connections = []
+    failures = []
+
+    def __init__(self, host, port, timeout=None):
+        self.messages = []
+        self.closed = False
+        StubSMTP.connections.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def send_message(self, message):
+        if StubSMTP.failures:
+            raise StubSMTP.failures.pop(0)
+        self.messages.append(message)
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    monkeypatch.setattr(StubSMTP, "connections", [])
+    monkeypatch.setattr(StubSMTP, "failures", [])
+    monkeypatch.setattr(email_service.smtplib, "SMTP", StubSMTP)
+    return StubSMTP
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    pool = EmailWorkerPool(workers=1, batch_size=2, poll_interval=30.0, backoff=30.0)
+    monkeypatch.setattr(email_service, "email_workers", pool)
+    yield pool
+    pool.stop()
+
+
+def connection() -> SMTPConnection:
+    return SMTPConnection(host="localhost", port=2525, user=None, password=None, use_tls=False)
+
+
+def enqueue(db, count: int = 1):
+    return [EmailService(db).enqueue(f"user{i}@example.com", "Hello", "Body") for i in range(count)]
+
+
+def test_batches_share_one_connection(db, smtp, pool):
+    enqueue(db, 3)
+    shared = connection()
+
+    assert pool.deliver_batch(shared) == 2
+    assert pool.deliver_batch(shared) == 1
+    assert pool.deliver_batch(shared) == 0
+
+    assert len(smtp.connections) == 1
+    assert [m["To"] for m in smtp.connections[0].messages] == [f"user{i}@example.com" for i in range(3)]
+    assert {email.status for email in db.query(OutboundEmail)} == {"sent"}
+
+
+def test_failed_delivery_is_retried_with_backoff(db, smtp, pool):
+    [email] = enqueue(db)
+    smtp.failures.append(smtplib.SMTPServerDisconnected("connection lost"))
+    smtp.failures.append(smtplib.SMTPServerDisconnected("still down"))
+    before = datetime.utcnow()
+
+    pool.deliver_batch(connection())
+
+    db.refresh(email)
+    assert email.status == "pending"
+    assert email.attempts == 1
+    # First retry after half to all of the base backoff
+    assert before + timedelta(seconds=14) <= email.next_attempt_at <= datetime.utcnow() + timedelta(seconds=31)
+    assert pool.deliver_batch(connection()) == 0
+
+    email.next_attempt_at = datetime.utcnow()
+    db.commit()
+    pool.deliver_batch(connection())
+    db.refresh(email)
+    assert email.status == "sent"
+    assert email.attempts == 2
+
+
+def test_permanent_failures_are_not_retried(db, smtp, pool):
+    [email] = enqueue(db)
+    smtp.failures.append(smtplib.SMTPRecipientsRefused({email.to_email: (550, b"No such user")}))
+
+    pool.deliver_batch(connection())
+
+    db.refresh(email)
+    assert email.status == "failed"
+    assert "No such user" in email.last_error
+
+
+def test_spooled_and_abandoned_messages_survive_a_restart(db, smtp, pool):
+    [waiting, abandoned] = enqueue(db, 2)
+    # Claimed by a worker that died before sending it
+    abandoned.status = "sending"
+    abandoned.locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+
+    restarted = EmailWorkerPool(workers=1, batch_size=10)
+    assert restarted.deliver_batch(connection()) == 2
+
+    db.expire_all()
+    assert (waiting.status, abandoned.status) == ("sent", "sent")
+
+
+def test_enqueue_wakes_a_waiting_worker(db, smtp, pool):
+    pool.start()
+    time.sleep(0.2)
+
+    [email] = enqueue(db)
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        db.expire_all()
+        if email.status == "sent":
+            break
+        time.sleep(0.05)
+    # Far sooner than the 30 second poll interval
+    assert email.status == "sent"
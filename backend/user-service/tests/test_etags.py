@@ -0,0 +1,54 @@
+from app.models.user import User, UserRole
+from conftest import bearer
+
+
+def test_user_read_is_revalidated_with_if_none_match(client, tokens):
+    headers = bearer(tokens["access_token"])
+    response = client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    response = client.get("/api/v1/users/me", headers={**headers, "If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+
+def test_etag_changes_when_the_user_does(client, tokens):
+    headers = bearer(tokens["access_token"])
+    etag = client.get("/api/v1/users/me", headers=headers).headers["ETag"]
+
+    assert client.put("/api/v1/users/me", headers=headers, json={"full_name": "Renamed"}).status_code == 200
+
+    response = client.get("/api/v1/users/me", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["full_name"] == "Renamed"
+    assert response.headers["ETag"] != etag
+
+
+def test_each_fieldset_has_its_own_etag(client, db, register, login):
+    user = register()
+    db.query(User).filter(User.id == user["id"]).update({"role": UserRole.ADMIN})
+    db.commit()
+    headers = bearer(login()["access_token"])
+    url = f"/api/v1/users/{user['id']}"
+    full = client.get(url, headers=headers)
+    sparse = client.get(f"{url}?fields=id,email", headers=headers)
+
+    assert set(sparse.json()) == {"id", "email"}
+    assert sparse.headers["ETag"] != full.headers["ETag"]
+    response = client.get(f"{url}?fields=id,email", headers={**headers, "If-None-Match": full.headers["ETag"]})
+    assert response.status_code == 200
+    response = client.get(f"{url}?fields=id,email", headers={**headers, "If-None-Match": sparse.headers["ETag"]})
+    assert response.status_code == 304
+
+
+def test_auth_me_and_users_me_share_the_etag(client, tokens):
+    headers = bearer(tokens["access_token"])
+    etag = client.get("/api/v1/users/me", headers=headers).headers["ETag"]
+
+    response = client.get("/api/v1/auth/me", headers={**headers, "If-None-Match": etag})
+
+    assert response.status_code == 304
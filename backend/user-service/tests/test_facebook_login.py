@@ -0,0 +1,89 @@
+import asyncio
+import httpx
+import pytest
+from app.services.facebook_oauth_service import FacebookOAuthService
+from app.services.oauth_http import ProviderClient, ProviderUnavailableError
+
+GRAPH_URL = "https://graph.test"
+
+
+class FakeGraph:
+    """The Graph API endpoints Facebook Login uses"""
+
+    def __init__(self, app_id: str = "app-id", is_valid: bool = True, token_status: int = 200):
+        self.app_id = app_id
+        self.is_valid = is_valid
+        self.token_status = token_status
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            # Long enough for concurrent calls to overlap
+            await asyncio.sleep(0.05)
+        finally:
+            self.in_flight -= 1
+
+        if request.url.path == "/debug_token":
+            return httpx.Response(200, json={"data": {"is_valid": self.is_valid, "app_id": self.app_id}})
+        if request.url.path == "/me":
+            return httpx.Response(200, json={"id": "fb-1", "name": "Facebook User", "email": "fb@example.com"})
+        if request.url.path.endswith("/oauth/access_token"):
+            return httpx.Response(self.token_status, json={"access_token": "user-token"})
+        return httpx.Response(404)
+
+
+def facebook(provider_http, graph: FakeGraph) -> FacebookOAuthService:
+    provider_http(graph)
+    return FacebookOAuthService(
+        app_id="app-id",
+        app_secret="app-secret",
+        redirect_uri="https://app.test/callback",
+        graph_url=GRAPH_URL,
+        authorization_url="https://facebook.test/dialog/oauth",
+        client=ProviderClient("facebook", deadline=5, max_retries=2, backoff=0)
+    )
+
+
+def test_the_token_check_and_profile_fetch_run_concurrently(provider_http):
+    graph = FakeGraph()
+    service = facebook(provider_http, graph)
+
+    user_info = asyncio.run(service.verify_token("user-token"))
+
+    assert user_info["email"] == "fb@example.com"
+    assert user_info["full_name"] == "Facebook User"
+    assert graph.max_in_flight == 2
+    # The app token is derived, never fetched
+    assert sorted(request.url.path for request in graph.requests) == ["/debug_token", "/me"]
+    debug = next(request for request in graph.requests if request.url.path == "/debug_token")
+    assert debug.url.params["access_token"] == "app-id|app-secret"
+
+
+@pytest.mark.parametrize("graph", [FakeGraph(is_valid=False), FakeGraph(app_id="another-app")])
+def test_tokens_that_are_invalid_or_for_another_app_are_rejected(provider_http, graph):
+    assert asyncio.run(facebook(provider_http, graph).verify_token("user-token")) is None
+
+
+def test_a_code_is_redeemed_once_even_when_the_exchange_fails(provider_http):
+    graph = FakeGraph(token_status=503)
+    service = facebook(provider_http, graph)
+
+    with pytest.raises(ProviderUnavailableError):
+        asyncio.run(service.exchange_code_for_token("code"))
+
+    assert len(graph.requests) == 1
+
+
+def test_the_authorization_url_is_built_once_and_carries_the_state(provider_http):
+    service = facebook(provider_http, FakeGraph())
+
+    url = asyncio.run(service.get_authorization_url(state="abc"))
+
+    assert url.startswith(service._authorization_url_prefix)
+    assert url.endswith("&state=abc")
+    assert "scope=email%2Cpublic_profile" in url
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from collections import Counter
+import httpx
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+from app.core.config import settings
+from app.services.oauth_registry import build_registry
+
+JWKS_URL = "https://www.googleapis.com/oauth2/v3/certs"
+
+
+class FakeGoogle:
+    """Discovery document and signing keys, served the way Google serves them"""
+
+    def __init__(self):
+        self.keys = {}
+        self.requests = Counter()
+
+    def add_key(self, kid: str) -> None:
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.keys[kid] = key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+
+    def id_token(self, kid: str, **claims) -> str:
+        claims = {
+            "iss": "accounts.google.com",
+            "aud": settings.GOOGLE_CLIENT_ID,
+            "sub": "google-user",
+            "email": "google@example.com",
+            "email_verified": True,
+            "exp": int(time.time()) + 600,
+            **claims
+        }
+        return jwt.encode(claims, self.keys[kid], algorithm="RS256", headers={"kid": kid})
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        self.requests[url] += 1
+        if url == settings.GOOGLE_DISCOVERY_URL:
+            return httpx.Response(200, json={
+                "issuer": "https://accounts.google.com",
+                "authorization_endpoint": "https://accounts.google.com/o/oauth2/v2/auth",
+                "token_endpoint": "https://oauth2.googleapis.com/token",
+                "jwks_uri": JWKS_URL,
+                "id_token_signing_alg_values_supported": ["RS256"]
+            })
+        keys = [
+            {**jwk.construct(pem, "RS256").public_key().to_dict(), "kid": kid, "use": "sig"}
+            for kid, pem in self.keys.items()
+        ]
+        return httpx.Response(
+            200, json={"keys": keys}, headers={"Cache-Control": "public, max-age=3600", "Age": "100"}
+        )
+
+
+@pytest.fixture
+def google(monkeypatch, provider_http):
+    monkeypatch.setattr(settings, "GOOGLE_CLIENT_ID", "client-id.apps.googleusercontent.com")
+    monkeypatch.setattr(settings, "GOOGLE_CLIENT_SECRET", "client-secret")
+    fake = FakeGoogle()
+    fake.add_key("first")
+    provider_http(fake)
+    provider = build_registry().get("google")
+    yield fake, provider
+    provider.close()
+
+
+def test_id_tokens_are_verified_locally_against_the_cached_certificates(google):
+    fake, provider = google
+
+    async def scenario():
+        first = await provider.verify_token(fake.id_token("first"))
+        second = await provider.verify_token(fake.id_token("first", email="other@example.com"))
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert first["email"] == "google@example.com" and first["email_verified"]
+    assert second["email"] == "other@example.com"
+    assert fake.requests[JWKS_URL] == 1
+    # Kept for max-age less the time it already spent in caches
+    assert provider._jwks._expires_at - provider._jwks.fetched_at == 3500
+
+
+def test_both_forms_of_the_google_issuer_are_accepted_and_others_rejected(google):
+    fake, provider = google
+
+    async def scenario():
+        return [
+            await provider.verify_token(fake.id_token("first", iss=issuer))
+            for issuer in ("accounts.google.com", "https://accounts.google.com", "https://evil.example.com")
+        ]
+
+    bare, https, other = asyncio.run(scenario())
+
+    assert bare is not None and https is not None
+    assert other is None
+
+
+def test_a_new_signing_key_triggers_one_rate_limited_refresh(google):
+    fake, provider = google
+
+    async def scenario():
+        await provider.warm_up()
+        # Google rotates keys long after we fetched them
+        provider._jwks.fetched_at -= 120
+        fake.add_key("rotated")
+        rotated = await provider.verify_token(fake.id_token("rotated"))
+        # A key Google never published: no second refresh within the interval
+        fake.add_key("forged")
+        forged = fake.id_token("forged")
+        del fake.keys["forged"]
+        assert await provider.verify_token(forged) is None
+        return rotated
+
+    assert asyncio.run(scenario())["email"] == "google@example.com"
+    assert fake.requests[JWKS_URL] == 2
+
+
+def test_tokens_for_another_client_or_expired_are_rejected(google):
+    fake, provider = google
+
+    async def scenario():
+        return (
+            await provider.verify_token(fake.id_token("first", aud="someone-else")),
+            await provider.verify_token(fake.id_token("first", exp=int(time.time()) - 60)),
+            await provider.verify_token("not-a-token")
+        )
+
+    assert asyncio.run(scenario()) == (None, None, None)
@@ -0,0 +1,72 @@
+import os
+import runpy
+import subprocess
+import sys
+from pathlib import Path
+from app.db import database
+
+SERVICE_ROOT = Path(__file__).resolve().parent.parent
+CONFIG = str(SERVICE_ROOT / "gunicorn.conf.py")
+
+
+def load_config(monkeypatch, tmp_path, **env) -> dict:
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path / "metrics"))
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(CONFIG)
+
+
+def test_one_preloaded_uvicorn_worker_per_core_by_default(monkeypatch, tmp_path):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    config = load_config(monkeypatch, tmp_path)
+
+    assert config["workers"] == config["cpu_count"]() >= 1
+    assert config["worker_class"] == "uvicorn.workers.UvicornWorker"
+    assert config["preload_app"] is True
+    assert config["max_requests"] > 0 and config["max_requests_jitter"] > 0
+
+
+def test_settings_come_from_the_environment(monkeypatch, tmp_path):
+    config = load_config(
+        monkeypatch, tmp_path, WEB_CONCURRENCY="3", GUNICORN_PRELOAD="false", GUNICORN_ACCESS_LOG=""
+    )
+
+    assert config["workers"] == 3
+    assert config["preload_app"] is False
+    assert config["accesslog"] is None
+
+
+def test_stale_worker_metrics_are_dropped_at_startup(monkeypatch, tmp_path):
+    stale = tmp_path / "metrics" / "counter_123.db"
+    stale.parent.mkdir()
+    stale.write_bytes(b"stale")
+
+    load_config(monkeypatch, tmp_path)
+
+    assert (tmp_path / "metrics").is_dir()
+    assert not stale.exists()
+
+
+def test_workers_drop_the_connections_inherited_from_the_master(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(database.engine, "dispose", lambda close=True: calls.append(close))
+
+    load_config(monkeypatch, tmp_path)["post_fork"](None, None)
+
+    # close=False: the master's connections stay open for the master
+    assert calls == [False]
+
+
+def test_metrics_are_summed_across_worker_processes(tmp_path):
+    script = (
+        "from app.core.metrics import breached_password_checks_total, latest_metrics\n"
+        "breached_password_checks_total.labels(outcome='clean').inc()\n"
+        "print(latest_metrics().decode())\n"
+    )
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    for _ in range(2):
+        worker = subprocess.run(
+            [sys.executable, "-c", script], cwd=SERVICE_ROOT, env=env, capture_output=True, text=True, check=True
+        )
+
+    assert 'breached_password_checks_total{outcome="clean"} 2.0' in worker.stdout
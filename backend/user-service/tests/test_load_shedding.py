@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+from app.core.load_shedding import AdaptiveLimiter, LoadShedder, LoadSheddingMiddleware, Overloaded
+
+
+def limiter(**kwargs) -> AdaptiveLimiter:
+    options = dict(initial_limit=1, min_limit=1, max_limit=4, target_latency=0.5, max_queue=1, queue_timeout=0.05)
+    options.update(kwargs)
+    return AdaptiveLimiter("test", **options)
+
+
+def test_requests_over_the_limit_queue_and_get_the_freed_slot():
+    async def scenario():
+        slots = limiter()
+        await slots.acquire()
+        waiting = asyncio.ensure_future(slots.acquire())
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        slots.release(0.01)
+        await waiting
+        assert slots.in_flight == 1
+
+    asyncio.run(scenario())
+
+
+def test_requests_beyond_the_queue_or_its_timeout_are_rejected():
+    async def scenario():
+        slots = limiter()
+        await slots.acquire()
+        queued = asyncio.ensure_future(slots.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(Overloaded) as full:
+            await slots.acquire()
+        assert full.value.reason == "queue_full"
+
+        with pytest.raises(Overloaded) as timed_out:
+            await queued
+        assert timed_out.value.reason == "queue_timeout"
+        assert full.value.retry_after >= 1
+
+    asyncio.run(scenario())
+
+
+def test_the_limit_shrinks_when_slow_and_grows_when_saturated():
+    async def scenario():
+        slots = limiter(initial_limit=2, smoothing=1.0)
+        await slots.acquire()
+        await slots.acquire()
+        slots.release(2.0)
+        assert slots.limit < 2
+
+        slots = limiter(initial_limit=2, smoothing=1.0)
+        await slots.acquire()
+        await slots.acquire()
+        slots.release(0.01)
+        assert slots.limit > 2
+
+    asyncio.run(scenario())
+
+
+def test_routes_map_to_their_limiter():
+    shedder = LoadShedder(
+        limiters={"hashing": limiter(), "default": limiter()},
+        hashing_paths=["/api/v1/auth/login"],
+        exempt_paths=["/health", "/metrics"]
+    )
+
+    assert shedder.limiter_for("/api/v1/auth/login") is shedder.limiters["hashing"]
+    assert shedder.limiter_for("/api/v1/users/1") is shedder.limiters["default"]
+    assert shedder.limiter_for("/health") is None
+    assert shedder.limiter_for("/") is None
+
+
+def shedding_app(slots: AdaptiveLimiter, body) -> TestClient:
+    async def export(request):
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    app = Starlette(routes=[Route("/export", export)])
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        shedder=LoadShedder(limiters={"hashing": slots, "default": slots}, hashing_paths=[], exempt_paths=[])
+    )
+    return TestClient(app)
+
+
+def test_the_slot_is_held_until_a_streamed_body_is_sent():
+    slots = limiter()
+    seen = []
+
+    async def body():
+        for chunk in (b"a\n", b"b\n", b"c\n"):
+            seen.append(slots.in_flight)
+            yield chunk
+
+    response = shedding_app(slots, body).get("/export")
+
+    assert response.content == b"a\nb\nc\n"
+    assert seen == [1, 1, 1]
+    assert slots.in_flight == 0
+
+
+def test_requests_over_capacity_get_a_503_with_retry_after():
+    slots = limiter(max_queue=0)
+
+    async def body():
+        yield b"x"
+
+    client = shedding_app(slots, body)
+    # Taken by another request
+    slots.in_flight = 1
+
+    response = client.get("/export")
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
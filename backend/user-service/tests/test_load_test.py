@@ -0,0 +1,53 @@
+import asyncio
+import httpx
+from app.db.database import SessionLocal
+from app.main import app
+from app.models.user import User, UserRole
+from benchmarks.load_test import SCENARIOS, LoadTester, compare, summarize
+
+
+def results(**scenario) -> dict:
+    return {"scenarios": {"login": {"throughput_rps": 100.0, "p99_ms": 50.0, "errors": 0, **scenario}}}
+
+
+def test_summaries_report_throughput_and_percentiles():
+    summary = summarize([0.001 * n for n in range(1, 101)], errors=2, elapsed=2.0, concurrency=4)
+
+    assert summary["requests"] == 100
+    assert summary["errors"] == 2
+    assert summary["throughput_rps"] == 50.0
+    assert summary["p50_ms"] == 51.0
+    assert summary["p99_ms"] == 99.0
+
+
+def test_the_baseline_gate_flags_regressions_beyond_the_threshold():
+    baseline = results()
+
+    assert compare(results(throughput_rps=85.0, p99_ms=55.0), baseline, threshold=0.2) == []
+    regressions = compare(results(throughput_rps=70.0, p99_ms=70.0, errors=1), baseline, threshold=0.2)
+    assert len(regressions) == 3
+    assert all(regression.startswith("login:") for regression in regressions)
+
+
+def test_every_scenario_runs_against_the_app_without_errors():
+    def make_admin(email: str):
+        db = SessionLocal()
+        try:
+            db.query(User).filter(User.email == email).update({User.role: UserRole.ADMIN})
+            db.commit()
+        finally:
+            db.close()
+
+    async def scenario():
+        async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+            tester = LoadTester(client, "test")
+            await tester.setup(make_admin)
+            outcomes = {}
+            for name in SCENARIOS:
+                await tester.prepare(name, concurrency=2)
+                outcomes[name] = await tester.run_scenario(tester.scenario(name), total=4, concurrency=2)
+            return outcomes
+
+    for name, (latencies, errors, elapsed) in asyncio.run(scenario()).items():
+        assert errors == 0, name
+        assert len(latencies) == 4, name
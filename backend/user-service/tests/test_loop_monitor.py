@@ -0,0 +1,37 @@
+import asyncio
+import time
+from app.core.config import settings
+from app.core.loop_monitor import EventLoopMonitor
+from conftest import bearer
+
+
+def block_the_loop() -> None:
+    time.sleep(0.4)
+
+
+def test_a_blocking_call_is_reported_with_its_stack():
+    monitor = EventLoopMonitor(interval=0.02, threshold=0.1)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.1)
+        block_the_loop()
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+
+    stats = monitor.stats()
+    assert stats["samples"] > 0
+    assert stats["max_lag"] >= 0.3
+    [stall] = stats["stalls"]
+    assert stall["blocked_for"] >= 0.1
+    assert any("block_the_loop" in line for line in stall["stack"])
+
+
+def test_loop_stats_are_admin_only_and_follow_the_flag(client, monkeypatch, tokens, admin):
+    assert client.get("/api/v1/debug/loop", headers=bearer(tokens["access_token"])).status_code == 403
+    assert client.get("/api/v1/debug/loop", headers=admin).status_code == 200
+
+    monkeypatch.setattr(settings, "LOOP_MONITOR_ENABLED", False)
+    assert client.get("/api/v1/debug/loop", headers=admin).status_code == 404
@@ -0,0 +1,74 @@
+import tracemalloc
+import pytest
+from app.core.config import settings
+from app.core.memory import MemoryTracker
+
+
+@pytest.fixture
+def tracker():
+    tracker = MemoryTracker(max_snapshots=2)
+    yield tracker
+    if tracker.active:
+        tracker.stop()
+
+
+def leak(into: list) -> None:
+    into.append(bytearray(256 * 1024))
+
+
+def test_requests_are_aggregated_per_route_with_their_allocation_sites(tracker):
+    kept = []
+    tracker.start(sample_rate=1)
+
+    state = tracker.begin_request()
+    leak(kept)
+    tracker.end_request("/leaky", state)
+
+    [route] = tracker.status()["routes"].values()
+    assert route["requests"] == route["sampled_requests"] == 1
+    assert route["max_bytes_delta"] >= 256 * 1024
+    assert route["top_sites"][0]["size_diff"] >= 256 * 1024
+
+
+def test_snapshot_diffs_point_at_growth_and_old_snapshots_are_evicted(tracker):
+    kept = []
+    tracker.start()
+    before = tracker.take_snapshot()
+    leak(kept)
+    after = tracker.take_snapshot()
+
+    [top] = tracker.diff(before, after, limit=1)
+    assert top["file"] == __file__
+    assert top["size_diff"] >= 256 * 1024
+
+    tracker.take_snapshot()
+    assert tracker.get_snapshot(before) is None
+    assert [snapshot["id"] for snapshot in tracker.status()["snapshots"]] == [after, after + 1]
+
+
+def test_stopping_drops_snapshots_and_stops_tracing(tracker):
+    tracker.start()
+    tracker.take_snapshot()
+    with pytest.raises(RuntimeError):
+        tracker.start()
+
+    tracker.stop()
+
+    assert not tracemalloc.is_tracing()
+    assert tracker.status()["snapshots"] == []
+    with pytest.raises(RuntimeError):
+        tracker.take_snapshot()
+
+
+def test_memory_endpoints_follow_the_flag(client, monkeypatch, admin):
+    assert client.get("/api/v1/debug/memory", headers=admin).status_code == 404
+
+    monkeypatch.setattr(settings, "MEMORY_TRACKING_ENABLED", True)
+    try:
+        assert client.post("/api/v1/debug/memory/start", headers=admin).json()["active"]
+        since = client.post("/api/v1/debug/memory/snapshots", headers=admin).json()["id"]
+        assert client.get(f"/api/v1/debug/memory/diff?since={since}", headers=admin).status_code == 200
+        assert client.get("/api/v1/debug/memory/diff?since=999", headers=admin).status_code == 404
+    finally:
+        assert client.post("/api/v1/debug/memory/stop", headers=admin).status_code == 200
+    assert not tracemalloc.is_tracing()
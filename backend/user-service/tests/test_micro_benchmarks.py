@@ -0,0 +1,31 @@
+import json
+from benchmarks.micro_benchmarks import BenchmarkRunner, main, result_key
+
+
+def test_the_runner_reports_per_call_statistics():
+    runner = BenchmarkRunner(rounds=3, min_round_time=0.001, warmup=1)
+
+    result = runner.run("noop", lambda: None, "test", size=10)
+
+    assert result["rounds"] == 3
+    assert result["iterations"] >= 1
+    assert result["min"] <= result["median"] <= result["max"]
+    assert result["ops"] > 0
+    assert result_key(result) == "noop[size=10]"
+    assert BenchmarkRunner(1, 0.001, 0, name_filter="other").run("noop", lambda: None, "test") is None
+
+
+def test_runs_are_appended_to_the_history_and_compared_with_the_previous_one(tmp_path, capsys):
+    history = tmp_path / "history.jsonl"
+    argv = [
+        "--group", "user_service", "--sizes", "20", "--filter", "get_user_by_id",
+        "--rounds", "2", "--min-round-time", "0.001", "--warmup", "0", "--history", str(history)
+    ]
+
+    assert main(argv) == 0
+    assert main(argv) == 0
+
+    runs = [json.loads(line) for line in history.read_text().splitlines()]
+    assert len(runs) == 2
+    assert {result["name"] for result in runs[-1]["benchmarks"]} == {"get_user_by_id"}
+    assert "Compared with" in capsys.readouterr().err
@@ -0,0 +1,39 @@
+from sqlalchemy import create_engine, inspect, text
+from app.db.migrations import upgrade_schema
+
+# The users table as create_all() built it before token versions
+LEGACY_USERS = """
+CREATE TABLE users (
+    id INTEGER NOT NULL PRIMARY KEY,
+    email VARCHAR NOT NULL,
+    hashed_password VARCHAR NOT NULL,
+    full_name VARCHAR,
+    is_active BOOLEAN,
+    is_verified BOOLEAN,
+    role VARCHAR(5),
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP),
+    updated_at DATETIME,
+    last_login DATETIME
+)
+"""
+
+
+def test_upgrade_adds_token_version_and_the_changes_index(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.execute(text(LEGACY_USERS))
+        connection.execute(text(
+            "INSERT INTO users (email, hashed_password, role) VALUES ('old@example.com', 'x', 'USER')"
+        ))
+
+    upgrade_schema(engine)
+    # Runs on every start, so a second run must be a no-op
+    upgrade_schema(engine)
+
+    inspector = inspect(engine)
+    assert "token_version" in {column["name"] for column in inspector.get_columns("users")}
+    assert "ix_users_updated_at_id" in {index["name"] for index in inspector.get_indexes("users")}
+    with engine.connect() as connection:
+        row = connection.execute(text("SELECT token_version, updated_at FROM users")).one()
+    assert row.token_version == 0
+    assert row.updated_at is not None
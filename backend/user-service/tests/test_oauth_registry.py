@@ -0,0 +1,104 @@
+import asyncio
+from collections import Counter
+import httpx
+import pytest
+from app.api.v1 import auth
+from app.core.config import settings
+from app.core.security import verify_token
+from app.services.oauth_registry import build_registry
+
+DISCOVERY_URL = "https://idp.test/.well-known/openid-configuration"
+
+
+@pytest.fixture
+def okta(monkeypatch):
+    monkeypatch.setattr(settings, "OIDC_PROVIDERS", {
+        "okta": {"client_id": "okta-client", "client_secret": "secret", "discovery_url": DISCOVERY_URL}
+    })
+
+
+def test_the_registry_builds_each_configured_provider_once(okta):
+    registry = build_registry()
+
+    assert registry.names == ["okta"]
+    assert registry.get("okta") is registry.get("okta")
+    assert registry.get("okta").display_name == "Okta"
+    # Built in but not configured: known, yet unavailable
+    assert registry.get("google") is None
+    assert registry.is_known("google") and not registry.is_known("github")
+
+
+def test_builtin_provider_names_are_reserved(monkeypatch):
+    monkeypatch.setattr(settings, "OIDC_PROVIDERS", {"google": {}})
+
+    with pytest.raises(ValueError):
+        build_registry()
+
+
+def test_discovery_is_fetched_once_and_reused(okta, provider_http):
+    requests = Counter()
+
+    def idp(request):
+        requests[str(request.url)] += 1
+        return httpx.Response(200, json={
+            "issuer": "https://idp.test",
+            "authorization_endpoint": "https://idp.test/authorize",
+            "token_endpoint": "https://idp.test/token",
+            "jwks_uri": "https://idp.test/keys"
+        }, headers={"Cache-Control": "max-age=600"})
+
+    provider_http(idp)
+    provider = build_registry().get("okta")
+
+    async def scenario():
+        return [await provider.get_authorization_url(state=state) for state in ("one", "two")]
+
+    try:
+        first, second = asyncio.run(scenario())
+    finally:
+        provider.close()
+
+    assert requests[DISCOVERY_URL] == 1
+    assert first.startswith("https://idp.test/authorize?") and "client_id=okta-client" in first
+    assert first.endswith("state=one") and second.endswith("state=two")
+
+
+def test_a_failed_warm_up_does_not_stop_startup(okta, provider_http):
+    provider_http(lambda request: httpx.Response(404))
+    registry = build_registry()
+
+    asyncio.run(registry.startup())
+    registry.close()
+
+
+def test_unknown_and_unconfigured_providers(client):
+    assert client.get("/api/v1/auth/oauth/github").status_code == 404
+
+    response = client.get("/api/v1/auth/google")
+    assert response.status_code == 500
+    assert response.json()["detail"] == "Google OAuth service not configured properly"
+
+
+class FakeProvider:
+    name = "okta"
+    display_name = "Okta"
+
+    def __init__(self, email_verified: bool):
+        self.email_verified = email_verified
+
+    async def verify_token(self, token: str):
+        return {"email": "user@example.com", "email_verified": self.email_verified, "full_name": "Okta User"}
+
+
+@pytest.mark.parametrize("email_verified", [False, True])
+def test_an_existing_account_is_only_linked_on_a_verified_email(client, monkeypatch, register, email_verified):
+    user = register("user@example.com")
+    monkeypatch.setattr(auth, "get_oauth_provider", lambda name: FakeProvider(email_verified))
+
+    response = client.post("/api/v1/auth/oauth/okta/token", json={"token": "id-token"})
+
+    if email_verified:
+        assert response.status_code == 200
+        assert verify_token(response.json()["access_token"])["sub"] == str(user["id"])
+    else:
+        assert response.status_code == 409
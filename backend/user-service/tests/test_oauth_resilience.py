@@ -0,0 +1,118 @@
+import asyncio
+import httpx
+import pytest
+from app.api.v1 import auth
+from app.services import oauth_http
+from app.services.oauth_http import CircuitBreaker, ProviderClient, ProviderUnavailableError
+
+
+def provider_client(monkeypatch, handler, **kwargs) -> ProviderClient:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(oauth_http, "get_http_client", lambda: client)
+    options = dict(deadline=5, max_retries=2, backoff=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    options.update(kwargs)
+    return ProviderClient("test", **options)
+
+
+def responding(*status_codes):
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        return httpx.Response(status_codes[min(len(calls), len(status_codes)) - 1])
+
+    return handler, calls
+
+
+def test_idempotent_requests_are_retried_on_transient_errors(monkeypatch):
+    handler, calls = responding(503, 200)
+    client = provider_client(monkeypatch, handler)
+
+    response = asyncio.run(client.get("https://provider.test/keys"))
+
+    assert response.status_code == 200
+    assert calls == ["GET", "GET"]
+
+
+def test_non_idempotent_requests_are_not_retried_after_a_response(monkeypatch):
+    handler, calls = responding(503, 200)
+    client = provider_client(monkeypatch, handler)
+
+    with pytest.raises(ProviderUnavailableError):
+        asyncio.run(client.post("https://provider.test/token"))
+    assert calls == ["POST"]
+
+
+def test_non_idempotent_requests_are_retried_when_the_connection_failed(monkeypatch):
+    calls = []
+
+    def handler(request):
+        calls.append(request.method)
+        if len(calls) == 1:
+            raise httpx.ConnectError("refused", request=request)
+        return httpx.Response(200)
+
+    client = provider_client(monkeypatch, handler)
+
+    assert asyncio.run(client.post("https://provider.test/token")).status_code == 200
+    assert calls == ["POST", "POST"]
+
+
+def test_the_breaker_opens_after_repeated_failures_and_fails_fast(monkeypatch):
+    handler, calls = responding(503)
+    client = provider_client(monkeypatch, handler, max_retries=0)
+
+    for _ in range(2):
+        with pytest.raises(ProviderUnavailableError):
+            asyncio.run(client.get("https://provider.test/keys"))
+    assert client.breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(ProviderUnavailableError) as e:
+        asyncio.run(client.get("https://provider.test/keys"))
+    assert e.value.retry_after > 0
+    assert len(calls) == 2
+
+
+def test_a_half_open_breaker_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+class FakeProvider:
+    name = "test"
+    display_name = "Test"
+
+    def __init__(self, verify):
+        self.verify = verify
+
+    async def verify_token(self, token: str):
+        return self.verify(token)
+
+
+def test_token_login_creates_the_user_in_a_session_of_its_own(client, monkeypatch):
+    user_info = {"email": "oauth@example.com", "email_verified": True, "full_name": "OAuth User"}
+    monkeypatch.setattr(auth, "get_oauth_provider", lambda name: FakeProvider(lambda token: user_info))
+
+    response = client.post("/api/v1/auth/oauth/test/token", json={"token": "id-token"})
+
+    assert response.status_code == 200
+    assert response.json()["refresh_token"]
+
+
+def test_unexpected_oauth_errors_do_not_leak_their_message(client, monkeypatch):
+    def fail(token):
+        raise RuntimeError("connection string postgres://secret")
+
+    monkeypatch.setattr(auth, "get_oauth_provider", lambda name: FakeProvider(fail))
+
+    response = client.post("/api/v1/auth/oauth/test/token", json={"token": "id-token"})
+
+    assert response.status_code == 500
+    assert response.json() == {"detail": "Test authentication failed"}
@@ -0,0 +1,127 @@
+import json
+import time
+from datetime import datetime, timedelta
+import fakeredis
+import pytest
+import redis
+from app.core.config import settings
+from app.models.outbox import OutboxEvent
+from app.models.user import UserRole
+from app.services import outbox_relay as relay_module
+from app.services.outbox_relay import OutboxRelay
+from app.services.user_service import UserService
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_RELAY_ENABLED", True)
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def relay(server, **kwargs) -> OutboxRelay:
+    relay = OutboxRelay(stream="users", consumer_groups=["search"], poll_interval=0.05, **kwargs)
+    relay._redis = fakeredis.FakeRedis(server=server)
+    relay._owner = f"relay-{id(relay)}"
+    return relay
+
+
+def stream(server):
+    return fakeredis.FakeRedis(server=server, decode_responses=True).xrange("users")
+
+
+def test_events_are_written_only_while_the_relay_is_enabled(db, register, outbox, monkeypatch):
+    user_id = register()["id"]
+    UserService(db).change_user_role(user_id, UserRole.ADMIN)
+
+    created, changed = db.query(OutboxEvent).order_by(OutboxEvent.id).all()
+    assert (created.event_type, changed.event_type) == ("user.created", "user.role_changed")
+    payload = json.loads(changed.payload)
+    assert payload["changed"] == ["role"] and payload["user"]["role"] == "ADMIN"
+    assert "hashed_password" not in payload["user"]
+
+    monkeypatch.setattr(settings, "OUTBOX_RELAY_ENABLED", False)
+    UserService(db).verify_user(user_id)
+    assert db.query(OutboxEvent).count() == 2
+
+
+def test_events_are_published_once_in_order(db, register, outbox, server):
+    register("first@example.com")
+    register("second@example.com")
+    relay_ = relay(server)
+
+    assert relay_.relay_batch() == 2
+    assert relay_.relay_batch() == 0
+
+    entries = [fields for _, fields in stream(server)]
+    assert [entry["type"] for entry in entries] == ["user.created", "user.created"]
+    assert [json.loads(entry["payload"])["user"]["email"] for entry in entries] == [
+        "first@example.com", "second@example.com"
+    ]
+    assert int(entries[0]["event_id"]) < int(entries[1]["event_id"])
+    assert db.query(OutboxEvent).filter(OutboxEvent.published_at.is_(None)).count() == 0
+    # The consumer group reads from the start of the stream
+    [group] = fakeredis.FakeRedis(server=server).xinfo_groups("users")
+    assert group["name"] == b"search"
+
+
+def test_events_stay_in_the_outbox_while_redis_is_down(db, register, outbox, server):
+    register()
+    relay_ = relay(server)
+    server.connected = False
+
+    with pytest.raises(redis.ConnectionError):
+        relay_.relay_batch()
+    assert db.query(OutboxEvent).filter(OutboxEvent.published_at.is_(None)).count() == 1
+
+    server.connected = True
+    assert relay_.relay_batch() == 1
+
+
+def test_published_events_are_pruned_after_the_retention(db, register, outbox, server):
+    register()
+    relay_ = relay(server, retention=timedelta(hours=1))
+    relay_.relay_batch()
+    db.query(OutboxEvent).update({"published_at": datetime.utcnow() - timedelta(hours=2)})
+    db.commit()
+
+    relay_._pruned_at = 0.0
+    relay_.relay_batch()
+
+    assert db.query(OutboxEvent).count() == 0
+
+
+def test_only_the_lock_holder_publishes_and_only_it_can_renew_or_release(server):
+    first, second = relay(server), relay(server)
+
+    assert first._acquire_lock()
+    assert first._acquire_lock()
+    assert not second._acquire_lock()
+
+    second._release_lock()
+    assert not second._acquire_lock()
+
+    first._release_lock()
+    assert second._acquire_lock()
+
+
+def test_the_relay_thread_publishes_as_soon_as_it_is_notified(db, register, outbox, server, monkeypatch):
+    running = OutboxRelay(stream="users", poll_interval=60)
+    monkeypatch.setattr(relay_module.redis.Redis, "from_url", lambda url: fakeredis.FakeRedis(server=server))
+    running.start()
+    try:
+        # The first poll finds nothing; the next one only comes with a notify()
+        time.sleep(0.1)
+        UserService(db).deactivate_user(register()["id"])
+        running.notify()
+
+        deadline = time.monotonic() + 5
+        while len(stream(server)) < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        running.stop()
+
+    assert [fields["type"] for _, fields in stream(server)] == ["user.created", "user.deactivated"]
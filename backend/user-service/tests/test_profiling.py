@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.profiling import (
+    AttributedCoroutine, ProfiledRoute, ProfileSession, ProfilingMiddleware, profiled_request, profiler
+)
+
+
+def running() -> object:
+    return profiler._running.get(threading.get_ident())
+
+
+def busy(seconds: float) -> None:
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+@pytest.fixture
+def session():
+    return ProfileSession(duration=None, max_requests=None, route_prefix=None, interval=0.005)
+
+
+def test_the_event_loop_is_marked_only_during_the_profiled_coroutines_steps(session):
+    seen = {}
+
+    async def profiled():
+        seen["profiled"] = running()
+        await asyncio.sleep(0.05)
+        seen["profiled_resumed"] = running()
+
+    async def other():
+        await asyncio.sleep(0.01)
+        seen["other"] = running()
+
+    async def scenario():
+        await asyncio.gather(AttributedCoroutine(profiled(), session), other())
+
+    asyncio.run(scenario())
+
+    assert seen == {"profiled": session, "profiled_resumed": session, "other": None}
+    assert profiler._running == {}
+
+
+def test_cancelling_the_awaiting_task_cancels_the_coroutine(session):
+    async def scenario():
+        task = asyncio.ensure_future(AttributedCoroutine(asyncio.sleep(10), session))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert profiler._running == {}
+
+
+def test_sync_dependencies_mark_the_thread_they_run_on(session):
+    def dependency():
+        return running()
+
+    def endpoint(marked=Depends(dependency)):
+        return marked
+
+    wrapped = profiler.attributed(endpoint)
+    wrapped_dependency = wrapped.__signature__.parameters["marked"].default.dependency
+    assert wrapped_dependency is profiler.attributed(dependency)
+
+    assert wrapped_dependency() is None
+    token = profiled_request.set(session)
+    try:
+        assert wrapped_dependency() is session
+    finally:
+        profiled_request.reset(token)
+    assert profiler._running == {}
+
+
+def test_only_the_profiled_routes_work_is_sampled(monkeypatch):
+    monkeypatch.setattr(settings, "PROFILING_ENABLED", True)
+    router = APIRouter(route_class=ProfiledRoute)
+
+    def slow_work():
+        busy(0.3)
+
+    def other_work():
+        busy(0.3)
+
+    @router.get("/slow")
+    def slow():
+        slow_work()
+
+    @router.get("/other")
+    def other():
+        other_work()
+
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+    app.include_router(router)
+    client = TestClient(app)
+
+    session = profiler.start(route_prefix="/slow", interval=0.002)
+    try:
+        threads = [threading.Thread(target=client.get, args=(path,)) for path in ("/slow", "/other")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        profiler.stop()
+
+    stacks = profiler.collapsed()
+    assert session.requests_profiled == 1
+    assert session.inflight == 0
+    assert "slow_work" in stacks
+    assert "other_work" not in stacks
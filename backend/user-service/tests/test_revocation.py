@@ -0,0 +1,60 @@
+from datetime import datetime, timedelta
+from app.core.bloom import BloomFilter
+from app.core.revocation import RevokedTokenFilter
+from app.models.revoked_token import RevokedToken
+
+
+def test_bloom_filter_has_no_false_negatives():
+    items = [f"jti-{i}" for i in range(5000)]
+    bloom = BloomFilter.from_items(items, capacity=5000, error_rate=0.01)
+
+    assert all(item in bloom for item in items)
+    false_positives = sum(f"other-{i}" in bloom for i in range(5000))
+    assert false_positives < 5000 * 0.03
+
+
+def test_adding_an_item_again_does_not_use_up_capacity():
+    bloom = BloomFilter(capacity=100)
+
+    assert bloom.add("jti")
+    assert not bloom.add("jti")
+    assert bloom.count == 1
+
+
+def revoke(db, jti: str, expires_in: timedelta = timedelta(minutes=30)) -> None:
+    db.add(RevokedToken(jti=jti, expires_at=datetime.utcnow() + expires_in, revoked_at=datetime.utcnow()))
+    db.commit()
+
+
+def test_filter_picks_up_revocations_committed_elsewhere(db):
+    revoked_tokens = RevokedTokenFilter(capacity=100, sync_interval=0)
+    assert not revoked_tokens.is_revoked(db, "stolen")
+
+    revoke(db, "stolen")
+
+    assert revoked_tokens.is_revoked(db, "stolen")
+    assert not revoked_tokens.is_revoked(db, "innocent")
+    assert not revoked_tokens.is_revoked(db, None)
+
+
+def test_overlapping_syncs_do_not_fill_the_filter(db):
+    revoked_tokens = RevokedTokenFilter(capacity=10, sync_interval=0)
+    for i in range(5):
+        revoke(db, f"jti-{i}")
+
+    # Every sync re-reads the rows revoked within the overlap window
+    for _ in range(10):
+        revoked_tokens.might_be_revoked("jti-0")
+
+    assert revoked_tokens._filter.count == 5
+    assert revoked_tokens._filter.count <= revoked_tokens._filter.capacity
+
+
+def test_rebuild_drops_expired_revocations(db):
+    revoke(db, "expired", expires_in=timedelta(minutes=-1))
+    revoke(db, "live")
+    revoked_tokens = RevokedTokenFilter(capacity=100, sync_interval=0, rebuild_interval=0)
+
+    assert revoked_tokens.is_revoked(db, "live")
+    assert not revoked_tokens.might_be_revoked("expired")
+    assert db.get(RevokedToken, "expired") is None
@@ -0,0 +1,28 @@
+from app.schemas.user import User, user_adapter, user_list_adapter
+from app.services.user_service import UserService
+from conftest import bearer
+
+
+def test_the_documented_user_schema_keeps_the_email_format(client):
+    schema = client.get("/api/v1/openapi.json").json()["components"]["schemas"]["User"]
+
+    assert schema["properties"]["email"]["format"] == "email"
+
+
+def test_adapters_render_users_as_the_documented_schema_does(db, register):
+    user = UserService(db).get_user_by_id(register()["id"])
+
+    documented = User.model_validate(user).model_dump(mode="json")
+
+    assert user_adapter.dump_python(user_adapter.validate_python(user), mode="json") == documented
+    assert user_list_adapter.dump_python(user_list_adapter.validate_python([user]), mode="json") == [documented]
+
+
+def test_user_endpoints_render_through_the_adapters(client, db, admin, register):
+    user_id = register("listed@example.com")["id"]
+    expected = User.model_validate(UserService(db).get_user_by_id(user_id)).model_dump(mode="json")
+
+    assert client.get(f"/api/v1/users/{user_id}", headers=admin).json() == expected
+    listed = client.get("/api/v1/users/", headers=admin).json()
+    assert expected in listed
+    assert "hashed_password" not in listed[0]
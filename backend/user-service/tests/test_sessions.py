@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+from app.core.security import verify_token
+from app.db.database import SessionLocal
+from app.models.user import User
+from app.services.session_service import SessionService
+from conftest import bearer
+
+
+def refresh(client, refresh_token: str):
+    return client.post("/api/v1/auth/refresh", json={"refresh_token": refresh_token})
+
+
+def test_refresh_rotates_the_refresh_token(client, tokens):
+    response = refresh(client, tokens["refresh_token"])
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    assert verify_token(rotated["refresh_token"])["sid"] == verify_token(tokens["refresh_token"])["sid"]
+
+    assert refresh(client, rotated["refresh_token"]).status_code == 200
+
+
+def age_rotation(db, session_id: str, seconds: int = 60) -> None:
+    """Move the session's last rotation out of the reuse grace window"""
+    db_session = SessionService(db).get_session(session_id)
+    db_session.rotated_at = datetime.utcnow() - timedelta(seconds=seconds)
+    db.commit()
+
+
+def test_reusing_a_rotated_refresh_token_revokes_the_session(client, db, tokens):
+    rotated = refresh(client, tokens["refresh_token"]).json()
+    age_rotation(db, verify_token(tokens["refresh_token"])["sid"])
+
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
+    # Neither side of the copied token can continue the session
+    assert refresh(client, rotated["refresh_token"]).status_code == 401
+    # ... and every access token it issued, not just the latest, is rejected
+    assert client.get("/api/v1/auth/me", headers=bearer(rotated["access_token"])).status_code == 401
+    assert client.get("/api/v1/auth/me", headers=bearer(tokens["access_token"])).status_code == 401
+
+
+def test_a_retried_refresh_within_the_grace_window_gets_the_same_pair(client, db, tokens):
+    first = refresh(client, tokens["refresh_token"])
+    retried = refresh(client, tokens["refresh_token"])
+
+    assert retried.status_code == 200
+    assert retried.json() == first.json()
+    # The session goes on; nobody was logged out
+    assert refresh(client, first.json()["refresh_token"]).status_code == 200
+    assert client.get("/api/v1/auth/me", headers=bearer(tokens["access_token"])).status_code == 200
+
+
+def test_only_the_latest_rotated_out_token_gets_the_grace_window(client, tokens):
+    rotated = refresh(client, tokens["refresh_token"]).json()
+    refresh(client, rotated["refresh_token"])
+
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
+    assert client.get("/api/v1/auth/me", headers=bearer(rotated["access_token"])).status_code == 401
+
+
+def test_concurrent_refreshes_with_one_token_let_only_one_rotate(db, tokens):
+    session_id = verify_token(tokens["refresh_token"])["sid"]
+    first, second = SessionLocal(), SessionLocal()
+    try:
+        # Both requests pass the check before either rotates
+        first_session = SessionService(first).check_refresh_token(session_id, tokens["refresh_token"])
+        second_session = SessionService(second).check_refresh_token(session_id, tokens["refresh_token"])
+        assert first_session is not None and second_session is not None
+
+        assert SessionService(first).rotate(first_session, "first", previous_token=tokens["refresh_token"])
+        # The loser is within the grace window: it is told to reuse the winner's pair
+        assert SessionService(second).rotate(second_session, "second", previous_token=tokens["refresh_token"])
+        assert second_session.refresh_token_hash == first_session.refresh_token_hash
+    finally:
+        first.close()
+        second.close()
+
+    db_session = SessionService(db).get_session(session_id)
+    assert db_session.revoked_at is None
+    assert db.get(User, db_session.user_id).token_version == 0
+
+    age_rotation(db, session_id)
+    later = SessionLocal()
+    try:
+        late_session = SessionService(later).get_session(session_id)
+        assert not SessionService(later).rotate(late_session, "third", previous_token=tokens["refresh_token"])
+    finally:
+        later.close()
+    db.expire_all()
+    assert db_session.revoked_reason == "reuse"
+    assert db.get(User, db_session.user_id).token_version == 1
+
+
+def test_logout_ends_the_session(client, tokens):
+    assert client.post("/api/v1/auth/logout", headers=bearer(tokens["access_token"])).status_code == 204
+
+    assert client.get("/api/v1/auth/me", headers=bearer(tokens["access_token"])).status_code == 401
+    assert refresh(client, tokens["refresh_token"]).status_code == 401
+
+
+def test_deleting_a_session_logs_out_only_that_device(client, register, login):
+    register()
+    phone, laptop = login(), login()
+    session_id = verify_token(phone["refresh_token"])["sid"]
+
+    response = client.delete(f"/api/v1/auth/sessions/{session_id}", headers=bearer(laptop["access_token"]))
+    assert response.status_code == 204
+
+    assert refresh(client, phone["refresh_token"]).status_code == 401
+    assert client.get("/api/v1/auth/me", headers=bearer(phone["access_token"])).status_code == 401
+    assert client.get("/api/v1/auth/me", headers=bearer(laptop["access_token"])).status_code == 200
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+import pytest
+from app.core.principals import Principal
+from app.core.singleflight import AsyncSingleFlight, SingleFlight
+from app.models.user import UserRole
+from app.services.user_service import UserService
+
+
+def test_concurrent_calls_share_one_execution():
+    group = SingleFlight("test")
+    calls = []
+    started = threading.Event()
+
+    def slow(value):
+        calls.append(value)
+        started.set()
+        time.sleep(0.2)
+        return value * 2
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(group.do("key", slow, 21)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(group.do("key", slow, 21))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert calls == [21]
+    assert results == [42] * 4
+    # Nothing is cached once the call returned
+    group.do("key", slow, 21)
+    assert calls == [21, 21]
+
+
+def test_followers_get_the_leaders_exception():
+    group = SingleFlight("test")
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("lookup failed")
+
+    errors = []
+
+    def call():
+        try:
+            group.do("key", failing)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait()
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    for thread in threads:
+        thread.join()
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+
+
+def test_a_cancelled_caller_does_not_fail_the_others():
+    group = AsyncSingleFlight("test")
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return "result"
+
+    async def scenario():
+        leader = asyncio.ensure_future(group.do("key", fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do("key", fetch))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == "result"
+    assert calls == [1]
+
+
+def test_principal_lookup_returns_a_detached_principal(db, register):
+    user_id = register()["id"]
+
+    principal = UserService(db).get_principal_coalesced(user_id)
+
+    assert principal == Principal(
+        id=user_id, email="user@example.com", role=UserRole.USER, is_active=True, token_version=0
+    )
+    # Plain values only: nothing was added to the session
+    assert list(db.identity_map.values()) == []
+    assert UserService(db).get_principal_coalesced(user_id + 1) is None
@@ -0,0 +1,70 @@
+import json
+from contextlib import contextmanager
+from sqlalchemy import event
+from app.db.database import engine
+
+
+@contextmanager
+def captured_queries():
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+def test_only_the_requested_fields_are_returned_in_canonical_order(client, admin, register):
+    user_id = register("sparse@example.com")["id"]
+
+    response = client.get(f"/api/v1/users/{user_id}?fields=role, email,id", headers=admin)
+
+    assert response.status_code == 200
+    assert list(response.json()) == ["email", "role", "id"]
+    assert response.json()["email"] == "sparse@example.com"
+
+
+def test_unknown_fields_are_rejected(client, admin):
+    response = client.get("/api/v1/users/?fields=id,hashed_password", headers=admin)
+
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: hashed_password"
+
+
+def test_sparse_queries_select_only_the_requested_columns(client, admin, register):
+    register("sparse@example.com")
+
+    with captured_queries() as statements:
+        response = client.get("/api/v1/users/?fields=id,email", headers=admin)
+
+    assert response.status_code == 200
+    assert all(set(user) == {"id", "email"} for user in response.json())
+    [listing] = [statement for statement in statements if "FROM users" in statement and "WHERE" not in statement]
+    assert "users.email" in listing and "hashed_password" not in listing and "full_name" not in listing
+
+
+def test_sparse_and_full_views_get_different_etags(client, admin, register):
+    user_id = register("sparse@example.com")["id"]
+
+    full = client.get(f"/api/v1/users/{user_id}", headers=admin)
+    sparse = client.get(f"/api/v1/users/{user_id}?fields=id,email", headers=admin)
+
+    assert full.headers["etag"] != sparse.headers["etag"]
+    revalidated = client.get(
+        f"/api/v1/users/{user_id}?fields=email,id", headers={**admin, "If-None-Match": sparse.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+
+
+def test_the_export_honours_the_fieldset(client, admin, register):
+    register("sparse@example.com")
+
+    response = client.get("/api/v1/users/export?fields=id,role", headers=admin)
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 2
+    assert all(set(line) == {"id", "role"} for line in lines)
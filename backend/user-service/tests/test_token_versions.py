@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.core import principals
+from app.core.principals import TokenVersionMap
+from app.models.user import User, UserRole
+from app.services.user_service import UserService
+from conftest import bearer
+
+
+def test_logout_all_invalidates_every_session(client, register, login):
+    register()
+    phone, laptop = login(), login()
+
+    assert client.post("/api/v1/auth/logout-all", headers=bearer(phone["access_token"])).status_code == 204
+
+    for tokens in (phone, laptop):
+        assert client.get("/api/v1/auth/me", headers=bearer(tokens["access_token"])).status_code == 401
+        response = client.post("/api/v1/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        assert response.status_code == 401
+
+
+def test_role_change_invalidates_tokens_with_the_old_role(client, db, register, login):
+    user = register()
+    tokens = login()
+
+    UserService(db).change_user_role(user["id"], UserRole.ADMIN)
+
+    assert client.get("/api/v1/auth/me", headers=bearer(tokens["access_token"])).status_code == 401
+    assert client.get("/api/v1/auth/me", headers=bearer(login()["access_token"])).status_code == 200
+
+
+def test_stateless_principals_reject_a_bumped_version(client, db, monkeypatch, register, login):
+    monkeypatch.setattr(settings, "STATELESS_PRINCIPALS_ENABLED", True)
+    user = register()
+    db.query(User).filter(User.id == user["id"]).update({"role": UserRole.ADMIN})
+    db.commit()
+    tokens = login()
+    assert client.get("/api/v1/users/", headers=bearer(tokens["access_token"])).status_code == 200
+
+    UserService(db).revoke_tokens(user["id"])
+
+    assert client.get("/api/v1/users/", headers=bearer(tokens["access_token"])).status_code == 401
+
+
+def test_token_version_map_picks_up_bumps_from_other_processes(db, register):
+    user = register()
+    versions = TokenVersionMap(refresh_interval=0, retention=timedelta(minutes=30))
+    assert versions.get(user["id"]) == 0
+
+    # Bumped through another map, as another worker would
+    UserService(db).revoke_tokens(user["id"])
+
+    assert versions.get(user["id"]) == 1
+    assert not versions.is_current(user["id"], 0)
+    assert versions.is_current(user["id"], 1)
+
+
+def test_token_version_map_only_keeps_bumps_newer_than_the_token_lifetime(db, register):
+    recent, old = register("recent@example.com"), register("old@example.com")
+    UserService(db).revoke_tokens(recent["id"])
+    # Every token issued before this bump has expired by now
+    db.query(User).filter(User.id == old["id"]).update(
+        {"token_version": 3, "updated_at": datetime.utcnow() - timedelta(hours=2)}
+    )
+    db.commit()
+
+    versions = TokenVersionMap(refresh_interval=0, retention=timedelta(minutes=30))
+
+    assert versions.get(recent["id"]) == 1
+    assert versions.get(old["id"]) == 0
+    assert set(versions._versions) == {recent["id"]}
+
+
+def test_a_failing_token_version_refresh_costs_one_request_per_interval(monkeypatch, register):
+    user = register()
+    attempts = []
+
+    def unavailable():
+        attempts.append(1)
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(principals, "SessionLocal", unavailable)
+    versions = TokenVersionMap(refresh_interval=60, retention=timedelta(minutes=30))
+
+    assert versions.get(user["id"]) == 0
+    assert versions.get(user["id"]) == 0
+    assert len(attempts) == 1
@@ -0,0 +1,48 @@
+from app.core.config import settings
+from conftest import bearer
+
+
+def test_users_come_back_in_input_order_with_the_missing_ones_listed(client, admin, register):
+    first, second = register("first@example.com")["id"], register("second@example.com")["id"]
+
+    response = client.post("/api/v1/users/batch", json={"ids": [second, 999, first, second]}, headers=admin)
+
+    assert response.status_code == 200
+    assert [user["id"] for user in response.json()["users"]] == [second, first]
+    assert response.json()["missing"] == [999]
+
+
+def test_users_can_be_resolved_by_email_with_a_fieldset(client, admin, register):
+    register("first@example.com")
+
+    response = client.post(
+        "/api/v1/users/batch?fields=email",
+        json={"emails": ["first@example.com", "nobody@example.com"]},
+        headers=admin
+    )
+
+    assert response.json() == {"users": [{"email": "first@example.com"}], "missing": ["nobody@example.com"]}
+
+
+def test_exactly_one_key_kind_and_a_bounded_batch_are_accepted(client, admin, monkeypatch):
+    assert client.post("/api/v1/users/batch", json={}, headers=admin).status_code == 422
+    assert client.post(
+        "/api/v1/users/batch", json={"ids": [1], "emails": ["a@example.com"]}, headers=admin
+    ).status_code == 422
+
+    monkeypatch.setattr(settings, "USER_BATCH_MAX_SIZE", 2)
+    assert client.post("/api/v1/users/batch", json={"ids": [1, 2, 3]}, headers=admin).status_code == 400
+
+
+def test_services_authenticate_with_a_key_and_users_are_refused(client, monkeypatch, tokens):
+    monkeypatch.setattr(settings, "SERVICE_API_KEYS", "service-key, other-key")
+
+    assert client.post(
+        "/api/v1/users/batch", json={"ids": [1]}, headers={"X-Service-Key": "other-key"}
+    ).status_code == 200
+    assert client.post(
+        "/api/v1/users/batch", json={"ids": [1]}, headers={"X-Service-Key": "wrong-key"}
+    ).status_code == 401
+    assert client.post(
+        "/api/v1/users/batch", json={"ids": [1]}, headers=bearer(tokens["access_token"])
+    ).status_code == 403
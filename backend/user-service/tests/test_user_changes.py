@@ -0,0 +1,39 @@
+from app.core.config import settings
+from app.models.user import User
+from conftest import bearer
+
+
+def test_changes_page_through_created_and_updated_users(client, db, monkeypatch, register, admin):
+    monkeypatch.setattr(settings, "USER_CHANGES_SETTLE_SECONDS", 0)
+    for number in range(3):
+        register(f"user{number}@example.com")
+
+    first = client.get("/api/v1/users/changes", headers=admin, params={"limit": 2}).json()
+    assert first["has_more"] is True
+    second = client.get(
+        "/api/v1/users/changes", headers=admin, params={"since": first["next_cursor"], "limit": 2}
+    ).json()
+    assert second["has_more"] is False
+    emails = [user["email"] for user in first["users"] + second["users"]]
+    assert sorted(emails) == sorted(["admin@example.com"] + [f"user{n}@example.com" for n in range(3)])
+
+    user = db.query(User).filter(User.email == "user1@example.com").one()
+    assert client.post(f"/api/v1/users/{user.id}/deactivate", headers=admin).status_code == 200
+    third = client.get("/api/v1/users/changes", headers=admin, params={"since": second["next_cursor"]}).json()
+    assert third["users"] == []
+    assert [tombstone["id"] for tombstone in third["tombstones"]] == [user.id]
+
+
+def test_login_is_not_a_change(client, db, monkeypatch, register, login, admin):
+    monkeypatch.setattr(settings, "USER_CHANGES_SETTLE_SECONDS", 0)
+    register()
+    headers = bearer(login()["access_token"])
+    changes = client.get("/api/v1/users/changes", headers=admin).json()
+    etag = client.get("/api/v1/users/me", headers=headers).headers["ETag"]
+
+    login()
+
+    after = client.get("/api/v1/users/changes", headers=admin, params={"since": changes["next_cursor"]}).json()
+    assert after["users"] == [] and after["tombstones"] == []
+    assert client.get("/api/v1/users/me", headers={**headers, "If-None-Match": etag}).status_code == 304
+    assert db.query(User.last_login).filter(User.email == "user@example.com").scalar() is not None
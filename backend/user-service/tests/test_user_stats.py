@@ -0,0 +1,65 @@
+from datetime import datetime
+from app.models.user import User, UserRole
+from app.models.user_stat import UserStat
+from app.services.user_service import UserService
+from app.services.user_stats_service import UserStatsService
+from conftest import bearer
+
+
+def stats(client, headers, days: int = 7) -> dict:
+    response = client.get(f"/api/v1/users/stats?days={days}", headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_counters_follow_every_change(client, db, admin, register):
+    first, second = register("first@example.com")["id"], register("second@example.com")["id"]
+    service = UserService(db)
+    service.deactivate_user(first)
+    service.verify_user(second)
+    service.change_user_role(second, UserRole.AGENT)
+
+    counts = stats(client, admin)
+
+    assert (counts["total"], counts["active"], counts["inactive"]) == (3, 2, 1)
+    assert (counts["verified"], counts["unverified"]) == (1, 2)
+    # The admin fixture promotes its user in the database, so the counters
+    # still see a USER until the next reconcile
+    assert counts["by_role"] == {"USER": 2, "ADMIN": 0, "AGENT": 1}
+    assert len(counts["daily_signups"]) == 7
+    assert counts["daily_signups"][-1] == {"date": datetime.utcnow().date().isoformat(), "count": 3}
+
+
+def test_reconcile_corrects_drift_from_changes_made_outside_the_service(db, register):
+    user_id = register()["id"]
+    db.query(User).filter(User.id == user_id).update({"is_verified": True})
+    db.commit()
+
+    assert UserStatsService(db).reconcile() == {"verified": 1}
+    assert UserStatsService(db).get_stats()["verified"] == 1
+    assert UserStatsService(db).reconcile() == {}
+    assert UserStatsService(db).get_stats()["reconciled_at"] is not None
+
+
+def test_reconcile_fills_in_counters_on_a_database_that_predates_them(db, register):
+    register("first@example.com")
+    register("second@example.com")
+    db.query(UserStat).delete()
+    db.commit()
+
+    UserStatsService(db).reconcile()
+
+    counts = UserStatsService(db).get_stats()
+    assert (counts["total"], counts["active"], counts["by_role"]["USER"]) == (2, 2, 2)
+    assert counts["daily_signups"][-1]["count"] == 2
+
+
+def test_only_one_process_per_interval_reconciles(db, register):
+    register()
+
+    assert UserStatsService(db).reconcile(min_interval=3600) == {}
+    assert UserStatsService(db).reconcile(min_interval=3600) is None
+
+
+def test_stats_are_for_admins_and_services_only(client, tokens):
+    assert client.get("/api/v1/users/stats", headers=bearer(tokens["access_token"])).status_code == 403